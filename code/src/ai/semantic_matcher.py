@@ -6,11 +6,12 @@ Calculates semantic similarity between user prompts and video content.
 """
 
 import logging
-import os
-import json
+import threading
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from utils.video_catalog import get_video_catalog
+from utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -20,35 +21,67 @@ class SemanticMatcher:
     def __init__(self):
         """Initialize the semantic matcher."""
         self.vectorizer = TfidfVectorizer(stop_words='english')
-        self.video_metadata = self._load_video_metadata()
+        self.video_metadata = []
+        self.doc_matrix = None
+        self._catalog_version = None
+        self._path_index = {}
+        self._low_text = np.zeros(0, dtype=bool)
+        self._lock = threading.Lock()
+        self.refresh()
     
     def _load_video_metadata(self):
         """
-        Load metadata for all videos in the library.
+        Load metadata for all videos in the library from the video catalog.
         
         Returns:
-            list: List of video metadata dictionaries
+            tuple: (list of video metadata dictionaries, whether anything changed)
         """
-        metadata = []
-        video_dir = os.path.join('data', 'video_library')
-        
         try:
-            # Look for metadata files in video directory
-            for root, _, files in os.walk(video_dir):
-                for file in files:
-                    if file.endswith('.json'):
-                        with open(os.path.join(root, file), 'r', encoding='utf-8') as f:
-                            video_data = json.load(f)
-                            # Add the corresponding video file
-                            video_file = file.replace('.json', '.mp4')
-                            if os.path.exists(os.path.join(root, video_file)):
-                                video_data['video_path'] = os.path.join(root, video_file)
-                                metadata.append(video_data)
+            catalog = get_video_catalog()
+            metadata = catalog.metadata_entries()
+            changed = catalog.version != self._catalog_version
+            self._catalog_version = catalog.version
+            return metadata, changed
         except Exception as e:
             logger.error(f"Error loading video metadata: {e}")
+            return self.video_metadata, False
+    
+    @staticmethod
+    def _video_text(video_metadata):
+        """Combine relevant metadata fields into one document."""
+        return " ".join([
+            video_metadata.get('title', ''),
+            video_metadata.get('description', ''),
+            " ".join(video_metadata.get('tags', [])),
+            " ".join(video_metadata.get('keywords', []))
+        ])
+    
+    def refresh(self):
+        """
+        Refresh the index, refitting TF-IDF only when the catalog changed.
         
-        logger.info(f"Loaded metadata for {len(metadata)} videos")
-        return metadata
+        Returns:
+            bool: True if the index was rebuilt
+        """
+        with self._lock:
+            metadata, changed = self._load_video_metadata()
+            if not changed and self.doc_matrix is not None:
+                return False
+            
+            self.video_metadata = metadata
+            self._path_index = {v['video_path']: i for i, v in enumerate(metadata)}
+            texts = [self._video_text(v) for v in metadata]
+            self._low_text = np.array([len(t.strip()) < 10 for t in texts], dtype=bool)
+            
+            try:
+                # Rows are L2-normalized, so a dot product is the cosine similarity
+                self.doc_matrix = self.vectorizer.fit_transform(texts) if texts else None
+            except ValueError as e:
+                logger.warning(f"Could not fit TF-IDF index: {e}")
+                self.doc_matrix = None
+            
+            logger.info(f"Indexed metadata for {len(metadata)} videos")
+            return True
     
     def calculate_similarity(self, prompt, video_metadata):
         """
@@ -61,13 +94,7 @@ class SemanticMatcher:
         Returns:
             float: Similarity score (0-1)
         """
-        # Combine relevant metadata fields
-        video_text = " ".join([
-            video_metadata.get('title', ''),
-            video_metadata.get('description', ''),
-            " ".join(video_metadata.get('tags', [])),
-            " ".join(video_metadata.get('keywords', []))
-        ])
+        video_text = self._video_text(video_metadata)
         
         # If there's not enough text to compare, return low similarity
         if len(video_text.strip()) < 10:
@@ -75,42 +102,97 @@ class SemanticMatcher:
         
         # Calculate TF-IDF vectors and cosine similarity
         try:
-            tfidf_matrix = self.vectorizer.fit_transform([prompt, video_text])
+            with self._lock:
+                fitted = self.doc_matrix is not None
+                if fitted:
+                    tfidf_matrix = self.vectorizer.transform([prompt, video_text])
+            if not fitted:
+                # Fit a throwaway vectorizer; the shared one belongs to the index
+                tfidf_matrix = TfidfVectorizer(stop_words='english').fit_transform([prompt, video_text])
             similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
             return float(similarity)
         except Exception as e:
             logger.error(f"Error calculating similarity: {e}")
             return 0.0
+    
+    def score(self, prompt, video_files=None, top_n=5):
+        """
+        Score all indexed videos against a prompt.
+        
+        Uses one transform of the prompt, one sparse matrix-vector product
+        and an argpartition top-k.
+        
+        Args:
+            prompt (str): User prompt
+            video_files (list, optional): Restrict scoring to these video paths
+            top_n (int): Number of top matches to return
+        
+        Returns:
+            list: List of (video_path, similarity_score) tuples, sorted by similarity
+        """
+        with self._lock:
+            if not self.video_metadata:
+                return []
+            
+            if self.doc_matrix is not None:
+                prompt_vector = self.vectorizer.transform([prompt])
+                scores = np.asarray((self.doc_matrix @ prompt_vector.T).todense()).ravel()
+            else:
+                scores = np.zeros(len(self.video_metadata))
+            scores[self._low_text] = 0.1
+            
+            if video_files:
+                candidates = np.array(sorted(
+                    self._path_index[path] for path in set(video_files) if path in self._path_index
+                ), dtype=int)
+            else:
+                candidates = np.arange(len(scores))
+            
+            if len(candidates) == 0:
+                return []
+            
+            k = min(top_n, len(candidates))
+            candidate_scores = scores[candidates]
+            top = np.argpartition(-candidate_scores, k - 1)[:k]
+            top = top[np.argsort(-candidate_scores[top], kind='stable')]
+            
+            return [(self.video_metadata[candidates[i]]['video_path'], float(candidate_scores[i])) for i in top]
 
+_matcher = None
+_matcher_lock = threading.Lock()
+
+def get_matcher():
+    """
+    Get the shared semantic matcher, refreshing it if metadata changed.
+    
+    Returns:
+        SemanticMatcher: Shared matcher instance
+    """
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            _matcher = SemanticMatcher()
+        else:
+            _matcher.refresh()
+        return _matcher
+
+@traced('matcher.match_videos')
 def match_videos(prompt, video_files=None, top_n=5):
     """
     Match user prompt with videos based on semantic similarity.
     
     Args:
-        prompt (str): User prompt or concatenated labels
+        prompt (str or list): User prompt or list of labels
         video_files (list, optional): List of video file paths to consider
         top_n (int): Number of top matches to return
     
     Returns:
         list: List of (video_path, similarity_score) tuples, sorted by similarity
     """
-    matcher = SemanticMatcher()
-    results = []
-    
-    # Filter video metadata based on provided files if any
-    videos_to_check = matcher.video_metadata
-    if video_files:
-        videos_to_check = [v for v in videos_to_check if v.get('video_path') in video_files]
-    
-    # Calculate similarity for each video
-    for video in videos_to_check:
-        if 'video_path' in video:
-            similarity = matcher.calculate_similarity(prompt, video)
-            results.append((video['video_path'], similarity))
+    if isinstance(prompt, (list, tuple)):
+        prompt = " ".join(prompt)
     
-    # Sort by similarity (descending) and return top N
-    results.sort(key=lambda x: x[1], reverse=True)
-    top_results = results[:top_n]
+    top_results = get_matcher().score(prompt, video_files, top_n)
     
     logger.info(f"Top {len(top_results)} video matches found with scores: {[score for _, score in top_results]}")
-    return top_results 
\ No newline at end of file
+    return top_results
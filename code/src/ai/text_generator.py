@@ -12,6 +12,7 @@ import requests
 import logging
 from pathlib import Path
 import argparse
+from utils.tracing import traced
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -182,6 +183,7 @@ def transform_to_narrative_prompt(original_prompt):
     logger.info(f"Transformed prompt: '{original_prompt}' -> '{narrative_prompt}'")
     return narrative_prompt
 
+@traced('llm.generate_text')
 def generate_text(model_name=None, prompt="", max_length=1000, temperature=0.7, history=None, narrative_mode=True, **kwargs):
     """
     Generate text - ALWAYS try Gemini first unless explicitly told to use Doubao.
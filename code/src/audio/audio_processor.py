@@ -7,9 +7,10 @@ Processes audio files for the content generation system.
 
 import os
 import logging
-import subprocess
 import tempfile
 from pydub import AudioSegment
+from utils.ffmpeg_runner import run_ffmpeg
+from utils.media_info import get_duration
 
 logger = logging.getLogger(__name__)
 
@@ -58,7 +59,7 @@ def process_audio(audio_path, output_dir=None, normalize=True, remove_noise=True
             ffmpeg_cmd.extend(['-ar', '44100', '-ac', '2', output_path])
             
             # Run FFmpeg process
-            subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            run_ffmpeg('process_audio', ffmpeg_cmd)
             
             logger.info(f"Processed audio saved to {output_path}")
             return output_path
@@ -96,9 +97,10 @@ def adjust_audio_duration(audio_path, target_duration, output_dir=None):
     output_path = os.path.join(output_dir, f"adjusted_{filename}")
     
     try:
-        # Load audio file
-        audio = AudioSegment.from_file(audio_path)
-        current_duration = len(audio) / 1000.0  # Convert ms to seconds
+        # Read the duration from the headers; only decode if they are not understood
+        current_duration = get_duration(audio_path)
+        if current_duration is None:
+            current_duration = len(AudioSegment.from_file(audio_path)) / 1000.0  # Convert ms to seconds
         
         if abs(current_duration - target_duration) < 0.5:
             # Already close enough to target duration
@@ -111,11 +113,11 @@ def adjust_audio_duration(audio_path, target_duration, output_dir=None):
             
             # Use FFmpeg atempo filter (limited to 0.5-2.0 range)
             if 0.5 <= ratio <= 2.0:
-                subprocess.run([
+                run_ffmpeg('atempo', [
                     'ffmpeg', '-y', '-i', audio_path,
                     '-filter:a', f'atempo={ratio}',
                     output_path
-                ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                ])
             else:
                 # For extreme ratios, use multiple passes or other approach
                 temp_path = tempfile.mktemp(suffix='.mp3')
@@ -125,24 +127,24 @@ def adjust_audio_duration(audio_path, target_duration, output_dir=None):
                     first_ratio = 0.5
                     second_ratio = ratio / 0.5
                     
-                    subprocess.run([
+                    run_ffmpeg('atempo', [
                         'ffmpeg', '-y', '-i', audio_path,
                         '-filter:a', f'atempo={first_ratio}',
                         temp_path
-                    ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                    ])
                     
-                    subprocess.run([
+                    run_ffmpeg('atempo', [
                         'ffmpeg', '-y', '-i', temp_path,
                         '-filter:a', f'atempo={second_ratio}',
                         output_path
-                    ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                    ])
                 else:
                     # For extreme slowdown, use alternative approach
-                    subprocess.run([
+                    run_ffmpeg('asetrate', [
                         'ffmpeg', '-y', '-i', audio_path,
                         '-filter:a', 'asetrate=44100*0.5,aresample=44100',
                         output_path
-                    ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                    ])
                 
                 # Clean up temp file
                 if os.path.exists(temp_path):
@@ -152,13 +154,12 @@ def adjust_audio_duration(audio_path, target_duration, output_dir=None):
             # Need to extend audio (loop or add silence)
             logger.info(f"Extending audio from {current_duration:.2f}s to {target_duration:.2f}s")
             
-            # Add silence to the end
-            silence_duration = target_duration - current_duration
-            silence = AudioSegment.silent(duration=int(silence_duration * 1000))
-            extended_audio = audio + silence
-            
-            # Export extended audio
-            extended_audio.export(output_path, format="mp3")
+            # Pad with silence up to the target duration
+            run_ffmpeg('apad', [
+                'ffmpeg', '-y', '-i', audio_path,
+                '-af', f'apad=whole_dur={target_duration}',
+                output_path
+            ])
         
         logger.info(f"Adjusted audio saved to {output_path}")
         return output_path
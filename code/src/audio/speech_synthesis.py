@@ -15,10 +15,12 @@ import wave
 import array
 import math
 import random
+from utils.tracing import traced
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+@traced('tts.generate_speech')
 def generate_speech(text, output_path=None, language="en", slow=False):
     """
     Generate speech from text with multiple fallback options.
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Named speed/quality settings for libx264 encodes.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE = 'standard'
+
+# preset/crf trade encode speed against size and quality; resolution and
+# fps apply to composed output (effect renders keep their source format)
+ENCODE_PROFILES = {
+    'preview': {
+        'preset': 'ultrafast',
+        'crf': 30,
+        'resolution': [640, 360],
+        'fps': 15,
+        'audio_bitrate': '64k'
+    },
+    'standard': {
+        'preset': 'medium',
+        'crf': 23,
+        'resolution': [1920, 1080],
+        'fps': 30,
+        'audio_bitrate': '128k'
+    },
+    'archival': {
+        'preset': 'slow',
+        'crf': 18,
+        'resolution': [1920, 1080],
+        'fps': 30,
+        'audio_bitrate': '192k'
+    }
+}
+
+def get_profile(profile=None, **overrides):
+    """
+    Resolve an encode profile.
+
+    Args:
+        profile (str or dict, optional): Profile name or profile dictionary
+            (defaults to 'standard')
+        **overrides: Settings replacing those of the profile; None values
+            are ignored
+
+    Returns:
+        dict: Profile settings, including its 'name'
+    """
+    if isinstance(profile, dict):
+        settings = dict(profile)
+    else:
+        name = profile or DEFAULT_PROFILE
+        if name not in ENCODE_PROFILES:
+            logger.warning(f"Unknown encode profile '{name}', using '{DEFAULT_PROFILE}'")
+            name = DEFAULT_PROFILE
+        settings = dict(ENCODE_PROFILES[name], name=name)
+
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    return settings
+
+def video_encoder_args(profile):
+    """
+    Get the FFmpeg video encoder arguments of a profile.
+
+    Args:
+        profile (dict): Profile from get_profile()
+
+    Returns:
+        list: FFmpeg arguments
+    """
+    return ['-c:v', 'libx264', '-preset', profile['preset'], '-crf', str(profile['crf']),
+            '-pix_fmt', 'yuv420p']
+
+def audio_encoder_args(profile):
+    """
+    Get the FFmpeg audio encoder arguments of a profile.
+
+    Args:
+        profile (dict): Profile from get_profile()
+
+    Returns:
+        list: FFmpeg arguments
+    """
+    return ['-c:a', 'aac', '-b:a', profile['audio_bitrate']]
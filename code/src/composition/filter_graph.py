@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Builds FFmpeg filter graphs for single-pass video composition.
+"""
+
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Default subtitle style used for burn-in
+SUBTITLE_STYLE = "FontName=Arial,FontSize=24,PrimaryColour=&H00FFFFFF,OutlineColour=&H00000000,BackColour=&H80000000,Bold=1,Italic=0,Alignment=2"
+
+# Durations closer than this are merged as-is
+DURATION_TOLERANCE = 2.0
+
+def plan_timing(video_duration, audio_duration):
+    """
+    Decide how to reconcile video and audio durations.
+
+    Mirrors the strategies of the multi-pass composer so both paths
+    produce the same timeline.
+
+    Args:
+        video_duration (float): Duration of the concatenated clips in seconds
+        audio_duration (float): Duration of the narration in seconds
+
+    Returns:
+        dict: Timing plan with 'mode', 'duration', 'loops' and 'speed_ratio'
+    """
+    plan = {
+        'mode': 'merge',
+        'duration': min(video_duration, audio_duration),
+        'loops': 1,
+        'speed_ratio': 1.0
+    }
+
+    if abs(video_duration - audio_duration) < DURATION_TOLERANCE:
+        return plan
+
+    if video_duration > audio_duration:
+        # Video is longer, loop audio or extend with silence
+        plan['mode'] = 'loop_audio' if audio_duration < video_duration / 2 else 'pad_audio'
+        plan['duration'] = video_duration
+        return plan
+
+    # Audio is longer, slow down or loop video
+    speed_ratio = audio_duration / video_duration
+    plan['duration'] = audio_duration
+    if speed_ratio < 1.5:
+        plan['mode'] = 'retime'
+        plan['speed_ratio'] = speed_ratio
+    else:
+        plan['mode'] = 'loop_video'
+        plan['loops'] = int(audio_duration / video_duration) + 1
+
+    return plan
+
+def escape_filter_path(path):
+    """
+    Escape a file path for use as a single-quoted filter option value.
+
+    Quotes only protect the path from the filter graph parser, so
+    backslashes and colons are escaped for the option parser. A quote
+    closes the quoting, is escaped for both parsers and reopens it.
+    Windows separators become forward slashes; elsewhere a backslash is
+    part of the file name.
+
+    Args:
+        path (str): File path
+
+    Returns:
+        str: Escaped path, to be wrapped in single quotes
+    """
+    if os.sep == '\\':
+        path = path.replace('\\', '/')
+    return path.replace('\\', '\\\\').replace(':', '\\:').replace("'", "'\\\\\\''")
+
+def escape_filter_text(text):
+    """
+    Escape literal text for use as an unquoted filter option value.
+
+    Args:
+        text (str): Text
+
+    Returns:
+        str: Text escaped for the option parser and then for the filter
+            graph parser
+    """
+    for special in ("\\':", "\\'[],;"):
+        text = "".join('\\' + char if char in special else char for char in text)
+    return text
+
+def normalize_filter(resolution, fps=30):
+    """
+    Build the scale/pad chain that brings a clip to the output format.
+
+    Args:
+        resolution (tuple): Output video resolution (width, height)
+        fps (int): Output frame rate
+
+    Returns:
+        str: Filter chain
+    """
+    width, height = resolution
+    return (f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={fps},format=yuv420p")
+
+def subtitle_filter(subtitle_path, style=SUBTITLE_STYLE):
+    """
+    Build the subtitle burn-in filter.
+
+    Args:
+        subtitle_path (str): Path to SRT file
+        style (str): ASS force_style string
+
+    Returns:
+        str: Filter expression
+    """
+    return f"subtitles=filename='{escape_filter_path(subtitle_path)}':force_style='{style}'"
+
+def build_composition_graph(clip_count, audio_index, resolution, timing, subtitle_path=None, fps=30,
+                            frame_range=None, time_offset=0.0, post_filter=None):
+    """
+    Build one filter_complex covering scale/pad, concat, retiming,
+    audio padding, subtitle burn-in and post-processing.
+
+    Args:
+        clip_count (int): Number of video inputs (inputs 0..clip_count-1)
+        audio_index (int): Input index of the narration audio, or None for
+            a video-only graph
+        resolution (tuple): Output video resolution (width, height)
+        timing (dict): Timing plan from plan_timing()
+        subtitle_path (str, optional): SRT file to burn in
+        fps (int): Output frame rate
+        frame_range (tuple, optional): (first, end) output frames to keep,
+            for rendering one segment of the timeline
+        time_offset (float): Position of the first clip on the concatenated
+            timeline, when the clips before it are left out of a segment
+        post_filter (str, optional): Filter chain applied to the finished
+            picture, see PostProcessChain
+
+    Returns:
+        tuple: (filter_complex, video_label, audio_label); audio_label is
+            None for a video-only graph
+    """
+    chains = []
+    scale = normalize_filter(resolution, fps)
+
+    for i in range(clip_count):
+        chains.append(f"[{i}:v]{scale}[v{i}]")
+
+    concat_inputs = "".join(f"[v{i}]" for i in range(clip_count))
+    video_chain = f"{concat_inputs}concat=n={clip_count}:v=1:a=0"
+
+    if time_offset:
+        # Keep timestamps absolute so retiming and subtitles match a full render
+        video_chain += f",setpts=PTS+{time_offset:.6f}/TB"
+
+    if timing['mode'] == 'retime':
+        video_chain += f",setpts={timing['speed_ratio']:.6f}*PTS,fps={fps}"
+
+    if subtitle_path:
+        video_chain += f",{subtitle_filter(subtitle_path)}"
+
+    if post_filter:
+        video_chain += f",{post_filter}"
+
+    if frame_range:
+        # Cut after every timing filter, a quarter frame early so rounding to
+        # the stream time base cannot move a boundary frame into the neighbour
+        start, end = (max(0.0, (frame - 0.25) / fps) for frame in frame_range)
+        video_chain += f",trim=start={start:.6f}:end={end:.6f},setpts=PTS-STARTPTS"
+
+    chains.append(f"{video_chain}[vout]")
+
+    if audio_index is None:
+        return ";".join(chains), "[vout]", None
+
+    audio_chain = f"[{audio_index}:a]"
+    if timing['mode'] == 'pad_audio':
+        audio_chain += f"apad=whole_dur={timing['duration']:.3f}"
+    else:
+        audio_chain += "anull"
+    chains.append(f"{audio_chain}[aout]")
+
+    return ";".join(chains), "[vout]", "[aout]"
@@ -10,20 +10,65 @@ import logging
 import subprocess
 import tempfile
 import random
+import shutil
+import threading
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from src.video.media_probe import probe_videos, get_media_duration
+from src.video.mezzanine import resolve_mezzanines, keyframe_interval
+from src.composition.filter_graph import plan_timing, build_composition_graph, subtitle_filter
+from src.composition.encode_profiles import get_profile, video_encoder_args, audio_encoder_args
+from src.composition.post_process import PostProcessChain
+from src.composition.timeline_planner import plan_clips
+from src.video.hypnotic_effects import effect_stream_command, render_effect_spec
+from utils.ffmpeg_runner import run_ffmpeg
+from utils.ffmpeg_pipes import FifoGroup
+from utils.process_supervisor import get_supervisor
+from utils.tracing import in_context
 
 logger = logging.getLogger(__name__)
 
-def compose_final_video(video_files, audio_file, subtitle_file, output_path=None, resolution=(1920, 1080)):
+# Subtitle delivery: burned into the picture, muxed as a text stream, or
+# written as a WebVTT file next to the video
+SUBTITLE_MODES = ('burn', 'soft', 'sidecar')
+
+def compose_final_video(video_files, audio_file, subtitle_file, output_path=None, resolution=None,
+                        single_pass=True, on_progress=None, profile='standard', preview_path=None,
+                        on_preview=None, segment_seconds=None, subtitle_mode='burn', post_process=None):
     """
     Combine video, audio, and subtitles into final output video.
     
+    With a preview_path the composition is rendered twice from the same
+    timeline: first with the 'preview' profile (low resolution, ultrafast),
+    handed to on_preview as soon as it exists, then at the requested
+    profile.
+    
+    Effect specs from render_effects() in video_files are streamed into
+    the single-pass and segmented encodes through named pipes; the other
+    paths render them to files first.
+    
     Args:
-        video_files (list): List of video file paths
+        video_files (list): List of video file paths or effect specs
         audio_file (str): Path to audio file
         subtitle_file (str): Path to subtitle file
         output_path (str, optional): Path to save final video
-        resolution (tuple): Output video resolution (width, height)
+        resolution (tuple, optional): Output video resolution (width, height),
+            overriding the profile
+        single_pass (bool): Render everything with one filter graph and a
+            single encode; falls back to the multi-pass pipeline on failure
+        on_progress (callable, optional): Receives FFmpeg progress reports
+            of the final encode, see run_ffmpeg()
+        profile (str or dict): Encode profile, see encode_profiles
+        preview_path (str, optional): Where to render a quick preview first
+        on_preview (callable, optional): Called with the preview path once
+            the preview is written
+        segment_seconds (float, optional): Encode timelines of at least two
+            segments of this length as parallel segments
+        subtitle_mode (str): One of SUBTITLE_MODES; only 'burn' re-encodes
+            the picture for the subtitles
+        post_process (PostProcessChain, optional): Fades, watermarks and
+            other effects folded into the composition encode
     
     Returns:
         str: Path to final video
@@ -36,33 +81,103 @@ def compose_final_video(video_files, audio_file, subtitle_file, output_path=None
         logger.error(f"Audio file not found: {audio_file}")
         return None
     
-    if not os.path.exists(subtitle_file):
+    if subtitle_file and not os.path.exists(subtitle_file):
         logger.warning(f"Subtitle file not found: {subtitle_file}")
         subtitle_file = None
     
+    if subtitle_mode not in SUBTITLE_MODES:
+        logger.warning(f"Unknown subtitle mode '{subtitle_mode}', burning subtitles in")
+        subtitle_mode = 'burn'
+    
+    # Soft and sidecar subtitles are added after the encode
+    burned_subtitles = subtitle_file if subtitle_mode == 'burn' else None
+    if not post_process:
+        # An empty chain adds no filter
+        post_process = None
+    
     if not output_path:
         output_dir = os.path.join('data', 'output')
         os.makedirs(output_dir, exist_ok=True)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_path = os.path.join(output_dir, f"final_video_{timestamp}.mp4")
     
+    profile = get_profile(profile, resolution=list(resolution) if resolution else None)
+    resolution, fps = tuple(profile['resolution']), profile['fps']
+    
+    # Prefer pre-normalized library copies, which can be stream-copied
+    paths = iter(resolve_mezzanines([item for item in video_files if not isinstance(item, dict)]))
+    video_files = [item if isinstance(item, dict) else next(paths) for item in video_files]
+    streamed = any(isinstance(item, dict) for item in video_files)
+    
+    # Create temp directory for intermediate files
+    temp_dir = tempfile.mkdtemp()
+    
+    # Soft subtitles are muxed from the composed video into output_path
+    video_path = output_path
+    if subtitle_file and subtitle_mode == 'soft':
+        video_path = os.path.join(temp_dir, 'composed' + os.path.splitext(output_path)[1])
+    
     try:
-        # Create temp directory for intermediate files
-        temp_dir = tempfile.mkdtemp()
+        # Preview and final render share one timeline
+        timeline = None
+        try:
+            timeline = _plan_timeline(video_files, audio_file)
+        except Exception as e:
+            logger.warning(f"Could not plan the timeline: {e}")
+        
+        if preview_path and timeline:
+            _compose_preview(video_files, audio_file, burned_subtitles, preview_path, timeline, on_preview,
+                             post_process)
+        
+        if single_pass:
+            final_video = None
+            if not burned_subtitles and not post_process and not streamed:
+                # Nothing to draw on the picture, so compatible clips can be stream-copied
+                final_video = _compose_stream_copy(video_files, audio_file, video_path, resolution, temp_dir,
+                                                   fps, on_progress, profile, timeline)
+            # Segments only pay off with several encode slots to run them in
+            if not final_video and segment_seconds and timeline and get_supervisor().max_encodes > 1 and \
+                    timeline['timing']['duration'] >= 2 * segment_seconds:
+                final_video = _compose_segmented(video_files, audio_file, burned_subtitles, video_path, resolution,
+                                                 temp_dir, fps, on_progress, profile, timeline, segment_seconds,
+                                                 post_process)
+            if not final_video:
+                final_video = _compose_single_pass(video_files, audio_file, burned_subtitles, video_path,
+                                                   resolution, fps, on_progress, profile, timeline, post_process)
+            if final_video:
+                if subtitle_file and not burned_subtitles:
+                    final_video = _deliver_subtitles(final_video, subtitle_file, output_path, subtitle_mode)
+                logger.info(f"Final video composition complete: {final_video}")
+                return final_video
+            logger.warning("Single-pass composition failed, falling back to multi-pass")
+        
+        if streamed:
+            video_files = _materialize_streams(video_files, temp_dir, profile)
         
         # Step 1: Create concatenated video file
-        concat_video_path = _concatenate_videos(video_files, temp_dir, resolution)
+        clips = _timeline_clips(video_files, timeline) if timeline else [(path, None) for path in video_files]
+        concat_video_path = _concatenate_videos([path for path, _ in clips], temp_dir, resolution, fps, profile,
+                                                [outpoint for _, outpoint in clips])
         if not concat_video_path:
             raise Exception("Failed to concatenate videos")
         
         # Step 2: Add audio to video
-        video_with_audio = _add_audio_to_video(concat_video_path, audio_file, temp_dir)
+        video_with_audio = _add_audio_to_video(concat_video_path, audio_file, temp_dir, profile)
         if not video_with_audio:
             raise Exception("Failed to add audio to video")
         
-        # Step 3: Add subtitles if available
-        if subtitle_file:
-            final_video = _add_subtitles_to_video(video_with_audio, subtitle_file, output_path)
+        # Step 3: Add subtitles and post-processing if requested
+        if burned_subtitles:
+            final_video = _add_subtitles_to_video(video_with_audio, burned_subtitles, output_path, profile,
+                                                  post_process)
+        elif post_process:
+            final_video = post_process.apply(video_with_audio, video_path, profile=profile)
+            if not final_video:
+                raise Exception("Failed to apply post-processing")
+            if subtitle_file:
+                final_video = _deliver_subtitles(final_video, subtitle_file, output_path, subtitle_mode)
+        elif subtitle_file:
+            final_video = _deliver_subtitles(video_with_audio, subtitle_file, output_path, subtitle_mode)
         else:
             # If no subtitles, just copy the video with audio
             final_video = output_path
@@ -78,74 +193,544 @@ def compose_final_video(video_files, audio_file, subtitle_file, output_path=None
     finally:
         # Clean up temporary files
         try:
-            import shutil
             shutil.rmtree(temp_dir, ignore_errors=True)
         except:
             pass
 
-def _concatenate_videos(video_files, temp_dir, resolution):
+def _probe_duration(media_path):
     """
-    Concatenate multiple video files into one.
+    Get the container duration of a media file from the probe cache.
+    
+    Args:
+        media_path (str): Path to media file
+    
+    Returns:
+        float: Duration in seconds
+    """
+    duration = get_media_duration(media_path)
+    if duration is None:
+        raise ValueError(f"Could not determine duration of {media_path}")
+    return duration
+
+def _source_path(item):
+    """Get the file behind a video path or effect spec."""
+    return item['source'] if isinstance(item, dict) else item
+
+def _input_args(item, fifos, outpoint=None):
+    """
+    Get the FFmpeg input arguments of a video path or effect spec.
+    
+    Args:
+        item (str or dict): Video file path or effect spec
+        fifos (FifoGroup): Group that streams effect specs
+        outpoint (float, optional): Seconds of the clip to read
+    
+    Returns:
+        list: FFmpeg input arguments
+    """
+    args = ['-t', f"{outpoint:.3f}"] if outpoint else []
+    if isinstance(item, dict):
+        return args + fifos.add(f"effect.{item['effect']}", effect_stream_command(item))
+    return args + ['-i', item]
+
+def _materialize_streams(video_files, temp_dir, profile):
+    """
+    Render the effect specs among the clips to files.
+    
+    Args:
+        video_files (list): List of video file paths or effect specs
+        temp_dir (str): Temporary directory for the renders
+        profile (dict): Encode profile
+    
+    Returns:
+        list: Video file paths
+    """
+    materialized = []
+    for i, item in enumerate(video_files):
+        if isinstance(item, dict):
+            output_path = os.path.join(temp_dir, f"effect_{i}_{os.path.basename(item['source'])}")
+            item = render_effect_spec(item, output_path, profile)
+            if not item:
+                raise Exception(f"Failed to render {output_path}")
+        materialized.append(item)
+    return materialized
+
+def _plan_timeline(video_files, audio_file):
+    """
+    Probe the inputs and plan how video and narration are fitted together.
+    
+    The clips, in ranking order, are chosen and cut to cover the narration
+    (see plan_clips()), so the video is neither looped nor retimed. Effect
+    specs are streamed and can be cut on any frame; mezzanine copies are
+    cut on a keyframe.
+    
+    Args:
+        video_files (list): List of video file paths or effect specs
+        audio_file (str): Path to audio file
+    
+    Returns:
+        dict: 'probes' keyed by path (the source path for effect specs),
+            'clips' as (index into video_files, out point) tuples and the
+            'timing' plan from plan_timing()
+    """
+    sources = [_source_path(item) for item in video_files]
+    probes = probe_videos(sources)
+    durations = [probes[path]['duration'] for path in sources]
+    audio_duration = _probe_duration(audio_file)
+    
+    intervals = [None if isinstance(item, dict) else keyframe_interval(item) for item in video_files]
+    clips = plan_clips(durations, audio_duration, intervals) or [(i, None) for i in range(len(video_files))]
+    video_duration = sum(durations[i] if outpoint is None else outpoint for i, outpoint in clips)
+    return {'probes': probes, 'clips': clips, 'timing': plan_timing(video_duration, audio_duration)}
+
+def _timeline_clips(video_files, timeline):
+    """
+    Expand a planned timeline into its inputs.
+    
+    Args:
+        video_files (list): List of video file paths or effect specs
+        timeline (dict): Timeline from _plan_timeline()
+    
+    Returns:
+        list: (video path or effect spec, out point or None) tuples
+    """
+    return [(video_files[i], outpoint) for i, outpoint in timeline['clips']] * timeline['timing']['loops']
+
+def _compose_preview(video_files, audio_file, subtitle_file, preview_path, timeline, on_preview=None,
+                     post_process=None):
+    """
+    Render a low-resolution preview of the composition.
+    
+    Args:
+        video_files (list): List of video file paths or effect specs
+        audio_file (str): Path to audio file
+        subtitle_file (str): Path to subtitle file, or None
+        preview_path (str): Path to save the preview
+        timeline (dict): Timeline from _plan_timeline()
+        on_preview (callable, optional): Called with the preview path
+        post_process (PostProcessChain, optional): Effects on the picture
+    
+    Returns:
+        str: Path to preview video or None if failed
+    """
+    profile = get_profile('preview')
+    os.makedirs(os.path.dirname(preview_path) or '.', exist_ok=True)
+    preview = _compose_single_pass(video_files, audio_file, subtitle_file, preview_path,
+                                   tuple(profile['resolution']), profile['fps'], profile=profile,
+                                   timeline=timeline, post_process=post_process)
+    if not preview:
+        logger.warning("Preview render failed, continuing with the final render")
+        return None
+    
+    logger.info(f"Preview ready: {preview}")
+    if on_preview:
+        try:
+            on_preview(preview)
+        except Exception as e:
+            logger.warning(f"Preview callback failed: {e}")
+    return preview
+
+def _compose_single_pass(video_files, audio_file, subtitle_file, output_path, resolution, fps=30,
+                         on_progress=None, profile=None, timeline=None, post_process=None):
+    """
+    Compose the final video with one filter graph and a single libx264 encode.
+    
+    Scale/pad, concat, looping, audio padding, subtitle burn-in and
+    post-processing all run inside one FFmpeg process, so no intermediate
+    MP4 is written. Effect specs are streamed in as raw frames.
+    
+    Args:
+        video_files (list): List of video file paths or effect specs
+        audio_file (str): Path to audio file
+        subtitle_file (str): Path to subtitle file, or None
+        output_path (str): Path to save final video
+        resolution (tuple): Output video resolution (width, height)
+        fps (int): Output frame rate
+        on_progress (callable, optional): FFmpeg progress listener
+        profile (dict, optional): Encode profile (defaults to 'standard')
+        timeline (dict, optional): Timeline from _plan_timeline()
+        post_process (PostProcessChain, optional): Effects on the picture
+    
+    Returns:
+        str: Path to final video or None if failed
+    """
+    try:
+        profile = profile or get_profile()
+        timeline = timeline or _plan_timeline(video_files, audio_file)
+        timing = timeline['timing']
+        inputs = _timeline_clips(video_files, timeline)
+        
+        filter_complex, video_label, audio_label = build_composition_graph(
+            len(inputs), len(inputs), resolution, timing, subtitle_file, fps,
+            post_filter=post_process.video_filter(timing['duration']) if post_process else None
+        )
+        
+        logger.info(f"Composing {len(inputs)} clips in a single pass "
+                    f"({profile.get('name', 'custom')}, {timing['mode']}, {timing['duration']:.1f}s)")
+        with FifoGroup() as fifos:
+            ffmpeg_cmd = ['ffmpeg', '-y']
+            for item, outpoint in inputs:
+                ffmpeg_cmd.extend(_input_args(item, fifos, outpoint))
+            if timing['mode'] == 'loop_audio':
+                ffmpeg_cmd.extend(['-stream_loop', '-1'])
+            ffmpeg_cmd.extend(['-i', audio_file])
+            
+            ffmpeg_cmd.extend([
+                '-filter_complex', filter_complex,
+                '-map', video_label, '-map', audio_label
+            ])
+            ffmpeg_cmd.extend(video_encoder_args(profile))
+            ffmpeg_cmd.extend(audio_encoder_args(profile))
+            ffmpeg_cmd.extend(['-t', f"{timing['duration']:.3f}", '-movflags', '+faststart', output_path])
+            
+            run_ffmpeg('preview' if profile.get('name') == 'preview' else 'single_pass', ffmpeg_cmd,
+                       on_progress, timing['duration'], on_start=fifos.start)
+        return output_path
+    
+    except subprocess.CalledProcessError as e:
+        logger.error(f"FFmpeg error: {e.stderr.decode() if e.stderr else str(e)}")
+        return None
+    except Exception as e:
+        logger.error(f"Error in single-pass composition: {e}")
+        return None
+
+def _stream_signature(probe):
+    """
+    Get the stream parameters that must match for concat stream copy.
+    
+    The extradata hash covers the codec configuration record, so clips
+    that differ in profile, level or parameter sets never match.
+    
+    Args:
+        probe (dict): Probe result from media_probe
+    
+    Returns:
+        tuple: (codec, width, height, fps, pix_fmt, time_base, extradata)
+    """
+    fps = probe.get('fps')
+    return (probe.get('codec'), probe.get('width'), probe.get('height'),
+            round(fps, 3) if fps else None, probe.get('pix_fmt'), probe.get('time_base'),
+            probe.get('extradata'))
+
+def _target_signature(probes, resolution, fps=30):
+    """
+    Choose the stream parameters every clip in a concat must share.
+    
+    The time base and codec configuration are taken from the most common
+    ones among clips that already match codec, resolution, fps and pixel
+    format.
+    
+    Args:
+        probes (dict): Probe results keyed by path
+        resolution (tuple): Output video resolution (width, height)
+        fps (int): Output frame rate
+    
+    Returns:
+        tuple: Target stream signature; its extradata is None when no
+            clip matches, i.e. whatever the transcode produces
+    """
+    base = ('h264', resolution[0], resolution[1], round(float(fps), 3), 'yuv420p')
+    configs = [
+        _stream_signature(probe)[5:] for probe in probes.values()
+        if _stream_signature(probe)[:5] == base and probe.get('extradata')
+    ]
+    if configs:
+        return base + max(set(configs), key=configs.count)
+    return base + (f"1/{fps * 512}", None)
+
+def _compose_stream_copy(video_files, audio_file, output_path, resolution, temp_dir, fps=30,
+                         on_progress=None, profile=None, timeline=None):
+    """
+    Compose the final video without re-encoding clips that already match
+    the output format.
+    
+    Only clips whose codec, resolution, fps, time base or pixel format
+    differ are transcoded; the video track is then stream-copied and only
+    the audio is encoded.
     
     Args:
         video_files (list): List of video file paths
+        audio_file (str): Path to audio file
+        output_path (str): Path to save final video
+        resolution (tuple): Output video resolution (width, height)
         temp_dir (str): Temporary directory for processing
+        fps (int): Output frame rate
+        on_progress (callable, optional): FFmpeg progress listener
+        profile (dict, optional): Encode profile for transcoded clips and
+            audio (defaults to 'standard')
+        timeline (dict, optional): Timeline from _plan_timeline()
+    
+    Returns:
+        str: Path to final video, or None if the fast path does not apply
+    """
+    try:
+        profile = profile or get_profile()
+        timeline = timeline or _plan_timeline(video_files, audio_file)
+        timing = timeline['timing']
+        
+        if timing['mode'] == 'retime':
+            # Retiming needs a video encode anyway
+            return None
+        
+        clips = _timeline_clips(video_files, timeline)
+        concat_video_path = _concatenate_videos([path for path, _ in clips], temp_dir, resolution, fps, profile,
+                                                [outpoint for _, outpoint in clips])
+        if not concat_video_path:
+            return None
+        
+        logger.info(f"Composing {len(clips)} clips with stream copy ({timing['mode']}, {timing['duration']:.1f}s)")
+        _mux_narration(['-i', concat_video_path], audio_file, timing, output_path, profile, 'stream_copy',
+                       on_progress)
+        return output_path
+    
+    except subprocess.CalledProcessError as e:
+        logger.error(f"FFmpeg error: {e.stderr.decode() if e.stderr else str(e)}")
+        return None
+    except Exception as e:
+        logger.error(f"Error in stream-copy composition: {e}")
+        return None
+
+def _mux_narration(video_input, audio_file, timing, output_path, profile, step, on_progress=None):
+    """
+    Stream-copy a finished video track and encode the narration under it.
+    
+    Args:
+        video_input (list): FFmpeg input arguments of the video track
+        audio_file (str): Path to audio file
+        timing (dict): Timing plan from plan_timing()
+        output_path (str): Path to save final video
+        profile (dict): Encode profile for the audio
+        step (str): Step name for metrics and tracing
+        on_progress (callable, optional): FFmpeg progress listener
+    """
+    ffmpeg_cmd = ['ffmpeg', '-y'] + list(video_input)
+    if timing['mode'] == 'loop_audio':
+        ffmpeg_cmd.extend(['-stream_loop', '-1'])
+    ffmpeg_cmd.extend(['-i', audio_file, '-map', '0:v', '-map', '1:a', '-c:v', 'copy'])
+    ffmpeg_cmd.extend(audio_encoder_args(profile))
+    if timing['mode'] == 'pad_audio':
+        ffmpeg_cmd.extend(['-af', f"apad=whole_dur={timing['duration']:.3f}"])
+    ffmpeg_cmd.extend(['-t', f"{timing['duration']:.3f}", '-movflags', '+faststart', output_path])
+    run_ffmpeg(step, ffmpeg_cmd, on_progress, timing['duration'])
+
+def _compose_segmented(video_files, audio_file, subtitle_file, output_path, resolution, temp_dir, fps=30,
+                       on_progress=None, profile=None, timeline=None, segment_seconds=30, post_process=None):
+    """
+    Compose the final video by encoding timeline segments in parallel.
+    
+    The timeline is cut into segments of whole GOPs. Each segment is
+    rendered by its own FFmpeg process from the single-pass filter graph
+    with identical encoder settings, so it starts on a keyframe. Only the
+    clips overlapping a segment (plus one on either side) are decoded.
+    The segments are then joined by the concat demuxer with stream copy.
+    The narration is encoded once over the joined track, so it cannot
+    drift from the video.
+    
+    Args:
+        video_files (list): List of video file paths or effect specs
+        audio_file (str): Path to audio file
+        subtitle_file (str): Path to subtitle file, or None
+        output_path (str): Path to save final video
         resolution (tuple): Output video resolution (width, height)
+        temp_dir (str): Temporary directory for the segments
+        fps (int): Output frame rate
+        on_progress (callable, optional): FFmpeg progress listener, called
+            with the combined progress of all segments
+        profile (dict, optional): Encode profile (defaults to 'standard')
+        timeline (dict, optional): Timeline from _plan_timeline()
+        segment_seconds (float): Target segment length
+        post_process (PostProcessChain, optional): Effects on the picture
     
     Returns:
-        str: Path to concatenated video
+        str: Path to final video or None if failed
     """
-    if len(video_files) == 1:
-        # If only one video, just resize it
-        output_path = os.path.join(temp_dir, "concat_video.mp4")
-        subprocess.run([
-            'ffmpeg', '-y', '-i', video_files[0],
-            '-vf', f'scale={resolution[0]}:{resolution[1]}:force_original_aspect_ratio=decrease,pad={resolution[0]}:{resolution[1]}:(ow-iw)/2:(oh-ih)/2',
-            '-c:v', 'libx264', '-preset', 'medium', '-crf', '23',
-            output_path
-        ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        profile = profile or get_profile()
+        timeline = timeline or _plan_timeline(video_files, audio_file)
+        timing = timeline['timing']
+        inputs = _timeline_clips(video_files, timeline)
+        
+        # Span of every input on the concatenated timeline; clips are
+        # resampled to fps, so they last a whole number of frames
+        spans = []
+        position = 0.0
+        for item, outpoint in inputs:
+            frames = max(1, int(round((outpoint or timeline['probes'][_source_path(item)]['duration']) * fps)))
+            spans.append((position, position + frames / fps))
+            position += frames / fps
+        
+        # Two-second GOPs; segments are a whole number of them
+        gop = int(round(fps * 2))
+        segment_frames = max(1, int(round(segment_seconds * fps / gop))) * gop
+        total_frames = int(round(timing['duration'] * fps))
+        ranges = [(first, min(first + segment_frames, total_frames))
+                  for first in range(0, total_frames, segment_frames)]
+        
+        # Timestamps stay absolute in every segment, so the chain is built once
+        post_filter = post_process.video_filter(timing['duration']) if post_process else None
+        encoder_args = video_encoder_args(profile) + ['-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0',
+                                                      '-r', str(fps)]
+        
+        progress_lock = threading.Lock()
+        segment_times = {}
+        
+        def segment_progress(index, progress):
+            with progress_lock:
+                segment_times[index] = progress.get('out_time') or 0.0
+                out_time = sum(segment_times.values())
+            on_progress(dict(progress, step='segments', out_time=out_time, done=False,
+                             fraction=min(1.0, out_time / timing['duration'])))
+        
+        def render_segment(index):
+            # Position of the segment on the concatenated timeline, before retiming
+            start, end = (frame / fps / timing['speed_ratio'] for frame in ranges[index])
+            overlapping = [i for i, (first, last) in enumerate(spans) if last > start and first < end] or [len(spans) - 1]
+            first = max(0, overlapping[0] - 1)
+            last = min(len(spans), overlapping[-1] + 2)
+            
+            filter_complex, video_label, _ = build_composition_graph(
+                last - first, None, resolution, timing, subtitle_file, fps,
+                frame_range=ranges[index], time_offset=spans[first][0], post_filter=post_filter
+            )
+            segment_path = os.path.join(temp_dir, f"segment_{index:04d}.mp4")
+            with FifoGroup() as fifos:
+                ffmpeg_cmd = ['ffmpeg', '-y']
+                for item, outpoint in inputs[first:last]:
+                    ffmpeg_cmd.extend(_input_args(item, fifos, outpoint))
+                ffmpeg_cmd.extend(['-filter_complex', filter_complex, '-map', video_label])
+                ffmpeg_cmd.extend(encoder_args + ['-an', segment_path])
+                run_ffmpeg('segment', ffmpeg_cmd,
+                           (lambda progress: segment_progress(index, progress)) if on_progress else None,
+                           on_start=fifos.start)
+            return segment_path
+        
+        workers = max(1, min(len(ranges), get_supervisor().max_encodes))
+        logger.info(f"Composing {len(inputs)} clips as {len(ranges)} segments of {segment_frames} frames "
+                    f"on {workers} workers ({profile.get('name', 'custom')}, {timing['mode']}, "
+                    f"{timing['duration']:.1f}s)")
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            segments = list(executor.map(in_context(render_segment), range(len(ranges))))
+        
+        concat_file_path = os.path.join(temp_dir, "segments.txt")
+        with open(concat_file_path, 'w') as f:
+            for segment in segments:
+                f.write(f"file '{os.path.abspath(segment)}'\n")
+        
+        _mux_narration(['-f', 'concat', '-safe', '0', '-i', concat_file_path], audio_file, timing,
+                       output_path, profile, 'stitch_segments')
         return output_path
     
-    # For multiple videos, create a concat file
+    except subprocess.CalledProcessError as e:
+        logger.error(f"FFmpeg error: {e.stderr.decode() if e.stderr else str(e)}")
+        return None
+    except Exception as e:
+        logger.error(f"Error in segmented composition: {e}")
+        return None
+
+def _normalize_clip(video_path, output_path, resolution, fps, time_base, profile=None):
+    """
+    Transcode a clip to the shared concat format.
+    
+    Args:
+        video_path (str): Input video path
+        output_path (str): Output video path
+        resolution (tuple): Output video resolution (width, height)
+        fps (int): Output frame rate
+        time_base (str): Target time base such as '1/15360'
+        profile (dict, optional): Encode profile (defaults to 'standard')
+    """
+    timescale = time_base.split('/')[-1]
+    ffmpeg_cmd = [
+        'ffmpeg', '-y', '-i', video_path, '-map', '0:v:0',
+        '-vf', f'scale={resolution[0]}:{resolution[1]}:force_original_aspect_ratio=decrease,pad={resolution[0]}:{resolution[1]}:(ow-iw)/2:(oh-ih)/2,setsar=1',
+        '-r', str(fps)
+    ]
+    ffmpeg_cmd.extend(video_encoder_args(profile or get_profile()))
+    ffmpeg_cmd.extend(['-video_track_timescale', timescale, output_path])
+    run_ffmpeg('normalize_clip', ffmpeg_cmd)
+
+def _concatenate_videos(video_files, temp_dir, resolution, fps=30, profile=None, outpoints=None):
+    """
+    Concatenate multiple video files into one.
+    
+    Clips that already share the target codec, resolution, fps, time base,
+    pixel format and codec configuration are stream-copied; only the
+    others are transcoded. If the transcoded clips come out with another
+    codec configuration, the copied clips are transcoded as well, since
+    the concat demuxer keeps only the first clip's parameter sets.
+    
+    Args:
+        video_files (list): List of video file paths
+        temp_dir (str): Temporary directory for processing
+        resolution (tuple): Output video resolution (width, height)
+        fps (int): Output frame rate
+        profile (dict, optional): Encode profile for transcoded clips
+        outpoints (list, optional): Seconds to keep of each clip, None for
+            the whole clip
+    
+    Returns:
+        str: Path to concatenated video, or None if failed
+    """
     concat_file_path = os.path.join(temp_dir, "concat_list.txt")
-    processed_videos = []
     
     try:
-        # Process each video to consistent format and resolution
-        for i, video_path in enumerate(video_files):
-            processed_path = os.path.join(temp_dir, f"video_{i}.mp4")
-            
-            # Standardize video: resize, set framerate, etc.
-            subprocess.run([
-                'ffmpeg', '-y', '-i', video_path,
-                '-vf', f'scale={resolution[0]}:{resolution[1]}:force_original_aspect_ratio=decrease,pad={resolution[0]}:{resolution[1]}:(ow-iw)/2:(oh-ih)/2',
-                '-r', '30', '-c:v', 'libx264', '-preset', 'medium', '-crf', '23',
-                processed_path
-            ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        probes = probe_videos(video_files)
+        target = _target_signature(probes, resolution, fps)
+        
+        # Process each distinct clip to the shared format if needed
+        normalized = {}
+        for video_path in dict.fromkeys(video_files):
+            probe = probes.get(video_path)
+            if probe and _stream_signature(probe) == target:
+                normalized[video_path] = video_path
+                continue
             
-            processed_videos.append(processed_path)
+            processed_path = os.path.join(temp_dir, f"video_{len(normalized)}.mp4")
+            _normalize_clip(video_path, processed_path, resolution, fps, target[5], profile)
+            normalized[video_path] = processed_path
+        
+        transcoded = [dst for src, dst in normalized.items() if src != dst]
+        if transcoded and len(transcoded) < len(normalized):
+            encoded = _stream_signature(probe_videos(transcoded[:1]).get(transcoded[0], {}))
+            if encoded != target:
+                # Different parameter sets than the copied clips: transcode those too
+                for index, (video_path, output) in enumerate(list(normalized.items())):
+                    if video_path == output:
+                        processed_path = os.path.join(temp_dir, f"video_{index}.mp4")
+                        _normalize_clip(video_path, processed_path, resolution, fps, target[5], profile)
+                        normalized[video_path] = processed_path
+                        transcoded.append(processed_path)
+        
+        logger.info(f"Concatenating {len(video_files)} clips ({len(transcoded)} of {len(normalized)} transcoded)")
+        
+        processed_videos = [normalized[video_path] for video_path in video_files]
+        outpoints = outpoints or [None] * len(processed_videos)
+        if len(processed_videos) == 1 and not outpoints[0]:
+            return processed_videos[0]
         
         # Create concat file
         with open(concat_file_path, 'w') as f:
-            for video in processed_videos:
-                f.write(f"file '{video}'\n")
+            for video, outpoint in zip(processed_videos, outpoints):
+                f.write(f"file '{os.path.abspath(video)}'\n")
+                if outpoint:
+                    f.write(f"outpoint {outpoint:.3f}\n")
         
         # Concatenate videos
         output_path = os.path.join(temp_dir, "concat_video.mp4")
-        subprocess.run([
+        run_ffmpeg('concat', [
             'ffmpeg', '-y', '-f', 'concat', '-safe', '0',
-            '-i', concat_file_path, '-c', 'copy',
+            '-i', concat_file_path, '-map', '0:v', '-c', 'copy',
             output_path
-        ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        ])
         
         return output_path
     
     except Exception as e:
         logger.error(f"Error concatenating videos: {e}")
-        # If concat fails, return the first processed video
-        return processed_videos[0] if processed_videos else None
+        return None
 
-def _add_audio_to_video(video_path, audio_path, temp_dir):
+def _add_audio_to_video(video_path, audio_path, temp_dir, profile=None):
     """
     Add audio to video file.
     
@@ -153,6 +738,8 @@ def _add_audio_to_video(video_path, audio_path, temp_dir):
         video_path (str): Path to video file
         audio_path (str): Path to audio file
         temp_dir (str): Temporary directory for processing
+        profile (dict, optional): Encode profile used when the video has
+            to be re-encoded
     
     Returns:
         str: Path to video with audio
@@ -160,28 +747,18 @@ def _add_audio_to_video(video_path, audio_path, temp_dir):
     output_path = os.path.join(temp_dir, "video_with_audio.mp4")
     
     try:
-        # Get video duration
-        video_duration_cmd = [
-            'ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1', video_path
-        ]
-        video_duration = float(subprocess.check_output(video_duration_cmd).decode('utf-8').strip())
-        
-        # Get audio duration
-        audio_duration_cmd = [
-            'ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1', audio_path
-        ]
-        audio_duration = float(subprocess.check_output(audio_duration_cmd).decode('utf-8').strip())
+        # Get video and audio durations
+        video_duration = _probe_duration(video_path)
+        audio_duration = _probe_duration(audio_path)
         
         # Choose appropriate method based on duration comparison
         if abs(video_duration - audio_duration) < 2.0:
             # Durations are close enough, simple merge
-            subprocess.run([
+            run_ffmpeg('merge_audio', [
                 'ffmpeg', '-y', '-i', video_path, '-i', audio_path,
                 '-map', '0:v', '-map', '1:a', '-c:v', 'copy',
                 '-shortest', output_path
-            ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            ])
         
         elif video_duration > audio_duration:
             # Video is longer, loop audio or extend with silence
@@ -189,24 +766,24 @@ def _add_audio_to_video(video_path, audio_path, temp_dir):
             
             if audio_duration < video_duration / 2:
                 # Loop audio if it's significantly shorter
-                subprocess.run([
+                run_ffmpeg('loop_audio', [
                     'ffmpeg', '-y', '-stream_loop', '-1', '-i', audio_path,
                     '-t', str(video_duration), '-c', 'copy', temp_audio
-                ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                ])
             else:
                 # Add silence to the end
-                subprocess.run([
+                run_ffmpeg('pad_audio', [
                     'ffmpeg', '-y', '-i', audio_path,
                     '-af', f'apad=pad_dur={video_duration-audio_duration}',
                     temp_audio
-                ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                ])
             
             # Merge video with extended audio
-            subprocess.run([
+            run_ffmpeg('merge_audio', [
                 'ffmpeg', '-y', '-i', video_path, '-i', temp_audio,
                 '-map', '0:v', '-map', '1:a', '-c:v', 'copy',
                 '-shortest', output_path
-            ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            ])
         
         else:
             # Audio is longer, speed up or trim video
@@ -214,12 +791,11 @@ def _add_audio_to_video(video_path, audio_path, temp_dir):
             
             if speed_ratio < 1.5:
                 # Slow down video slightly
-                subprocess.run([
+                run_ffmpeg('retime', [
                     'ffmpeg', '-y', '-i', video_path, '-i', audio_path,
                     '-filter_complex', f'[0:v]setpts={speed_ratio}*PTS[v]',
-                    '-map', '[v]', '-map', '1:a', '-c:a', 'copy',
-                    output_path
-                ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                    '-map', '[v]', '-map', '1:a', '-c:a', 'copy'
+                ] + video_encoder_args(profile or get_profile()) + [output_path])
             else:
                 # Loop video content to match audio duration
                 temp_video = os.path.join(temp_dir, "looped_video.mp4")
@@ -234,17 +810,17 @@ def _add_audio_to_video(video_path, audio_path, temp_dir):
                         f.write(f"file '{video_path}'\n")
                 
                 # Create looped video
-                subprocess.run([
+                run_ffmpeg('loop_video', [
                     'ffmpeg', '-y', '-f', 'concat', '-safe', '0',
                     '-i', loop_file, '-c', 'copy', temp_video
-                ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                ])
                 
                 # Merge looped video with audio
-                subprocess.run([
+                run_ffmpeg('merge_audio', [
                     'ffmpeg', '-y', '-i', temp_video, '-i', audio_path,
                     '-map', '0:v', '-map', '1:a', '-c:v', 'copy',
                     '-shortest', output_path
-                ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                ])
         
         return output_path
     
@@ -252,7 +828,7 @@ def _add_audio_to_video(video_path, audio_path, temp_dir):
         logger.error(f"Error adding audio to video: {e}")
         return video_path  # Return original video on error
 
-def _add_subtitles_to_video(video_path, subtitle_path, output_path):
+def _add_subtitles_to_video(video_path, subtitle_path, output_path, profile=None, post_process=None):
     """
     Add subtitles to video file.
     
@@ -260,20 +836,25 @@ def _add_subtitles_to_video(video_path, subtitle_path, output_path):
         video_path (str): Path to video file
         subtitle_path (str): Path to subtitle file
         output_path (str): Path to save final video
+        profile (dict, optional): Encode profile (defaults to 'standard')
+        post_process (PostProcessChain, optional): Effects applied in the
+            same encode
     
     Returns:
         str: Path to video with subtitles
     """
     try:
-        # Configure subtitle style
-        subtitle_style = "FontName=Arial,FontSize=24,PrimaryColour=&H00FFFFFF,OutlineColour=&H00000000,BackColour=&H80000000,Bold=1,Italic=0,Alignment=2"
+        video_filter = subtitle_filter(subtitle_path)
+        post_filter = post_process.video_filter(_probe_duration(video_path)) if post_process else None
+        if post_filter:
+            video_filter += f",{post_filter}"
         
         # Add subtitles
-        subprocess.run([
+        run_ffmpeg('burn_subtitles', [
             'ffmpeg', '-y', '-i', video_path,
-            '-vf', f"subtitles={subtitle_path}:force_style='{subtitle_style}'",
-            '-c:a', 'copy', output_path
-        ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            '-vf', video_filter,
+            '-c:a', 'copy'
+        ] + video_encoder_args(profile or get_profile()) + [output_path])
         
         return output_path
     
@@ -288,10 +869,53 @@ def _add_subtitles_to_video(video_path, subtitle_path, output_path):
         except:
             return video_path
 
+def _deliver_subtitles(video_path, subtitle_path, output_path, mode):
+    """
+    Add subtitles without re-encoding the picture.
+    
+    'soft' remuxes the video with the subtitles as a text stream (mov_text
+    in MP4/MOV, SRT otherwise), stream-copying video and audio. 'sidecar'
+    writes a WebVTT file named after the output next to it.
+    
+    Args:
+        video_path (str): Path to composed video
+        subtitle_path (str): Path to subtitle file
+        output_path (str): Path to save final video
+        mode (str): 'soft' or 'sidecar'
+    
+    Returns:
+        str: Path to final video
+    """
+    try:
+        if mode == 'sidecar':
+            sidecar_path = os.path.splitext(output_path)[0] + '.vtt'
+            run_ffmpeg('subtitle_sidecar', ['ffmpeg', '-y', '-i', subtitle_path, sidecar_path])
+            logger.info(f"Wrote subtitle sidecar: {sidecar_path}")
+        else:
+            codec = 'mov_text' if os.path.splitext(output_path)[1].lower() in ('.mp4', '.m4v', '.mov') else 'srt'
+            run_ffmpeg('soft_subtitles', [
+                'ffmpeg', '-y', '-i', video_path, '-i', subtitle_path,
+                '-map', '0:v', '-map', '0:a?', '-map', '1:s',
+                '-c:v', 'copy', '-c:a', 'copy', '-c:s', codec,
+                '-movflags', '+faststart', output_path
+            ])
+            return output_path
+    
+    except Exception as e:
+        logger.error(f"Error adding subtitles: {e}")
+    
+    # Sidecar subtitles, or a failed remux, leave the video as composed
+    if video_path != output_path:
+        shutil.copyfile(video_path, output_path)
+    return output_path
+
 def add_transition_effects(video_path, output_path=None, effect_type="fade"):
     """
     Add transition effects between scenes in a video.
     
+    This re-encodes the whole video; to add effects while composing, pass
+    a PostProcessChain to compose_final_video() instead.
+    
     Args:
         video_path (str): Path to video file
         output_path (str, optional): Path to save processed video
@@ -309,24 +933,18 @@ def add_transition_effects(video_path, output_path=None, effect_type="fade"):
         os.makedirs(output_dir, exist_ok=True)
         output_path = os.path.join(output_dir, f"transition_{os.path.basename(video_path)}")
     
+    # Different transition effects
+    chain = PostProcessChain()
+    if effect_type == "fade":
+        # Fade in and out over the first and last second
+        chain.fade()
+    elif effect_type == "wipe":
+        chain.wipe()
+    
     try:
-        # Different transition effects
-        if effect_type == "fade":
-            # Add fade in/out transitions
-            subprocess.run([
-                'ffmpeg', '-y', '-i', video_path,
-                '-vf', 'fade=t=in:st=0:d=1,fade=t=out:st=9:d=1',
-                '-c:a', 'copy', output_path
-            ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        
-        elif effect_type == "wipe":
-            # Add wipe transition effect
-            subprocess.run([
-                'ffmpeg', '-y', '-i', video_path,
-                '-vf', 'geq=lum=\'p(X,Y)\':a=\'st(1,pow(min(W/W,H/H),2)*(X/W-T/3)*(X/W-T/3)+(Y/H-0.5)*(Y/H-0.5));if(ld(1)>0.1*(T-3)*(T-3)+0.01,255,0)\'',
-                '-c:a', 'copy', output_path
-            ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        
+        if chain:
+            if not chain.apply(video_path, output_path, step=effect_type):
+                raise Exception(f"FFmpeg {effect_type} failed")
         else:
             # Default: simple copy
             with open(video_path, 'rb') as src, open(output_path, 'wb') as dst:
@@ -343,6 +961,9 @@ def add_watermark(video_path, watermark_text, output_path=None):
     """
     Add watermark text to video.
     
+    This re-encodes the whole video; to add a watermark while composing,
+    pass a PostProcessChain to compose_final_video() instead.
+    
     Args:
         video_path (str): Path to video file
         watermark_text (str): Text to use as watermark
@@ -362,11 +983,8 @@ def add_watermark(video_path, watermark_text, output_path=None):
     
     try:
         # Add watermark text
-        subprocess.run([
-            'ffmpeg', '-y', '-i', video_path,
-            '-vf', f"drawtext=text='{watermark_text}':x=W-tw-10:y=H-th-10:fontsize=24:fontcolor=white@0.5:box=1:boxcolor=black@0.2",
-            '-c:a', 'copy', output_path
-        ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if not PostProcessChain().watermark(watermark_text).apply(video_path, output_path, step='watermark'):
+            raise Exception("FFmpeg watermark failed")
         
         logger.info(f"Added watermark to video, saved to {output_path}")
         return output_path
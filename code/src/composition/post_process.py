@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Post-processing effects folded into an existing encode.
+
+Fades, watermarks and text overlays are registered as video filter
+fragments on a PostProcessChain. The composer appends the chain to the
+filter graph of the encode it runs anyway, so any number of effects
+costs no extra decode or encode.
+"""
+
+import logging
+import subprocess
+from src.composition.filter_graph import escape_filter_text
+from src.composition.encode_profiles import get_profile, video_encoder_args
+from src.video.media_probe import get_media_duration
+from utils.ffmpeg_runner import run_ffmpeg
+
+logger = logging.getLogger(__name__)
+
+# drawtext options of the default watermark
+WATERMARK_STYLE = {
+    'x': 'W-tw-10',
+    'y': 'H-th-10',
+    'fontsize': 24,
+    'fontcolor': 'white@0.5',
+    'box': 1,
+    'boxcolor': 'black@0.2'
+}
+
+# Wipe driven by the frame time, as a geq luma/alpha expression
+WIPE_FILTER = ("geq=lum='p(X,Y)':a='st(1,pow(min(W/W,H/H),2)*(X/W-T/3)*(X/W-T/3)+(Y/H-0.5)*(Y/H-0.5));"
+               "if(ld(1)>0.1*(T-3)*(T-3)+0.01,255,0)'")
+
+class PostProcessChain:
+    """Ordered video filter fragments applied to the finished picture."""
+
+    def __init__(self):
+        """Initialize an empty chain."""
+        self.fragments = []
+
+    def __len__(self):
+        return len(self.fragments)
+
+    def add(self, name, fragment):
+        """
+        Register a filter fragment.
+
+        Args:
+            name (str): Effect name for logging
+            fragment (str or callable): Filter chain, or a function taking the
+                output duration in seconds and returning one
+
+        Returns:
+            PostProcessChain: This chain, for chaining calls
+        """
+        self.fragments.append((name, fragment))
+        return self
+
+    def fade(self, fade_in=1.0, fade_out=1.0):
+        """
+        Fade the picture in from and out to black.
+
+        Args:
+            fade_in (float): Fade-in length in seconds, 0 to skip
+            fade_out (float): Fade-out length in seconds, 0 to skip
+
+        Returns:
+            PostProcessChain: This chain
+        """
+        def fragment(duration):
+            fades = []
+            if fade_in:
+                fades.append(f"fade=t=in:st=0:d={fade_in:.3f}")
+            if fade_out:
+                fades.append(f"fade=t=out:st={max(0.0, duration - fade_out):.3f}:d={fade_out:.3f}")
+            return ",".join(fades)
+        return self.add('fade', fragment)
+
+    def wipe(self):
+        """
+        Add the wipe transition.
+
+        Returns:
+            PostProcessChain: This chain
+        """
+        return self.add('wipe', WIPE_FILTER)
+
+    def drawtext(self, text, start=None, end=None, **options):
+        """
+        Overlay text.
+
+        Args:
+            text (str): Text to draw, taken literally
+            start (float, optional): Time in seconds to show the text from
+            end (float, optional): Time in seconds to hide the text at
+            **options: Other drawtext options, e.g. x, y, fontsize, fontcolor
+
+        Returns:
+            PostProcessChain: This chain
+        """
+        settings = dict(options, text=escape_filter_text(text), expansion='none')
+        if start is not None or end is not None:
+            settings['enable'] = escape_filter_text(f"between(t,{start or 0},{end if end is not None else 1e9})")
+        return self.add('drawtext', "drawtext=" + ":".join(f"{key}={value}" for key, value in settings.items()))
+
+    def watermark(self, text, **options):
+        """
+        Overlay a translucent watermark in the bottom right corner.
+
+        Args:
+            text (str): Watermark text
+            **options: drawtext options replacing WATERMARK_STYLE
+
+        Returns:
+            PostProcessChain: This chain
+        """
+        return self.drawtext(text, **dict(WATERMARK_STYLE, **options))
+
+    def video_filter(self, duration):
+        """
+        Build the filter chain for an output of the given length.
+
+        Args:
+            duration (float): Output duration in seconds
+
+        Returns:
+            str: Filter chain, or None for an empty chain
+        """
+        chains = [fragment(duration) if callable(fragment) else fragment for _, fragment in self.fragments]
+        return ",".join(chain for chain in chains if chain) or None
+
+    def names(self):
+        """Names of the registered effects, in order."""
+        return [name for name, _ in self.fragments]
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Build a chain from settings.
+
+        Args:
+            config (dict): Settings with optional 'fade' (seconds), 'wipe'
+                (bool) and 'watermark' (text)
+
+        Returns:
+            PostProcessChain: Chain, empty when config is empty
+        """
+        chain = cls()
+        config = config or {}
+        if config.get('fade'):
+            chain.fade(config['fade'], config['fade'])
+        if config.get('wipe'):
+            chain.wipe()
+        if config.get('watermark'):
+            chain.watermark(config['watermark'])
+        return chain
+
+    def apply(self, video_path, output_path, step='post_process', profile=None):
+        """
+        Apply the chain to a finished video in a single encode.
+
+        For videos that are still being composed, pass the chain to
+        compose_final_video() instead, which needs no encode of its own.
+
+        Args:
+            video_path (str): Path to video file
+            output_path (str): Path to save processed video
+            step (str): Step name for metrics and tracing
+            profile (dict, optional): Encode profile (defaults to 'standard')
+
+        Returns:
+            str: Path to processed video or None if failed
+        """
+        try:
+            duration = get_media_duration(video_path)
+            if duration is None:
+                raise ValueError(f"Could not determine duration of {video_path}")
+            ffmpeg_cmd = ['ffmpeg', '-y', '-i', video_path]
+            video_filter = self.video_filter(duration)
+            if video_filter:
+                ffmpeg_cmd.extend(['-vf', video_filter])
+            ffmpeg_cmd.extend(video_encoder_args(profile or get_profile()))
+            ffmpeg_cmd.extend(['-c:a', 'copy', '-movflags', '+faststart', output_path])
+            run_ffmpeg(step, ffmpeg_cmd, duration=duration)
+            return output_path
+
+        except subprocess.CalledProcessError as e:
+            logger.error(f"FFmpeg error: {e.stderr.decode() if e.stderr else str(e)}")
+            return None
+        except Exception as e:
+            logger.error(f"Error applying {', '.join(self.names())}: {e}")
+            return None
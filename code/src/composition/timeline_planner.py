@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Plans which clips fill the narration and where the last one is cut.
+
+Clips are taken in ranking order until the narration is covered, and the
+ranking is repeated from the top when the clips are too short. The last
+clip is cut at its first keyframe past the end of the narration when its
+keyframe spacing is known, exactly otherwise. The visual track then
+matches the narration without looping or retiming the video.
+"""
+
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Timing slack in seconds, well below one frame
+EPSILON = 0.001
+
+def plan_clips(durations, target_duration, keyframe_intervals=None):
+    """
+    Choose clips covering a target duration.
+
+    Args:
+        durations (list): Clip durations in seconds, in ranking order
+        target_duration (float): Duration to cover in seconds
+        keyframe_intervals (list, optional): Seconds between keyframes of
+            each clip, or None where unknown
+
+    Returns:
+        list: (clip index, out point in seconds or None for the whole clip)
+            tuples in timeline order, or None if the durations are unusable
+    """
+    if not durations or not target_duration or target_duration <= 0 or \
+            any(not duration or duration <= 0 for duration in durations):
+        return None
+
+    keyframe_intervals = keyframe_intervals or [None] * len(durations)
+    clips = []
+    position = 0.0
+    while position < target_duration - EPSILON:
+        index = len(clips) % len(durations)
+        duration = durations[index]
+        remaining = target_duration - position
+        if duration <= remaining + EPSILON:
+            clips.append((index, None))
+            position += duration
+            continue
+
+        outpoint = remaining
+        interval = keyframe_intervals[index]
+        if interval:
+            outpoint = min(duration, math.ceil(remaining / interval - EPSILON) * interval)
+        clips.append((index, outpoint if outpoint < duration - EPSILON else None))
+        position += outpoint
+
+    logger.info(f"Planned {len(clips)} clips from {len(durations)} candidates to cover {target_duration:.1f}s")
+    return clips
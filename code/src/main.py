@@ -17,15 +17,12 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from src.input.user_input import get_user_input
 from src.input.label_manager import process_label_selection
 from src.input.prompt_parser import process_custom_prompt
-from src.ai.model_connector import get_ai_model
-from src.ai.text_generator import generate_text
 from src.ai.semantic_matcher import match_videos
 from src.video.video_processor import process_videos
 from src.video.hypnotic_effects import apply_hypnotic_effects
-from src.audio.speech_synthesis import generate_speech
-from src.subtitles.subtitle_generator import generate_subtitles
-from src.composition.final_composer import compose_final_video
+from src.pipeline.workflow import run_prompt_workflow
 from utils.logger import setup_logger
+from utils.tracing import trace, span, save_trace
 
 # Setup logging
 logger = setup_logger(__name__)
@@ -55,47 +52,40 @@ def main():
     input_type, input_content = get_user_input()
     
     # Process based on input type
-    if input_type == "label":
-        # Label-based workflow
-        selected_labels = process_label_selection(input_content, video_categories)
-        video_files = process_videos(selected_labels)
-        similarity_scores = match_videos(input_content, video_files)
-        selected_videos = [v for v, s in similarity_scores if s > app_config['similarity_threshold']]
-        hypnotic_videos = apply_hypnotic_effects(selected_videos)
-        
-    elif input_type == "prompt":
-        # Free-form prompt workflow
-        processed_prompt = process_custom_prompt(input_content)
-        
-        # Get AI model based on config
-        ai_model = get_ai_model(models_config['default_model'])
-        
-        # Generate text content
-        text_content = generate_text(ai_model, processed_prompt, 
-                                      max_length=models_config['max_text_length'])
-        
-        print(text_content)
-        # Generate speech from text
-        audio_file = generate_speech(text_content)
-        
-        # Generate subtitles
-        subtitle_file = generate_subtitles(text_content)
-        
-        # Match videos based on semantic similarity
-        video_files = process_videos(None)  # Get all videos
-        similarity_scores = match_videos(processed_prompt, video_files)
-        selected_videos = [v for v, s in similarity_scores if s > app_config['similarity_threshold']]
-        hypnotic_videos = apply_hypnotic_effects(selected_videos)
-        
-        # Compose final video
-        output_path = os.path.join('data', 'output', f"generated_video_{os.getpid()}.mp4")
-        compose_final_video(hypnotic_videos, audio_file, subtitle_file, output_path)
-        
-        logger.info(f"Video generation complete. Output saved to: {output_path}")
-    
-    else:
-        logger.error(f"Unknown input type: {input_type}")
-        return
+    trace_path = os.path.join('data', 'output', 'traces', f"trace_{os.getpid()}.json")
+    with trace(f"{input_type}_{os.getpid()}") as active:
+        try:
+            if input_type == "label":
+                # Label-based workflow
+                selected_labels = process_label_selection(input_content, video_categories)
+                with span('stage.videos'):
+                    video_files = process_videos(selected_labels)
+                with span('stage.matches'):
+                    similarity_scores = match_videos(input_content, video_files)
+                    selected_videos = [v for v, s in similarity_scores if s > app_config['video']['similarity_threshold']]
+                with span('stage.effects'):
+                    hypnotic_videos = apply_hypnotic_effects(selected_videos,
+                                                             max_workers=app_config['processing']['max_workers'],
+                                                             cpu_budget=app_config['processing'].get('cpu_budget'))
+                
+            elif input_type == "prompt":
+                # Free-form prompt workflow
+                processed_prompt = process_custom_prompt(input_content)
+                
+                # Run generation stages as a DAG so independent branches overlap
+                output_path = os.path.join('data', 'output', f"generated_video_{os.getpid()}.mp4")
+                results = run_prompt_workflow(processed_prompt, app_config, models_config, output_path)
+                if 'compose' not in results:
+                    logger.error("Video generation failed")
+                    return
+                
+                logger.info(f"Video generation complete. Output saved to: {output_path}")
+            
+            else:
+                logger.error(f"Unknown input type: {input_type}")
+                return
+        finally:
+            save_trace(active, trace_path)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
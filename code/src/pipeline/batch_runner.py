@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Runs many prompt-to-video jobs from a JSONL or CSV file in one process.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.input.label_manager import process_label_selection
+from src.input.prompt_parser import process_custom_prompt
+from src.ai.model_connector import get_ai_model
+from src.ai.semantic_matcher import get_matcher
+from src.pipeline.workflow import run_prompt_workflow
+from utils.db_connector import DatabaseConnector
+from utils.tracing import trace, save_trace
+from utils.process_supervisor import job_scope
+
+logger = logging.getLogger(__name__)
+
+# Default number of concurrent calls per stage type
+DEFAULT_STAGE_LIMITS = {'llm': 4, 'tts': 2, 'ffmpeg': 1}
+
+def load_jobs(jobs_path):
+    """
+    Read batch jobs from a JSONL or CSV file.
+    
+    Each job has either a 'prompt' or a 'labels' field, plus an optional
+    'id', 'output_path', 'cpu_budget' (FFmpeg threads per process),
+    'profile' (encode profile name), 'preview' (render a quick preview
+    first) and 'subtitle_mode' ('burn', 'soft' or 'sidecar'). In CSV files
+    labels are separated by ';'.
+    
+    Args:
+        jobs_path (str): Path to .jsonl or .csv file
+    
+    Returns:
+        list: List of job dictionaries
+    """
+    jobs = []
+    
+    with open(jobs_path, 'r', encoding='utf-8', newline='') as f:
+        if jobs_path.lower().endswith('.csv'):
+            rows = list(csv.DictReader(f))
+            for row in rows:
+                if row.get('labels'):
+                    row['labels'] = [label.strip() for label in row['labels'].split(';') if label.strip()]
+        else:
+            rows = []
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    logger.error(f"Skipping invalid job on line {line_number}: {e}")
+    
+    for i, row in enumerate(rows, 1):
+        if not row.get('prompt') and not row.get('labels'):
+            logger.error(f"Skipping job {row.get('id') or i}: no prompt or labels")
+            continue
+        row['id'] = str(row.get('id') or i)
+        jobs.append(row)
+    
+    logger.info(f"Loaded {len(jobs)} jobs from {jobs_path}")
+    return jobs
+
+class BatchRunner:
+    """Runs generation jobs concurrently while sharing loaded state."""
+    
+    def __init__(self, app_config, models_config, video_categories, job_workers=2,
+                 stage_limits=None, output_dir=None):
+        """
+        Initialize batch runner.
+        
+        Args:
+            app_config (dict): Application settings
+            models_config (dict): Model settings
+            video_categories (list): Video category configuration
+            job_workers (int): Number of jobs in flight at once
+            stage_limits (dict, optional): Concurrent calls allowed per
+                stage type ('llm', 'tts', 'ffmpeg')
+            output_dir (str, optional): Directory for job outputs
+        """
+        self.app_config = app_config
+        self.models_config = models_config
+        self.video_categories = video_categories
+        self.job_workers = max(1, job_workers)
+        self.output_dir = output_dir or os.path.join('data', 'output', 'batch')
+        DatabaseConnector().initialize_database()
+        
+        limits = dict(DEFAULT_STAGE_LIMITS, **(stage_limits or {}))
+        self.limits = {name: threading.BoundedSemaphore(max(1, count)) for name, count in limits.items()}
+        
+        # Created once and shared by every job
+        self.ai_model = get_ai_model(models_config['default_model'])
+        get_matcher().refresh()
+    
+    def run_job(self, job, on_event=None):
+        """
+        Run one job and record it in generated_content.
+        
+        Args:
+            job (dict): Job from load_jobs()
+            on_event (callable, optional): Stage progress listener, see
+                PipelineExecutor
+        
+        Returns:
+            dict: Job result with 'id', 'status', 'output_path' and 'error'
+        """
+        job_id = job['id']
+        work_dir = os.path.join(self.output_dir, job_id)
+        output_path = job.get('output_path') or os.path.join(work_dir, f"{job_id}.mp4")
+        os.makedirs(work_dir, exist_ok=True)
+        start_time = time.perf_counter()
+        
+        selected_labels = None
+        if job.get('labels'):
+            input_type, content = 'label', list(job['labels'])
+            selected_labels = process_label_selection(content, self.video_categories)
+            prompt = process_custom_prompt(job.get('prompt') or " ".join(content))
+        else:
+            input_type, content = 'prompt', job['prompt']
+            prompt = process_custom_prompt(content)
+        
+        # Connectors hold their connection on the instance, so each job gets its own
+        db = DatabaseConnector()
+        input_id = db.save_user_input(input_type, content)
+        
+        cpu_budget = int(job['cpu_budget']) if job.get('cpu_budget') else None
+        preview = str(job['preview']).lower() in ('1', 'true', 'yes') if job.get('preview') else None
+        with trace(job_id) as active, job_scope(job_id, cpu_budget):
+            try:
+                results = run_prompt_workflow(prompt, self.app_config, self.models_config, output_path,
+                                              ai_model=self.ai_model, selected_labels=selected_labels,
+                                              work_dir=work_dir, limits=self.limits, on_event=on_event,
+                                              profile=job.get('profile') or None, preview=preview,
+                                              subtitle_mode=job.get('subtitle_mode') or None)
+                error = None if 'compose' in results else "Video generation failed"
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {e}")
+                results, error = {}, str(e)
+        save_trace(active, os.path.join(work_dir, 'trace.json'))
+        
+        if input_id is not None:
+            effects = results.get('effects')
+            db.save_generated_content(
+                input_id,
+                text_content=results.get('text'),
+                video_path=json.dumps(effects) if effects else None,
+                audio_path=results.get('speech'),
+                subtitle_path=results.get('subtitles'),
+                output_path=results.get('compose')
+            )
+        
+        elapsed = time.perf_counter() - start_time
+        status = 'failed' if error else 'done'
+        logger.info(f"Job {job_id} {status} in {elapsed:.1f}s")
+        return {
+            'id': job_id,
+            'status': status,
+            'output_path': results.get('compose'),
+            'error': error,
+            'seconds': round(elapsed, 2)
+        }
+    
+    def run(self, jobs):
+        """
+        Run all jobs on the job worker pool.
+        
+        Args:
+            jobs (list): Jobs from load_jobs()
+        
+        Returns:
+            list: Job results in input order
+        """
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.job_workers) as executor:
+            results = list(executor.map(self.run_job, jobs))
+        
+        done = sum(1 for result in results if result['status'] == 'done')
+        logger.info(f"Batch finished in {time.perf_counter() - start_time:.1f}s: "
+                    f"{done} done, {len(results) - done} failed")
+        return results
+
+def load_config(config_path):
+    """Load configuration from JSON file."""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Generate videos for a batch of prompts")
+    parser.add_argument("jobs", help="JSONL or CSV file with one job per line")
+    parser.add_argument("--workers", "-w", type=int, help="Jobs in flight at once")
+    parser.add_argument("--output-dir", "-o", help="Directory for job outputs")
+    parser.add_argument("--results", "-r", help="Write job results to this JSONL file")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    app_config = load_config('config/app_settings.json')
+    models_config = load_config('config/models.json')
+    video_categories = load_config('config/video_categories.json')
+    batch_config = app_config.get('processing', {}).get('batch', {})
+    
+    runner = BatchRunner(app_config, models_config, video_categories,
+                         job_workers=args.workers or batch_config.get('job_workers', 2),
+                         stage_limits=batch_config.get('stage_limits'),
+                         output_dir=args.output_dir)
+    results = runner.run(load_jobs(args.jobs))
+    
+    if args.results:
+        with open(args.results, 'w', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(result) + '\n')
+    
+    return 0 if all(result['status'] == 'done' for result in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Runs workflow stages as a dependency DAG on a thread pool.
+"""
+
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utils.tracing import span, in_context
+
+logger = logging.getLogger(__name__)
+
+class PipelineExecutor:
+    """Executes stages as soon as all of their dependencies have finished."""
+    
+    def __init__(self, max_workers=4, manifest=None, on_event=None):
+        """
+        Initialize pipeline executor.
+        
+        Args:
+            max_workers (int): Maximum number of stages running at once
+            manifest (StageManifest, optional): Checkpoints for resuming
+                stages that declare their inputs
+            on_event (callable, optional): Called as on_event(stage, status,
+                detail) when a stage starts, finishes, fails or is skipped
+        """
+        self.max_workers = max_workers
+        self.manifest = manifest
+        self.on_event = on_event
+        self.reused = []
+        self.stages = {}
+        self.results = {}
+        self.failed = {}
+        self.timings = {}
+    
+    def add_stage(self, name, func, depends_on=(), checkpoint=None):
+        """
+        Register a stage.
+        
+        Args:
+            name (str): Unique stage name
+            func (callable): Called with the results dict of finished stages;
+                its return value becomes this stage's result
+            depends_on (tuple): Names of stages that must finish first
+            checkpoint (callable, optional): Called with the results dict to
+                get the stage's (inputs, params); when given and a manifest
+                is set, a recorded output for the same inputs is reused
+        
+        Returns:
+            PipelineExecutor: self, for chaining
+        """
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        for dep in depends_on:
+            if dep not in self.stages:
+                raise ValueError(f"Stage {name} depends on unknown stage {dep}")
+        self.stages[name] = (func, tuple(depends_on), checkpoint)
+        return self
+    
+    def _emit(self, name, status, detail=None):
+        """Report a stage event, never letting a listener break the run."""
+        if self.on_event:
+            try:
+                self.on_event(name, status, detail)
+            except Exception as e:
+                logger.warning(f"Stage event listener failed: {e}")
+    
+    def _run_stage(self, name, func, checkpoint=None):
+        """Run one stage, or reuse its checkpoint, and record its wall-clock time."""
+        start = time.perf_counter()
+        try:
+            with span(f"stage.{name}") as attributes:
+                if not (self.manifest and checkpoint):
+                    return func(self.results)
+                
+                inputs, params = checkpoint(self.results)
+                key = self.manifest.make_key(name, inputs, params)
+                hit, output = self.manifest.lookup(name, key)
+                attributes['reused'] = hit
+                if hit:
+                    self.reused.append(name)
+                    logger.info(f"Reusing checkpointed output of stage {name}")
+                    return output
+                
+                output = func(self.results)
+                self.manifest.record(name, key, output)
+                return output
+        finally:
+            self.timings[name] = time.perf_counter() - start
+    
+    def run(self):
+        """
+        Run all stages.
+        
+        A failing stage is recorded in self.failed and every stage that
+        depends on it is skipped; independent branches keep running.
+        
+        Returns:
+            dict: Mapping of stage name to result for completed stages
+        """
+        remaining = dict(self.stages)
+        running = {}
+        start = time.perf_counter()
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while remaining or running:
+                # Skip stages whose dependencies failed
+                for name, (_, deps, _) in list(remaining.items()):
+                    if any(dep in self.failed for dep in deps):
+                        self.failed[name] = "skipped, dependency failed"
+                        del remaining[name]
+                        logger.warning(f"Skipping stage {name}: dependency failed")
+                        self._emit(name, 'skipped')
+                
+                # Start every stage whose dependencies are done
+                for name, (func, deps, checkpoint) in list(remaining.items()):
+                    if all(dep in self.results for dep in deps):
+                        running[executor.submit(in_context(self._run_stage), name, func, checkpoint)] = name
+                        del remaining[name]
+                        logger.info(f"Started stage {name}")
+                        self._emit(name, 'started')
+                
+                if not running:
+                    break
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                        logger.info(f"Finished stage {name} in {self.timings.get(name, 0):.2f}s")
+                        self._emit(name, 'reused' if name in self.reused else 'finished',
+                                   {'seconds': round(self.timings.get(name, 0), 3)})
+                    except Exception as e:
+                        self.failed[name] = str(e)
+                        logger.error(f"Stage {name} failed: {e}")
+                        self._emit(name, 'failed', {'error': str(e)})
+        
+        logger.info(f"Pipeline finished in {time.perf_counter() - start:.2f}s "
+                    f"({len(self.results)} stages done, {len(self.reused)} reused, {len(self.failed)} failed)")
+        return self.results
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Worker processes that drain the SQLite render job queue.
+"""
+
+import os
+import sys
+import time
+import socket
+import logging
+import argparse
+import threading
+import multiprocessing
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from utils.db_connector import DatabaseConnector
+from utils.process_supervisor import get_supervisor
+
+logger = logging.getLogger(__name__)
+
+# Seconds between lease renewals after a failed database call
+HEARTBEAT_RETRY_SECONDS = 1.0
+
+class JobWorker:
+    """Claims queued jobs, keeps their leases alive and records the outcome."""
+    
+    def __init__(self, runner, worker_id=None, lease_seconds=60, poll_interval=2.0,
+                 retry_base_delay=30, retry_max_delay=1800, db_path=None):
+        """
+        Initialize job worker.
+        
+        Args:
+            runner (BatchRunner): Runner executing claimed jobs
+            worker_id (str, optional): Unique worker name (defaults to host:pid)
+            lease_seconds (float): Lease length, renewed every third of it
+            poll_interval (float): Seconds to sleep when the queue is empty
+            retry_base_delay (float): Backoff before the first retry
+            retry_max_delay (float): Upper bound on the retry backoff
+            db_path (str, optional): Path to SQLite database file
+        """
+        self.runner = runner
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.db_path = db_path
+        self._stop = threading.Event()
+    
+    def _db(self):
+        """Get a fresh connector; connectors are not shared between threads."""
+        return DatabaseConnector(self.db_path)
+    
+    def _retry_delay(self, attempts):
+        """Exponential backoff for the given attempt number."""
+        return min(self.retry_max_delay, self.retry_base_delay * 2 ** max(0, attempts - 1))
+    
+    def _keep_lease(self, job_id, run_id, done, lost):
+        """
+        Renew the lease until the job finishes or the lease is lost.
+        
+        A lost lease means the job may already be running elsewhere, so its
+        FFmpeg processes here are killed rather than left to finish. Renewals
+        that fail on a database error are retried until the lease expires.
+        """
+        expires = time.monotonic() + self.lease_seconds
+        interval = self.lease_seconds / 3
+        while not done.wait(interval):
+            renewed = self._db().heartbeat_job(job_id, self.worker_id, self.lease_seconds)
+            if renewed:
+                expires = time.monotonic() + self.lease_seconds
+                interval = self.lease_seconds / 3
+                continue
+            if renewed is None and time.monotonic() < expires:
+                # Still ours until it expires; the database may only be busy
+                interval = min(self.lease_seconds / 3, HEARTBEAT_RETRY_SECONDS)
+                continue
+            logger.warning(f"Worker {self.worker_id} lost the lease on job {job_id}, cancelling it")
+            lost.set()
+            get_supervisor().cancel_job(run_id)
+            return
+    
+    def run_one(self):
+        """
+        Claim and run a single job.
+        
+        Returns:
+            bool: True if a job was claimed
+        """
+        job = self._db().claim_job(self.worker_id, self.lease_seconds)
+        if not job:
+            return False
+        
+        job_id = job['id']
+        # Ids from job files restart at 1 in every file; the queue row id is
+        # unique, so work_dir, output and manifest are keyed by it
+        payload = dict(job['payload'], id=f"job{job_id}")
+        logger.info(f"Worker {self.worker_id} running job {job_id} ({job['payload'].get('id')}, "
+                    f"attempt {job['attempts']})")
+        
+        done, lost = threading.Event(), threading.Event()
+        heartbeat = threading.Thread(target=self._keep_lease, args=(job_id, payload['id'], done, lost),
+                                     daemon=True)
+        heartbeat.start()
+        try:
+            result = self.runner.run_job(payload)
+        except Exception as e:
+            logger.error(f"Job {job_id} raised: {e}")
+            result = {'status': 'failed', 'error': str(e)}
+        finally:
+            done.set()
+            heartbeat.join()
+        
+        if lost.is_set():
+            # Another worker may have reclaimed the job, leave the row to it
+            return True
+        
+        db = self._db()
+        if result['status'] == 'done':
+            db.complete_job(job_id, self.worker_id, result)
+        else:
+            status = db.fail_job(job_id, self.worker_id, result.get('error'),
+                                 self._retry_delay(job['attempts']))
+            logger.info(f"Job {job_id} attempt {job['attempts']} failed, now {status}")
+        return True
+    
+    def run(self, drain=False):
+        """
+        Process jobs until stopped.
+        
+        Args:
+            drain (bool): Exit once no job is queued or running instead of
+                polling forever
+        """
+        logger.info(f"Worker {self.worker_id} started")
+        while not self._stop.is_set():
+            if not self.run_one():
+                counts = self._db().get_job_counts()
+                if drain and not counts.get('queued') and not counts.get('running'):
+                    break
+                self._stop.wait(self.poll_interval)
+        logger.info(f"Worker {self.worker_id} stopped")
+    
+    def stop(self):
+        """Stop after the current job."""
+        self._stop.set()
+
+def _worker_process(index, drain, queue_config):
+    """Entry point of a worker process."""
+    from src.pipeline.batch_runner import BatchRunner, load_config
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    app_config = load_config('config/app_settings.json')
+    runner = BatchRunner(app_config, load_config('config/models.json'),
+                         load_config('config/video_categories.json'), job_workers=1,
+                         stage_limits=app_config.get('processing', {}).get('batch', {}).get('stage_limits'))
+    worker = JobWorker(runner, worker_id=f"{socket.gethostname()}:{os.getpid()}:{index}", **queue_config)
+    worker.run(drain=drain)
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Render job queue")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    enqueue_parser = subparsers.add_parser("enqueue", help="Queue jobs from a JSONL or CSV file")
+    enqueue_parser.add_argument("jobs", help="JSONL or CSV file with one job per line")
+    enqueue_parser.add_argument("--priority", "-p", type=int, default=0, help="Job priority")
+    enqueue_parser.add_argument("--max-attempts", type=int, default=3, help="Attempts before giving up")
+    
+    work_parser = subparsers.add_parser("work", help="Run worker processes")
+    work_parser.add_argument("--processes", "-n", type=int, default=1, help="Worker processes on this node")
+    work_parser.add_argument("--drain", action="store_true", help="Exit when the queue is empty")
+    
+    subparsers.add_parser("status", help="Show job counts")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    db = DatabaseConnector()
+    db.initialize_database()
+    
+    if args.command == "enqueue":
+        from src.pipeline.batch_runner import load_jobs
+        jobs = load_jobs(args.jobs)
+        for job in jobs:
+            priority = int(job.pop('priority', None) or args.priority)
+            db.enqueue_job(job, priority=priority, max_attempts=args.max_attempts)
+        print(f"Queued {len(jobs)} jobs")
+    
+    elif args.command == "work":
+        from src.pipeline.batch_runner import load_config
+        queue_config = load_config('config/app_settings.json').get('processing', {}).get('queue', {})
+        processes = [
+            multiprocessing.Process(target=_worker_process, args=(i, args.drain, queue_config))
+            for i in range(max(1, args.processes))
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    
+    else:
+        print(db.get_job_counts())
+    
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
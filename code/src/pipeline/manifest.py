@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Per-job artifact manifest used to resume workflows stage by stage.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+def _file_paths(value):
+    """Collect the existing-file paths referenced by a stage result or input."""
+    if isinstance(value, str):
+        return [value] if os.path.isfile(value) else []
+    if isinstance(value, (list, tuple)):
+        return [path for item in value for path in _file_paths(item)]
+    if isinstance(value, dict):
+        return [path for item in value.values() for path in _file_paths(item)]
+    return []
+
+def fingerprint(value):
+    """
+    Describe a value together with the size and mtime of the files it names.
+    
+    Args:
+        value: JSON-serializable stage input or output
+    
+    Returns:
+        dict: Fingerprint that changes when any referenced file changes
+    """
+    files = {}
+    for path in _file_paths(value):
+        stat = os.stat(path)
+        files[os.path.abspath(path)] = [stat.st_size, stat.st_mtime]
+    return {'value': value, 'files': files}
+
+class StageManifest:
+    """Records stage outputs keyed by a hash of their inputs."""
+    
+    def __init__(self, manifest_path):
+        """
+        Initialize stage manifest.
+        
+        Args:
+            manifest_path (str): JSON file holding the manifest
+        """
+        self.manifest_path = manifest_path
+        self._lock = threading.Lock()
+        self._stages = self._load()
+    
+    def _load(self):
+        """Load recorded stages from disk."""
+        try:
+            if os.path.exists(self.manifest_path):
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    return json.load(f).get('stages', {})
+        except Exception as e:
+            logger.warning(f"Could not read manifest {self.manifest_path}: {e}")
+        return {}
+    
+    def _save(self):
+        """Write the manifest atomically."""
+        os.makedirs(os.path.dirname(self.manifest_path) or '.', exist_ok=True)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'stages': self._stages}, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+    
+    @staticmethod
+    def make_key(stage, inputs, params=None):
+        """
+        Hash a stage name and its inputs.
+        
+        Args:
+            stage (str): Stage name
+            inputs: JSON-serializable stage inputs; files they name are
+                fingerprinted by size and mtime
+            params: JSON-serializable settings hashed as-is, such as the
+                stage's own output path
+        
+        Returns:
+            str: Input key
+        """
+        payload = json.dumps({'stage': stage, 'inputs': fingerprint(inputs), 'params': params},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def lookup(self, stage, key):
+        """
+        Get a recorded stage output if it is still valid.
+        
+        An output is valid when it was produced from the same inputs and
+        every file it names is unchanged since it was recorded.
+        
+        Args:
+            stage (str): Stage name
+            key (str): Input key from make_key()
+        
+        Returns:
+            tuple: (True, output) on a hit, (False, None) otherwise
+        """
+        with self._lock:
+            record = self._stages.get(stage)
+        if not record or record['key'] != key:
+            return False, None
+        
+        try:
+            if fingerprint(record['output'])['files'] != record['files']:
+                return False, None
+        except OSError:
+            return False, None
+        return True, record['output']
+    
+    def record(self, stage, key, output):
+        """
+        Record a stage output.
+        
+        Args:
+            stage (str): Stage name
+            key (str): Input key from make_key()
+            output: JSON-serializable stage output
+        """
+        try:
+            entry = {'key': key, 'output': output, 'files': fingerprint(output)['files']}
+            with self._lock:
+                self._stages[stage] = entry
+                self._save()
+        except Exception as e:
+            logger.warning(f"Could not record stage {stage} in manifest: {e}")
@@ -0,0 +1,462 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Local HTTP service that queues generation jobs on one warm process.
+
+Endpoints:
+    POST /jobs                {"prompt": ...} or {"labels": [...]}, optionally
+                              with "profile", "subtitle_mode" and
+                              "preview": true
+    GET  /jobs/<id>           Job status
+    GET  /jobs/<id>/events    Stage progress as server-sent events
+    GET  /jobs/<id>/preview   Low-resolution preview, once rendered
+    GET  /jobs/<id>/video     Finished MP4, with range request support
+    DELETE /jobs/<id>         Cancel a queued or running job
+    GET  /health              Queue depth and worker count
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from utils.process_supervisor import get_supervisor
+from src.composition.encode_profiles import ENCODE_PROFILES
+from src.composition.final_composer import SUBTITLE_MODES
+
+logger = logging.getLogger(__name__)
+
+# Seconds between SSE keep-alive comments
+KEEPALIVE_INTERVAL = 15
+
+# Chunk size for streaming video files
+CHUNK_SIZE = 256 * 1024
+
+class JobState:
+    """Status and event log of one submitted job."""
+    
+    def __init__(self, job_id, job):
+        """
+        Initialize job state.
+        
+        Args:
+            job_id (str): Job ID
+            job (dict): Job description
+        """
+        self.id = job_id
+        self.job = job
+        self.status = 'queued'
+        self.cancelled = False
+        self.result = None
+        self.preview_path = None
+        self.finished_at = None
+        self.events = []
+        self.condition = threading.Condition()
+    
+    def add_event(self, event, data):
+        """Append an event and wake up listeners."""
+        with self.condition:
+            self.events.append((event, data))
+            self.condition.notify_all()
+    
+    def set_status(self, status, result=None):
+        """Update the job status and publish it as an event."""
+        with self.condition:
+            self.status = status
+            self.result = result
+            if self.finished:
+                self.finished_at = time.monotonic()
+        self.add_event('status', self.to_dict())
+    
+    def to_dict(self):
+        """Get a JSON-friendly summary of the job."""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'error': (self.result or {}).get('error'),
+            'preview': f"/jobs/{self.id}/preview" if self.preview_path else None,
+            'video': f"/jobs/{self.id}/video" if self.status == 'done' else None
+        }
+    
+    @property
+    def finished(self):
+        """Whether the job reached a terminal status."""
+        return self.status in ('done', 'failed', 'cancelled')
+
+class RenderService:
+    """Runs submitted jobs on a bounded pool sharing one BatchRunner."""
+    
+    def __init__(self, runner, job_workers=2, max_queue=32, finished_ttl=3600, max_finished=256):
+        """
+        Initialize render service.
+        
+        Args:
+            runner (BatchRunner): Warm runner executing the jobs
+            job_workers (int): Jobs rendered at once
+            max_queue (int): Jobs accepted but not yet finished before new
+                submissions are rejected
+            finished_ttl (float): Seconds a finished job stays queryable
+            max_finished (int): Finished jobs kept at most, oldest dropped first
+        """
+        self.runner = runner
+        self.job_workers = max(1, job_workers)
+        self.max_queue = max_queue
+        self.finished_ttl = finished_ttl
+        self.max_finished = max_finished
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.job_workers)
+    
+    def _prune(self):
+        """Forget finished jobs past their TTL or beyond max_finished; call with _lock held."""
+        finished = sorted((state.finished_at, job_id) for job_id, state in self.jobs.items()
+                          if state.finished and state.finished_at is not None)
+        cutoff = time.monotonic() - self.finished_ttl
+        excess = len(finished) - self.max_finished
+        for index, (finished_at, job_id) in enumerate(finished):
+            if finished_at < cutoff or index < excess:
+                del self.jobs[job_id]
+    
+    def pending_count(self):
+        """Number of jobs queued or running."""
+        with self._lock:
+            return sum(1 for state in self.jobs.values() if not state.finished)
+    
+    def submit(self, job):
+        """
+        Queue a job.
+        
+        Args:
+            job (dict): Job with 'prompt' or 'labels'
+        
+        Returns:
+            JobState: State of the queued job, or None if the queue is full
+        """
+        job_id = uuid.uuid4().hex[:12]
+        state = JobState(job_id, job)
+        
+        with self._lock:
+            self._prune()
+            if sum(1 for s in self.jobs.values() if not s.finished) >= self.max_queue:
+                return None
+            self.jobs[job_id] = state
+        
+        state.add_event('status', state.to_dict())
+        self._executor.submit(self._run, state)
+        return state
+    
+    def get(self, job_id):
+        """Get the state of a job, or None if unknown."""
+        with self._lock:
+            self._prune()
+            return self.jobs.get(job_id)
+    
+    def cancel(self, job_id):
+        """
+        Cancel a job, killing its running FFmpeg processes.
+        
+        Args:
+            job_id (str): Job ID
+        
+        Returns:
+            JobState: State of the job, or None if unknown
+        """
+        state = self.get(job_id)
+        if not state or state.finished:
+            return state
+        
+        with state.condition:
+            state.cancelled = True
+            queued = state.status == 'queued'
+        if queued:
+            state.set_status('cancelled')
+        else:
+            get_supervisor().cancel_job(job_id)
+        return state
+    
+    def _run(self, state):
+        """Run a job and publish its stage progress."""
+        with state.condition:
+            if state.cancelled:
+                return
+            state.status = 'running'
+        state.add_event('status', state.to_dict())
+        
+        def on_event(stage, status, detail):
+            if status == 'preview':
+                state.preview_path = detail['path']
+                detail = {'url': f"/jobs/{state.id}/preview"}
+            state.add_event('stage', dict(detail or {}, stage=stage, status=status))
+        
+        try:
+            result = self.runner.run_job(dict(state.job, id=state.id), on_event=on_event)
+        except Exception as e:
+            logger.error(f"Job {state.id} failed: {e}")
+            result = {'status': 'failed', 'error': str(e)}
+        state.set_status('cancelled' if state.cancelled else result['status'], result)
+    
+    def shutdown(self):
+        """Stop accepting work and wait for running jobs."""
+        self._executor.shutdown(wait=True)
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end of a RenderService."""
+    
+    server_version = "RenderService/1.0"
+    protocol_version = "HTTP/1.1"
+    
+    @property
+    def service(self):
+        return self.server.service
+    
+    def log_message(self, format, *args):
+        logger.info(f"{self.address_string()} - {format % args}")
+    
+    def _send_json(self, status, payload):
+        """Send a JSON response."""
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _job_or_404(self, job_id):
+        """Look up a job, answering 404 when it does not exist."""
+        state = self.service.get(job_id)
+        if not state:
+            self._send_json(404, {'error': f"Unknown job: {job_id}"})
+        return state
+    
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, DELETE, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Range')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def do_POST(self):
+        if self.path.rstrip('/') != '/jobs':
+            self._send_json(404, {'error': 'Not found'})
+            return
+        
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            job = json.loads(self.rfile.read(length) or b'{}')
+        except (ValueError, json.JSONDecodeError):
+            self._send_json(400, {'error': 'Request body must be JSON'})
+            return
+        
+        labels = job.get('labels') if isinstance(job, dict) else None
+        if not isinstance(job, dict) or not (isinstance(job.get('prompt'), str) and job['prompt'].strip()
+                                             or isinstance(labels, list) and labels):
+            self._send_json(400, {'error': "Job needs a 'prompt' string or a 'labels' list"})
+            return
+        if 'profile' in job and job['profile'] not in ENCODE_PROFILES:
+            self._send_json(400, {'error': f"'profile' must be one of {sorted(ENCODE_PROFILES)}"})
+            return
+        if 'subtitle_mode' in job and job['subtitle_mode'] not in SUBTITLE_MODES:
+            self._send_json(400, {'error': f"'subtitle_mode' must be one of {list(SUBTITLE_MODES)}"})
+            return
+        
+        # Clients choose what to render, never where it is written
+        state = self.service.submit({key: job[key] for key in ('prompt', 'labels', 'profile', 'preview',
+                                                               'subtitle_mode')
+                                     if key in job})
+        if not state:
+            self._send_json(503, {'error': 'Render queue is full, try again later'})
+            return
+        
+        payload = state.to_dict()
+        payload['events'] = f"/jobs/{state.id}/events"
+        self._send_json(202, payload)
+    
+    def do_DELETE(self):
+        match = re.fullmatch(r'/jobs/([0-9a-f]+)', self.path.split('?', 1)[0].rstrip('/'))
+        if not match:
+            self._send_json(404, {'error': 'Not found'})
+            return
+        
+        if not self._job_or_404(match.group(1)):
+            return
+        self._send_json(200, self.service.cancel(match.group(1)).to_dict())
+    
+    def do_GET(self):
+        path = self.path.split('?', 1)[0].rstrip('/')
+        
+        if path == '/health':
+            self._send_json(200, {'pending': self.service.pending_count(),
+                                  'workers': self.service.job_workers,
+                                  'max_queue': self.service.max_queue})
+            return
+        
+        match = re.fullmatch(r'/jobs/([0-9a-f]+)(/events|/preview|/video)?', path)
+        if not match:
+            self._send_json(404, {'error': 'Not found'})
+            return
+        
+        state = self._job_or_404(match.group(1))
+        if not state:
+            return
+        
+        if match.group(2) == '/events':
+            self._stream_events(state)
+        elif match.group(2) == '/preview':
+            self._send_video(state, state.preview_path)
+        elif match.group(2) == '/video':
+            video_path = (state.result or {}).get('output_path') if state.status == 'done' else None
+            self._send_video(state, video_path)
+        else:
+            self._send_json(200, state.to_dict())
+    
+    def _stream_events(self, state):
+        """Stream a job's events until it finishes."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.close_connection = True
+        
+        sent = 0
+        try:
+            while True:
+                with state.condition:
+                    if sent >= len(state.events) and not state.finished:
+                        state.condition.wait(KEEPALIVE_INTERVAL)
+                    events = state.events[sent:]
+                    finished = state.finished
+                
+                if events:
+                    for event, data in events:
+                        self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+                    sent += len(events)
+                elif not finished:
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+                
+                if finished and sent >= len(state.events):
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            logger.info(f"Event stream for job {state.id} closed by client")
+    
+    def _send_video(self, state, video_path):
+        """Send a video of the job, honouring a single byte range."""
+        if not video_path or not os.path.exists(video_path):
+            self._send_json(404, {'error': 'Video is not available', 'status': state.status})
+            return
+        
+        file_size = os.path.getsize(video_path)
+        start, end = 0, file_size - 1
+        status = 200
+        
+        range_header = self.headers.get('Range')
+        if range_header:
+            match = re.fullmatch(r'bytes=(\d*)-(\d*)', range_header.strip())
+            if not match or not (match.group(1) or match.group(2)):
+                self._send_range_error(file_size)
+                return
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), file_size - 1) if match.group(2) else file_size - 1
+            else:
+                # Suffix range: the last N bytes
+                start = max(0, file_size - int(match.group(2)))
+            if start >= file_size or start > end:
+                self._send_range_error(file_size)
+                return
+            status = 206
+        
+        self.send_response(status)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if status == 206:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{file_size}")
+        self.end_headers()
+        
+        try:
+            with open(video_path, 'rb') as f:
+                f.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            logger.info(f"Video download for job {state.id} closed by client")
+    
+    def _send_range_error(self, file_size):
+        """Answer an unsatisfiable range request."""
+        self.send_response(416)
+        self.send_header('Content-Range', f"bytes */{file_size}")
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+def serve(service, host='127.0.0.1', port=8765):
+    """
+    Serve a RenderService until interrupted.
+    
+    Args:
+        service (RenderService): Service handling the jobs
+        host (str): Interface to bind
+        port (int): Port to listen on
+    """
+    httpd = ThreadingHTTPServer((host, port), RenderRequestHandler)
+    httpd.daemon_threads = True
+    httpd.service = service
+    logger.info(f"Render service listening on http://{host}:{port}")
+    
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down render service")
+    finally:
+        httpd.server_close()
+        service.shutdown()
+
+def main():
+    """Command line entry point."""
+    from src.pipeline.batch_runner import BatchRunner, load_config
+    
+    parser = argparse.ArgumentParser(description="Local HTTP render service")
+    parser.add_argument("--host", help="Interface to bind")
+    parser.add_argument("--port", "-p", type=int, help="Port to listen on")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    app_config = load_config('config/app_settings.json')
+    server_config = app_config.get('server', {})
+    batch_config = app_config.get('processing', {}).get('batch', {})
+    
+    runner = BatchRunner(app_config, load_config('config/models.json'),
+                         load_config('config/video_categories.json'),
+                         stage_limits=batch_config.get('stage_limits'),
+                         output_dir=os.path.join('data', 'output', 'server'))
+    service = RenderService(runner, job_workers=server_config.get('job_workers', 2),
+                            max_queue=server_config.get('max_queue', 32),
+                            finished_ttl=server_config.get('finished_ttl_seconds', 3600),
+                            max_finished=server_config.get('max_finished_jobs', 256))
+    serve(service, args.host or server_config.get('host', '127.0.0.1'),
+          args.port or server_config.get('port', 8765))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
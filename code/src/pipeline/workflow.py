@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Prompt-to-video workflow expressed as a stage DAG.
+"""
+
+import os
+import logging
+from contextlib import nullcontext
+from src.ai.model_connector import get_ai_model
+from src.ai.text_generator import generate_text
+from src.ai.semantic_matcher import match_videos
+from src.video.video_processor import process_videos
+from src.video.hypnotic_effects import apply_hypnotic_effects
+from src.video.render_cache import DEFAULT_CACHE_DIR
+from src.audio.speech_synthesis import generate_speech
+from src.subtitles.subtitle_generator import generate_subtitles
+from src.composition.final_composer import compose_final_video
+from src.composition.post_process import PostProcessChain
+from src.pipeline.executor import PipelineExecutor
+from src.pipeline.manifest import StageManifest
+
+logger = logging.getLogger(__name__)
+
+def _limit(limits, stage_type):
+    """Get the concurrency limiter for a stage type, if any."""
+    return (limits or {}).get(stage_type) or nullcontext()
+
+def build_prompt_pipeline(processed_prompt, app_config, models_config, output_path,
+                          ai_model=None, selected_labels=None, work_dir=None, limits=None,
+                          on_event=None, profile=None, preview=None, subtitle_mode=None):
+    """
+    Build the stage DAG for the free-form prompt workflow.
+    
+    The video branch only depends on the prompt, so clip matching and
+    effect rendering run while text generation waits on the API. Speech
+    and subtitles both depend on the text and run side by side.
+    
+    Args:
+        processed_prompt (str): Prompt from process_custom_prompt()
+        app_config (dict): Application settings
+        models_config (dict): Model settings
+        output_path (str): Path to save the final video
+        ai_model (object, optional): Model connector to reuse across runs
+        selected_labels (list, optional): Labels from process_label_selection()
+            restricting the clip search (defaults to the whole library)
+        work_dir (str, optional): Directory for this run's intermediate files
+            and stage manifest (defaults to the shared output directories,
+            without checkpointing)
+        limits (dict, optional): Semaphores bounding the 'llm', 'tts' and
+            'ffmpeg' stages across concurrent runs
+        on_event (callable, optional): Stage progress listener, see
+            PipelineExecutor
+        profile (str, optional): Encode profile (defaults to
+            video.encode_profile)
+        preview (bool, optional): Render a low-resolution preview before the
+            final video, reported as a 'preview' event of the compose stage
+            (defaults to video.preview_render)
+        subtitle_mode (str, optional): 'burn', 'soft' or 'sidecar' (defaults
+            to video.subtitle_mode)
+    
+    Returns:
+        PipelineExecutor: Executor with all stages registered
+    """
+    processing = app_config.get('processing', {})
+    video_config = app_config.get('video', {})
+    threshold = video_config.get('similarity_threshold', 0)
+    profile = profile or video_config.get('encode_profile', 'standard')
+    preview = video_config.get('preview_render', False) if preview is None else preview
+    subtitle_mode = subtitle_mode or video_config.get('subtitle_mode', 'burn')
+    post_config = video_config.get('post_process') or {}
+    # Runs with their own work_dir keep a manifest so a re-run resumes
+    manifest = StageManifest(os.path.join(work_dir, 'manifest.json')) if work_dir else None
+    pipeline = PipelineExecutor(max_workers=processing.get('max_workers', 4), manifest=manifest,
+                                on_event=on_event)
+    
+    def text_stage(results):
+        model = ai_model or get_ai_model(models_config['default_model'])
+        with _limit(limits, 'llm'):
+            text_content = generate_text(model, processed_prompt,
+                                         max_length=models_config['max_text_length'])
+        if not text_content or text_content.startswith("Error:"):
+            raise RuntimeError(f"Text generation failed: {text_content}")
+        print(text_content)
+        return text_content
+    
+    def speech_stage(results):
+        audio_path = os.path.join(work_dir, 'narration.mp3') if work_dir else None
+        with _limit(limits, 'tts'):
+            audio_file = generate_speech(results['text'], output_path=audio_path)
+        if not audio_file:
+            raise RuntimeError("Speech synthesis failed")
+        return audio_file
+    
+    def matches_stage(results):
+        similarity_scores = match_videos(processed_prompt, results['videos'])
+        return [v for v, s in similarity_scores if s > threshold]
+    
+    def effects_stage(results):
+        output_dir = os.path.join(work_dir, 'clips') if work_dir else None
+        cache_dir = DEFAULT_CACHE_DIR if work_dir else None
+        with _limit(limits, 'ffmpeg'):
+            return apply_hypnotic_effects(results['matches'], output_dir=output_dir,
+                                          max_workers=processing.get('max_workers'),
+                                          cpu_budget=processing.get('cpu_budget'),
+                                          cache_dir=cache_dir, profile=profile,
+                                          handoff=processing.get('stage_handoff', 'file'))
+    
+    def compose_progress(progress):
+        on_event('compose', 'progress', progress)
+    
+    def compose_preview(preview_path):
+        on_event('compose', 'preview', {'path': preview_path})
+    
+    def compose_stage(results):
+        preview_path = None
+        if preview:
+            preview_path = (os.path.join(work_dir, 'preview.mp4') if work_dir
+                            else os.path.splitext(output_path)[0] + '_preview.mp4')
+        with _limit(limits, 'ffmpeg'):
+            final_video = compose_final_video(results['effects'], results['speech'],
+                                              results['subtitles'], output_path,
+                                              on_progress=compose_progress if on_event else None,
+                                              profile=profile, preview_path=preview_path,
+                                              on_preview=compose_preview if on_event else None,
+                                              segment_seconds=processing.get('segment_seconds'),
+                                              subtitle_mode=subtitle_mode,
+                                              post_process=PostProcessChain.from_config(post_config))
+        if not final_video:
+            raise RuntimeError("Final composition failed")
+        return final_video
+    
+    pipeline.add_stage('text', text_stage,
+                       checkpoint=lambda results: (processed_prompt, [models_config['default_model'],
+                                                                      models_config['max_text_length']]))
+    pipeline.add_stage('videos', lambda results: process_videos(selected_labels))
+    pipeline.add_stage('matches', matches_stage, depends_on=('videos',))
+    pipeline.add_stage('effects', effects_stage, depends_on=('matches',),
+                       checkpoint=lambda results: (results['matches'],
+                                                   [profile, processing.get('stage_handoff', 'file')]))
+    pipeline.add_stage('speech', speech_stage, depends_on=('text',),
+                       checkpoint=lambda results: (results['text'], None))
+    pipeline.add_stage('subtitles', lambda results: generate_subtitles(results['text'], output_dir=work_dir),
+                       depends_on=('text',), checkpoint=lambda results: (results['text'], None))
+    pipeline.add_stage('compose', compose_stage, depends_on=('speech', 'subtitles', 'effects'),
+                       checkpoint=lambda results: ([results['effects'], results['speech'], results['subtitles']],
+                                                   [os.path.abspath(output_path), profile, subtitle_mode,
+                                                    post_config]))
+    return pipeline
+
+def run_prompt_workflow(processed_prompt, app_config, models_config, output_path=None, **options):
+    """
+    Run the prompt workflow end to end.
+    
+    Args:
+        processed_prompt (str): Prompt from process_custom_prompt()
+        app_config (dict): Application settings
+        models_config (dict): Model settings
+        output_path (str, optional): Path to save the final video
+        **options: Extra arguments for build_prompt_pipeline()
+    
+    Returns:
+        dict: Stage results; 'compose' holds the final video path on success
+    """
+    if not output_path:
+        output_path = os.path.join('data', 'output', f"generated_video_{os.getpid()}.mp4")
+    
+    pipeline = build_prompt_pipeline(processed_prompt, app_config, models_config, output_path, **options)
+    results = pipeline.run()
+    
+    if pipeline.failed:
+        logger.error(f"Workflow stages failed: {pipeline.failed}")
+    
+    timings = ", ".join(f"{name}={seconds:.2f}s" for name, seconds in pipeline.timings.items())
+    logger.info(f"Stage timings: {timings}")
+    return results
@@ -10,49 +10,195 @@ import logging
 import subprocess
 import tempfile
 import random
+from concurrent.futures import ThreadPoolExecutor
+from src.video.render_cache import RenderCache
+from src.video.mezzanine import resolve_mezzanines
+from src.composition.encode_profiles import get_profile, video_encoder_args
+from utils.tracing import in_context
+from utils.ffmpeg_runner import run_ffmpeg
+from utils.ffmpeg_pipes import fifo_supported
 
 logger = logging.getLogger(__name__)
 
-def apply_hypnotic_effects(video_files, output_dir=None):
+# Filter arguments for each hypnotic effect
+EFFECT_FILTERS = {
+    # Kaleidoscope effect
+    'kaleidoscope': ['-filter_complex', "split=2[a][b];[a]kaleidoscope=pattern=4:angle=0[a1];[b]kaleidoscope=pattern=4:angle=0.5[b1];[a1][b1]blend=all_mode=average"],
+    # Pulsating effect
+    'pulse': ['-vf', "eq=brightness='0.5+0.2*sin(2*PI*t/3)':saturation='1+0.5*sin(2*PI*t/5)'"],
+    # Swirl effect
+    'swirl': ['-vf', "swirl=angle='PI*sin(t)'"]
+}
+
+def apply_hypnotic_effects(video_files, output_dir=None, max_workers=None, cpu_budget=None, use_cache=True,
+                           cache_dir=None, profile='standard', handoff='file'):
     """
     Apply hypnotic effects to selected videos.
     
     Args:
         video_files (list): List of video file paths
         output_dir (str, optional): Directory to save processed videos
+        max_workers (int, optional): Maximum number of concurrent FFmpeg jobs
+        cpu_budget (int, optional): Number of cores the batch may use
+            (defaults to all cores)
+        use_cache (bool): Reuse previously rendered effects
+        cache_dir (str, optional): Render cache directory (defaults to
+            output_dir/cache)
+        profile (str or dict): Encode profile whose preset and CRF are used
+        handoff (str): 'file' to render every effect, or 'stream' to leave
+            uncached effects to the composer, see render_effects()
+    
+    Returns:
+        list: Paths to processed video files, or effect specs when streaming
+    """
+    processed_videos, _ = render_effects(video_files, output_dir, max_workers, cpu_budget, use_cache,
+                                         cache_dir, profile, handoff)
+    return processed_videos
+
+def render_effects(video_files, output_dir=None, max_workers=None, cpu_budget=None, use_cache=True,
+                   cache_dir=None, profile='standard', handoff='file'):
+    """
+    Render hypnotic effects for a batch of clips on a bounded worker pool.
+    
+    The CPU budget is split between the workers through FFmpeg's -threads
+    option. Output order follows the input order and a failing clip does
+    not abort the rest of the batch. Renders already in the cache are
+    returned without running FFmpeg.
+    
+    With the 'stream' handoff uncached effects are not rendered here;
+    an effect spec dict ({'source', 'effect'}) takes their place and the
+    composer streams the effect straight into its own encode. Streamed
+    effects never reach the render cache, so streaming only reuses
+    renders cached by earlier 'file' runs.
+    
+    Args:
+        video_files (list): List of video file paths
+        output_dir (str, optional): Directory to save processed videos
+        max_workers (int, optional): Maximum number of concurrent FFmpeg jobs
+        cpu_budget (int, optional): Number of cores the batch may use
+        use_cache (bool): Reuse previously rendered effects
+        cache_dir (str, optional): Render cache directory (defaults to
+            output_dir/cache)
+        profile (str or dict): Encode profile whose preset and CRF are used;
+            clips keep their source resolution and frame rate
+        handoff (str): 'file' or 'stream' (falls back to 'file' where named
+            pipes are not supported)
     
     Returns:
-        list: Paths to processed video files
+        tuple: (processed video paths or effect specs, list of
+            (video_path, effect_type) failures)
     """
     if not video_files:
         logger.warning("No video files provided for processing")
-        return []
+        return [], []
     
     if not output_dir:
         output_dir = os.path.join('data', 'output', 'processed_videos')
     
     os.makedirs(output_dir, exist_ok=True)
-    processed_videos = []
+    # Effects run on the pre-normalized copies when they are available
+    sources = resolve_mezzanines(video_files)
+    cache = RenderCache(cache_dir or os.path.join(output_dir, 'cache')) if use_cache else None
+    encoder_args = video_encoder_args(get_profile(profile))
+    stream = handoff == 'stream' and fifo_supported()
+    if handoff == 'stream' and not stream:
+        logger.warning("Named pipes are not supported, rendering effects to files")
     
-    for i, video_path in enumerate(video_files):
+    # Pick effects up front so the result does not depend on scheduling
+    jobs = []
+    for i, (video_path, source_path) in enumerate(zip(video_files, sources)):
+        output_path = os.path.join(output_dir, f"hypnotic_{i}_{os.path.basename(video_path)}")
+        effect_type, cache_key, cached_path = _choose_effect(source_path, cache, encoder_args)
+        jobs.append((video_path, source_path, output_path, effect_type, cache_key, cached_path))
+    
+    pending = [job for job in jobs if not job[5] and not stream]
+    cpu_budget = max(1, cpu_budget or os.cpu_count() or 1)
+    workers = max(1, min(max_workers or cpu_budget, cpu_budget, len(pending) or 1))
+    threads_per_job = max(1, cpu_budget // workers)
+    
+    logger.info(f"Rendering {len(pending)} effects ({sum(1 for job in jobs if job[5])} cached) "
+                f"with {workers} workers x {threads_per_job} threads")
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            job[2]: executor.submit(in_context(_apply_effect), job[1], job[2], job[3], threads_per_job,
+                                    encoder_args)
+            for job in pending
+        }
+    
+    processed_videos = []
+    failures = []
+    for video_path, source_path, output_path, effect_type, cache_key, cached_path in jobs:
+        if cached_path:
+            processed_videos.append(cached_path)
+            logger.info(f"Reused cached {effect_type} render for {video_path}")
+            continue
+        
+        if stream:
+            processed_videos.append({'source': source_path, 'effect': effect_type})
+            logger.info(f"Streaming {effect_type} effect for {video_path}")
+            continue
+        
         try:
-            output_path = os.path.join(output_dir, f"hypnotic_{i}_{os.path.basename(video_path)}")
-            
-            # Apply video effects using FFmpeg
-            effect_type = random.choice(['kaleidoscope', 'pulse', 'swirl'])
-            processed_path = _apply_effect(video_path, output_path, effect_type)
-            
-            if processed_path:
-                processed_videos.append(processed_path)
-                logger.info(f"Applied {effect_type} effect to {video_path}")
-            
+            processed_path = futures[output_path].result()
         except Exception as e:
+            processed_path = None
             logger.error(f"Error processing video {video_path}: {e}")
+        
+        if processed_path:
+            if cache and cache_key:
+                processed_path = cache.store(cache_key, processed_path) or processed_path
+            processed_videos.append(processed_path)
+            logger.info(f"Applied {effect_type} effect to {video_path}")
+        else:
+            failures.append((video_path, effect_type))
+    
+    if cache:
+        # Keep what this batch hands out, which the composer has yet to read
+        cache.evict(keep=[path for path in processed_videos if isinstance(path, str)])
+    
+    if failures:
+        logger.warning(f"{len(failures)} clips failed: {[path for path, _ in failures]}")
     
     logger.info(f"Processed {len(processed_videos)} videos with hypnotic effects")
-    return processed_videos
+    return processed_videos, failures
+
+def _choose_effect(video_path, cache=None, encoder_args=None):
+    """
+    Choose an effect for a clip, preferring one that is already cached.
+    
+    Args:
+        video_path (str): Source video path
+        cache (RenderCache, optional): Render cache
+        encoder_args (list, optional): Encoder arguments of the render
+    
+    Returns:
+        tuple: (effect_type, cache_key, cached_path)
+    """
+    effects = list(EFFECT_FILTERS)
+    if not cache:
+        return random.choice(effects), None, None
+    
+    try:
+        keys = {
+            effect: cache.make_key(video_path, effect, EFFECT_FILTERS[effect],
+                                   encoder_args or video_encoder_args(get_profile()))
+            for effect in effects
+        }
+    except Exception as e:
+        logger.warning(f"Could not compute cache key for {video_path}: {e}")
+        return random.choice(effects), None, None
+    
+    cached = [(effect, cache.lookup(keys[effect])) for effect in effects]
+    cached = [(effect, path) for effect, path in cached if path]
+    if cached:
+        effect_type, cached_path = random.choice(cached)
+        return effect_type, keys[effect_type], cached_path
+    
+    effect_type = random.choice(effects)
+    return effect_type, keys[effect_type], None
 
-def _apply_effect(input_path, output_path, effect_type):
+def _apply_effect(input_path, output_path, effect_type, threads=None, encoder_args=None):
     """
     Apply specific hypnotic effect to video using FFmpeg.
     
@@ -60,37 +206,59 @@ def _apply_effect(input_path, output_path, effect_type):
         input_path (str): Input video path
         output_path (str): Output video path
         effect_type (str): Type of effect to apply
+        threads (int, optional): FFmpeg thread count for this job
+        encoder_args (list, optional): Encoder arguments (defaults to the
+            'standard' profile)
     
     Returns:
         str: Path to processed video or None if failed
     """
-    ffmpeg_cmd = ['ffmpeg', '-y', '-i', input_path]
-    
-    if effect_type == 'kaleidoscope':
-        # Apply kaleidoscope effect
-        filter_complex = "split=2[a][b];[a]kaleidoscope=pattern=4:angle=0[a1];[b]kaleidoscope=pattern=4:angle=0.5[b1];[a1][b1]blend=all_mode=average"
-        ffmpeg_cmd.extend(['-filter_complex', filter_complex])
-    
-    elif effect_type == 'pulse':
-        # Apply pulsating effect
-        filter_complex = "eq=brightness='0.5+0.2*sin(2*PI*t/3)':saturation='1+0.5*sin(2*PI*t/5)'"
-        ffmpeg_cmd.extend(['-vf', filter_complex])
-    
-    elif effect_type == 'swirl':
-        # Apply swirl effect
-        filter_complex = "swirl=angle='PI*sin(t)'"
-        ffmpeg_cmd.extend(['-vf', filter_complex])
+    ffmpeg_cmd = ['ffmpeg', '-y']
+    if threads:
+        ffmpeg_cmd.extend(['-filter_threads', str(threads)])
+    ffmpeg_cmd.extend(['-i', input_path])
+    ffmpeg_cmd.extend(EFFECT_FILTERS.get(effect_type, []))
     
     # Add output settings
-    ffmpeg_cmd.extend(['-c:v', 'libx264', '-preset', 'medium', output_path])
+    ffmpeg_cmd.extend(encoder_args or video_encoder_args(get_profile()))
+    if threads:
+        ffmpeg_cmd.extend(['-threads', str(threads)])
+    ffmpeg_cmd.append(output_path)
     
     try:
         # Run FFmpeg process
-        subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        run_ffmpeg(f"effect.{effect_type}", ffmpeg_cmd)
         return output_path
     except subprocess.CalledProcessError as e:
         logger.error(f"FFmpeg error: {e.stderr.decode() if e.stderr else str(e)}")
         return None
     except Exception as e:
         logger.error(f"Error applying effect: {e}")
-        return None 
\ No newline at end of file
+        return None
+
+def effect_stream_command(spec):
+    """
+    Build the FFmpeg command producing a streamed effect clip.
+    
+    Args:
+        spec (dict): Effect spec from render_effects()
+    
+    Returns:
+        list: FFmpeg command up to its output options
+    """
+    return ['ffmpeg', '-y', '-i', spec['source']] + EFFECT_FILTERS.get(spec['effect'], [])
+
+def render_effect_spec(spec, output_path, profile='standard'):
+    """
+    Render a streamed effect clip to a file after all.
+    
+    Args:
+        spec (dict): Effect spec from render_effects()
+        output_path (str): Output video path
+        profile (str or dict): Encode profile whose preset and CRF are used
+    
+    Returns:
+        str: Path to processed video or None if failed
+    """
+    return _apply_effect(spec['source'], output_path, spec['effect'],
+                         encoder_args=video_encoder_args(get_profile(profile)))
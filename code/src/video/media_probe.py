@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Probes media files and caches the results.
+
+Headers are read in-process (utils.media_info); ffprobe is only run for
+files whose format the in-process reader does not understand.
+"""
+
+import os
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.db_connector import get_database
+from utils.process_supervisor import get_supervisor
+from utils.media_info import get_media_info
+
+logger = logging.getLogger(__name__)
+
+LIBRARY_DIR = os.path.join('data', 'video_library')
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+def _library_category(path):
+    """
+    Get the library category of a file.
+
+    Args:
+        path (str): File path
+
+    Returns:
+        str: Category name, or None if the file is outside the library
+    """
+    rel_path = os.path.relpath(os.path.abspath(path), os.path.abspath(LIBRARY_DIR))
+    if rel_path.startswith(os.pardir):
+        return None
+    parts = rel_path.split(os.sep)
+    return parts[0] if len(parts) > 1 else 'uncategorized'
+
+def _parse_rate(rate):
+    """Convert an FFmpeg rational such as '30000/1001' to a float."""
+    try:
+        num, _, den = rate.partition('/')
+        return float(num) / float(den or 1) if float(den or 1) else None
+    except (ValueError, AttributeError):
+        return None
+
+def _run_ffprobe(path):
+    """
+    Run ffprobe on a file and extract the stream parameters we use.
+
+    Args:
+        path (str): Media file path
+
+    Returns:
+        dict: Probe result
+    """
+    output = get_supervisor().run([
+        'ffprobe', '-v', 'error', '-print_format', 'json',
+        '-show_format', '-show_streams', '-show_data_hash', 'CRC32', path
+    ], kind='probe')
+    info = json.loads(output.decode('utf-8'))
+
+    streams = info.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), {})
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    duration = info.get('format', {}).get('duration') or video.get('duration')
+
+    return {
+        'duration': float(duration) if duration else None,
+        'width': video.get('width'),
+        'height': video.get('height'),
+        'codec': video.get('codec_name'),
+        'fps': _parse_rate(video.get('avg_frame_rate')) or _parse_rate(video.get('r_frame_rate')),
+        'pix_fmt': video.get('pix_fmt'),
+        'time_base': video.get('time_base'),
+        'extradata': video.get('extradata_hash', '').partition(':')[2] or None,
+        'has_audio': audio is not None
+    }
+
+def _probe(path):
+    """
+    Probe a file in-process, falling back to ffprobe.
+
+    Args:
+        path (str): Media file path
+
+    Returns:
+        dict: Probe result
+    """
+    info = get_media_info(path)
+    if info and info['duration'] is not None and (info['codec'] is None or info['pix_fmt']):
+        return info
+    return _run_ffprobe(path)
+
+def probe_videos(paths, max_workers=8, refresh=False):
+    """
+    Probe many media files concurrently.
+
+    Results are served from the in-process cache, then from the
+    video_probes table, and only stale or unknown files are probed.
+    Library videos are written back to video_probes.
+
+    Args:
+        paths (list): Media file paths
+        max_workers (int): Maximum number of concurrent probes
+        refresh (bool): Ignore cached results
+
+    Returns:
+        dict: Mapping of path to metadata dictionary (missing files are skipped)
+    """
+    results = {}
+    stats = {}
+
+    for path in dict.fromkeys(paths):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            logger.error(f"Video file not found: {path}")
+            continue
+        stats[path] = stat
+
+        with _cache_lock:
+            cached = _cache.get(os.path.abspath(path))
+        if not refresh and cached and cached['size'] == stat.st_size and cached['mtime'] == stat.st_mtime:
+            results[path] = dict(cached, path=path)
+
+    missing = [path for path in stats if path not in results]
+    library_paths = [path for path in missing if _library_category(path)]
+
+    if library_paths and not refresh:
+        db = get_database()
+        for path, row in db.get_video_probes(library_paths).items():
+            stat = stats[path]
+            if row.get('file_size') == stat.st_size and row.get('file_mtime') == stat.st_mtime \
+                    and row.get('has_audio') is not None:
+                results[path] = _remember(path, stat, {
+                    'duration': row['duration'],
+                    'width': row['width'],
+                    'height': row['height'],
+                    'codec': row['codec'],
+                    'fps': row['fps'],
+                    'pix_fmt': row['pix_fmt'],
+                    'time_base': row['time_base'],
+                    'extradata': row['extradata'],
+                    'has_audio': row['has_audio']
+                })
+        missing = [path for path in missing if path not in results]
+
+    if missing:
+        logger.info(f"Probing {len(missing)} media files")
+
+        def probe(path):
+            try:
+                return path, _probe(path)
+            except Exception as e:
+                logger.error(f"Error probing {path}: {e}")
+                return path, None
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing)))) as executor:
+            probed = list(executor.map(probe, missing))
+
+        to_save = []
+        for path, probe_result in probed:
+            if probe_result is None:
+                continue
+            results[path] = _remember(path, stats[path], probe_result)
+            if _library_category(path):
+                to_save.append(results[path])
+
+        if to_save:
+            get_database().save_video_probes(to_save)
+
+    return results
+
+def _remember(path, stat, probe_result):
+    """Store a probe result in the in-process cache."""
+    metadata = dict(probe_result)
+    metadata.update({
+        'path': path,
+        'filename': os.path.basename(path),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'category': os.path.basename(os.path.dirname(path))
+    })
+    with _cache_lock:
+        _cache[os.path.abspath(path)] = metadata
+    return dict(metadata)
+
+def probe_video(path):
+    """
+    Probe a single media file.
+
+    Args:
+        path (str): Media file path
+
+    Returns:
+        dict: Metadata dictionary, or None if probing failed
+    """
+    return probe_videos([path]).get(path)
+
+def get_media_duration(path):
+    """
+    Get the duration of a media file from the probe cache.
+
+    Args:
+        path (str): Media file path
+
+    Returns:
+        float: Duration in seconds, or None if unknown
+    """
+    metadata = probe_video(path)
+    return metadata.get('duration') if metadata else None
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Maintains pre-normalized mezzanine copies of the video library.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from utils.db_connector import get_database
+from utils.video_catalog import get_video_catalog
+from src.composition.filter_graph import normalize_filter
+from utils.ffmpeg_runner import run_ffmpeg
+
+logger = logging.getLogger(__name__)
+
+MEZZANINE_DIR = os.path.join('data', 'mezzanine')
+
+# Canonical format every library clip is transcoded to once
+MEZZANINE_PROFILE = {
+    'resolution': [1920, 1080],
+    'fps': 30,
+    'gop': 60,
+    'pix_fmt': 'yuv420p',
+    'preset': 'medium',
+    'crf': 18,
+    'timescale': 15360
+}
+
+def profile_id(profile=MEZZANINE_PROFILE):
+    """
+    Get a short identifier for a mezzanine profile.
+
+    Args:
+        profile (dict): Mezzanine profile
+
+    Returns:
+        str: Profile identifier
+    """
+    payload = json.dumps(profile, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()[:12]
+
+def _mezzanine_path(source_path, library_dir):
+    """Get where the mezzanine copy of a library video is written."""
+    rel_path = os.path.relpath(source_path, library_dir)
+    return os.path.join(MEZZANINE_DIR, os.path.splitext(rel_path)[0] + '.mp4')
+
+def keyframe_interval(video_path, profile=MEZZANINE_PROFILE):
+    """
+    Get the keyframe spacing of a mezzanine copy.
+
+    Args:
+        video_path (str): Video file path
+        profile (dict): Mezzanine profile
+
+    Returns:
+        float: Seconds between keyframes, or None if video_path is not a
+            mezzanine copy
+    """
+    if not os.path.abspath(video_path).startswith(os.path.abspath(MEZZANINE_DIR) + os.sep):
+        return None
+    return profile['gop'] / profile['fps']
+
+def _is_fresh(record, source_path, profile=MEZZANINE_PROFILE):
+    """
+    Check whether a mezzanine record still matches its source.
+
+    Args:
+        record (dict): Mezzanine record from the database
+        source_path (str): Source video path
+        profile (dict): Mezzanine profile
+
+    Returns:
+        bool: True if the mezzanine copy can be used
+    """
+    if not record or record['profile'] != profile_id(profile):
+        return False
+    try:
+        stat = os.stat(source_path)
+    except OSError:
+        return False
+    return (record['source_size'] == stat.st_size and record['source_mtime'] == stat.st_mtime
+            and os.path.exists(record['mezzanine_path']))
+
+def transcode_mezzanine(source_path, output_path, profile=MEZZANINE_PROFILE, threads=None):
+    """
+    Transcode a video into the mezzanine format.
+
+    Args:
+        source_path (str): Source video path
+        output_path (str): Mezzanine video path
+        profile (dict): Mezzanine profile
+        threads (int, optional): FFmpeg thread count
+
+    Returns:
+        str: Path to mezzanine video or None if failed
+    """
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tmp_path = output_path + '.part.mp4'
+
+    ffmpeg_cmd = [
+        'ffmpeg', '-y', '-i', source_path, '-map', '0:v:0', '-an',
+        '-vf', normalize_filter(profile['resolution'], profile['fps']),
+        '-c:v', 'libx264', '-preset', profile['preset'], '-crf', str(profile['crf']),
+        '-g', str(profile['gop']), '-keyint_min', str(profile['gop']), '-sc_threshold', '0',
+        '-pix_fmt', profile['pix_fmt'], '-video_track_timescale', str(profile['timescale']),
+        '-movflags', '+faststart'
+    ]
+    if threads:
+        ffmpeg_cmd.extend(['-threads', str(threads)])
+    ffmpeg_cmd.append(tmp_path)
+
+    try:
+        run_ffmpeg('mezzanine', ffmpeg_cmd)
+        os.replace(tmp_path, output_path)
+        return output_path
+    except subprocess.CalledProcessError as e:
+        logger.error(f"FFmpeg error: {e.stderr.decode() if e.stderr else str(e)}")
+    except Exception as e:
+        logger.error(f"Error creating mezzanine for {source_path}: {e}")
+
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    return None
+
+def ingest_library(library_dir=None, max_workers=None, cpu_budget=None, profile=MEZZANINE_PROFILE):
+    """
+    Create or refresh mezzanine copies for every library video.
+
+    Args:
+        library_dir (str, optional): Video library root directory
+        max_workers (int, optional): Maximum number of concurrent FFmpeg jobs
+        cpu_budget (int, optional): Number of cores the ingest may use
+        profile (dict): Mezzanine profile
+
+    Returns:
+        dict: Counts of 'fresh', 'transcoded' and 'failed' videos
+    """
+    library_dir = library_dir or os.path.join('data', 'video_library')
+    catalog = get_video_catalog(library_dir)
+    sources = catalog.video_paths()
+
+    db = get_database()
+    records = db.get_mezzanines(sources)
+
+    stale = [path for path in sources if not _is_fresh(records.get(path), path, profile)]
+    counts = {'fresh': len(sources) - len(stale), 'transcoded': 0, 'failed': 0}
+
+    if not stale:
+        logger.info(f"All {len(sources)} mezzanine copies are fresh")
+        return counts
+
+    cpu_budget = max(1, cpu_budget or os.cpu_count() or 1)
+    workers = max(1, min(max_workers or cpu_budget, cpu_budget, len(stale)))
+    threads_per_job = max(1, cpu_budget // workers)
+    logger.info(f"Transcoding {len(stale)} mezzanine copies with {workers} workers x {threads_per_job} threads")
+
+    def ingest(source_path):
+        # Stat before transcoding so a concurrent edit leaves the copy stale
+        stat = os.stat(source_path)
+        output_path = transcode_mezzanine(source_path, _mezzanine_path(source_path, library_dir),
+                                          profile, threads_per_job)
+        return source_path, stat, output_path
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(ingest, stale))
+
+    for source_path, stat, output_path in results:
+        if output_path and db.save_mezzanine(source_path, output_path, stat.st_size,
+                                             stat.st_mtime, profile_id(profile)):
+            counts['transcoded'] += 1
+        else:
+            counts['failed'] += 1
+
+    logger.info(f"Mezzanine ingest: {counts}")
+    return counts
+
+def resolve_mezzanines(video_paths, profile=MEZZANINE_PROFILE):
+    """
+    Substitute fresh mezzanine copies for library videos.
+
+    Videos without a fresh mezzanine copy are returned unchanged.
+
+    Args:
+        video_paths (list): Video file paths
+        profile (dict): Mezzanine profile
+
+    Returns:
+        list: Video paths, preferring mezzanine copies
+    """
+    if not video_paths:
+        return []
+
+    try:
+        records = get_database().get_mezzanines(video_paths)
+    except Exception as e:
+        logger.warning(f"Could not look up mezzanine copies: {e}")
+        return list(video_paths)
+
+    resolved = []
+    for path in video_paths:
+        record = records.get(path)
+        resolved.append(record['mezzanine_path'] if _is_fresh(record, path, profile) else path)
+
+    used = sum(1 for a, b in zip(video_paths, resolved) if a != b)
+    if used:
+        logger.info(f"Using {used} of {len(video_paths)} mezzanine copies")
+    return resolved
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print(ingest_library(sys.argv[1] if len(sys.argv) > 1 else None))
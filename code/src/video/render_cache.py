@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Content-addressed cache for rendered effect videos.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join('data', 'output', 'processed_videos', 'cache')
+
+# Renders used this recently are never evicted, since another job may be
+# about to read them
+EVICT_GRACE_SECONDS = 600
+
+class RenderCache:
+    """Stores rendered videos keyed by source content and render settings."""
+
+    def __init__(self, cache_dir=None, max_size_mb=10240, max_entries=None):
+        """
+        Initialize render cache.
+
+        Args:
+            cache_dir (str, optional): Directory holding cached renders
+            max_size_mb (int): Total cache size before eviction kicks in
+            max_entries (int, optional): Maximum number of cached renders
+        """
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_size = max_size_mb * 1024 * 1024
+        self.max_entries = max_entries
+        self.hash_dir = os.path.join(self.cache_dir, 'hashes')
+        self._lock = threading.Lock()
+        self._hash_index = {}
+
+        os.makedirs(self.hash_dir, exist_ok=True)
+
+    def _hash_entry_path(self, abs_path):
+        """Get the file memoizing the hash of one source file."""
+        name = hashlib.sha256(abs_path.encode('utf-8')).hexdigest()
+        return os.path.join(self.hash_dir, f"{name}.json")
+
+    def _load_hash_entry(self, abs_path):
+        """Load the memoized hash of a source file, or None."""
+        try:
+            with open(self._hash_entry_path(abs_path), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Could not read render cache hash of {abs_path}: {e}")
+            return None
+
+    def _save_hash_entry(self, abs_path, entry):
+        """
+        Persist the memoized hash of a source file.
+
+        Every source has its own file, so workers sharing the cache never
+        overwrite each other's hashes.
+        """
+        path = self._hash_entry_path(abs_path)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(dict(entry, path=abs_path), f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not write render cache hash of {abs_path}: {e}")
+
+    def file_hash(self, path):
+        """
+        Get the SHA-256 of a file, reusing the stored hash while its size
+        and mtime are unchanged.
+
+        Args:
+            path (str): File path
+
+        Returns:
+            str: Hex digest
+        """
+        stat = os.stat(path)
+        abs_path = os.path.abspath(path)
+
+        with self._lock:
+            entry = self._hash_index.get(abs_path)
+        if entry is None:
+            entry = self._load_hash_entry(abs_path)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            with self._lock:
+                self._hash_index[abs_path] = entry
+            return entry['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+
+        entry = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'sha256': digest.hexdigest()
+        }
+        with self._lock:
+            self._hash_index[abs_path] = entry
+        self._save_hash_entry(abs_path, entry)
+        return entry['sha256']
+
+    def make_key(self, source_path, effect_type, filter_args, encoder_args):
+        """
+        Build the cache key for a render.
+
+        Args:
+            source_path (str): Source video path
+            effect_type (str): Effect name
+            filter_args (list): FFmpeg filter arguments
+            encoder_args (list): FFmpeg encoder arguments
+
+        Returns:
+            str: Cache key
+        """
+        payload = json.dumps({
+            'source': self.file_hash(source_path),
+            'effect': effect_type,
+            'filter': list(filter_args),
+            'encoder': list(encoder_args)
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        """Get the cache file path for a key."""
+        return os.path.join(self.cache_dir, f"{key}.mp4")
+
+    def _mark_used(self, path):
+        """
+        Record a use of a cached render for LRU eviction.
+
+        The time is kept on a '.used' marker next to the render; the render's
+        own mtime must not change, since pipeline checkpoints fingerprint it.
+        """
+        try:
+            with open(path + '.used', 'a'):
+                pass
+            os.utime(path + '.used', None)
+        except OSError:
+            pass
+
+    def lookup(self, key):
+        """
+        Look up a cached render and mark it as recently used.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            str: Path to cached render, or None on miss
+        """
+        path = self._entry_path(key)
+        if not os.path.exists(path):
+            return None
+
+        self._mark_used(path)
+        return path
+
+    def store(self, key, rendered_path):
+        """
+        Move a rendered file into the cache.
+
+        The render is moved, never linked, so nothing left outside the
+        cache can change the entry; use the returned path from then on.
+
+        Args:
+            key (str): Cache key
+            rendered_path (str): Path of the freshly rendered video
+
+        Returns:
+            str: Path to cached render, or None on error (the render then
+                stays at rendered_path)
+        """
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        try:
+            shutil.move(rendered_path, tmp_path)
+            os.replace(tmp_path, path)
+            self._mark_used(path)
+            return path
+        except Exception as e:
+            logger.warning(f"Could not store render in cache: {e}")
+            if os.path.exists(tmp_path) and not os.path.exists(rendered_path):
+                shutil.move(tmp_path, rendered_path)
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+    def evict(self, keep=()):
+        """
+        Remove least recently used renders until the cache fits its limits.
+
+        Renders in keep and renders used within EVICT_GRACE_SECONDS are
+        left in place, even if the cache stays over its limits.
+
+        Args:
+            keep (iterable): Cached paths that must not be removed, e.g.
+                the renders handed out by the current batch
+
+        Returns:
+            int: Number of renders removed
+        """
+        keep = {os.path.abspath(path) for path in keep if path}
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.mp4'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            try:
+                last_used = os.stat(path + '.used').st_mtime
+            except OSError:
+                last_used = stat.st_mtime
+            entries.append((last_used, stat.st_size, path))
+
+        entries.sort()
+        total_size = sum(size for _, size, _ in entries)
+        count = len(entries)
+        removed = 0
+        cutoff = time.time() - EVICT_GRACE_SECONDS
+
+        for last_used, size, path in entries:
+            if total_size <= self.max_size and (self.max_entries is None or count <= self.max_entries):
+                break
+            if last_used > cutoff or os.path.abspath(path) in keep:
+                continue
+            try:
+                os.remove(path)
+                if os.path.exists(path + '.used'):
+                    os.remove(path + '.used')
+                total_size -= size
+                count -= 1
+                removed += 1
+            except OSError as e:
+                logger.warning(f"Could not evict {path}: {e}")
+
+        if removed:
+            logger.info(f"Evicted {removed} renders from cache")
+        return removed
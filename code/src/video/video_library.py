@@ -9,6 +9,7 @@ import os
 import random
 import logging
 from utils.db_connector import DatabaseConnector
+from src.video.media_probe import probe_video
 
 logger = logging.getLogger(__name__)
 
@@ -74,22 +75,12 @@ def get_video_metadata(video_path):
             logger.error(f"Video file not found: {video_path}")
             return None
         
-        # Get basic file info
-        filename = os.path.basename(video_path)
-        size = os.path.getsize(video_path)
-        
-        # For more detailed metadata, we would normally use moviepy or opencv
-        # This is a simplified version
-        metadata = {
-            'path': video_path,
-            'filename': filename,
-            'size': size,
-            'category': os.path.basename(os.path.dirname(video_path)),
-            'duration': 10.0,  # Placeholder
-            'width': 1920,     # Placeholder
-            'height': 1080     # Placeholder
-        }
+        # Probe results are cached in memory and in the video_probes table
+        metadata = probe_video(video_path)
+        if not metadata:
+            return None
         
+        filename = metadata['filename']
         logger.info(f"Retrieved metadata for video: {filename}")
         return metadata
         
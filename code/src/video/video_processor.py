@@ -5,9 +5,10 @@
 Processes video content based on user selection.
 """
 
-import os
 import logging
-from src.video.video_library import get_videos_by_label, get_video_metadata
+from src.video.video_library import get_videos_by_label
+from src.video.media_probe import probe_videos
+from utils.video_catalog import get_video_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -31,11 +32,7 @@ def process_videos(selected_labels=None):
             video_files.extend(label_videos)
     else:
         # Get all videos if no labels specified
-        video_dir = os.path.join('data', 'video_library')
-        for root, _, files in os.walk(video_dir):
-            for file in files:
-                if file.endswith('.mp4'):
-                    video_files.append(os.path.join(root, file))
+        video_files = get_video_catalog().video_paths(extensions=('.mp4',))
     
     logger.info(f"Processed {len(video_files)} video files")
     return video_files
@@ -53,10 +50,11 @@ def filter_videos_by_duration(video_files, min_duration=5, max_duration=60):
         list: Filtered video file paths
     """
     filtered_videos = []
+    probes = probe_videos(video_files)
     
     for video_path in video_files:
-        metadata = get_video_metadata(video_path)
-        duration = metadata.get('duration', 0)
+        metadata = probes.get(video_path) or {}
+        duration = metadata.get('duration') or 0
         
         if min_duration <= duration <= max_duration:
             filtered_videos.append(video_path)
@@ -77,11 +75,12 @@ def sort_videos_by_quality(video_files, min_resolution=(720, 480)):
         list: Sorted video file paths (higher quality first)
     """
     video_quality = []
+    probes = probe_videos(video_files)
     
     for video_path in video_files:
-        metadata = get_video_metadata(video_path)
-        width = metadata.get('width', 0)
-        height = metadata.get('height', 0)
+        metadata = probes.get(video_path) or {}
+        width = metadata.get('width') or 0
+        height = metadata.get('height') or 0
         
         # Skip videos below minimum resolution
         if width < min_resolution[0] or height < min_resolution[1]:
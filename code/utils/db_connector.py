@@ -9,6 +9,7 @@ import os
 import json
 import logging
 import sqlite3
+import time
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -40,7 +41,8 @@ class DatabaseConnector:
             bool: True if connection successful, False otherwise
         """
         try:
-            self.connection = sqlite3.connect(self.db_path)
+            # Wait on locks held by other workers sharing the database
+            self.connection = sqlite3.connect(self.db_path, timeout=30)
             self.cursor = self.connection.cursor()
             logger.info(f"Connected to database: {self.db_path}")
             return True
@@ -113,6 +115,87 @@ class DatabaseConnector:
             )
             ''')
             
+            # Probed stream parameters, kept apart from the curated library
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS video_probes (
+                path TEXT PRIMARY KEY,
+                duration REAL,
+                width INTEGER,
+                height INTEGER,
+                codec TEXT,
+                fps REAL,
+                pix_fmt TEXT,
+                time_base TEXT,
+                extradata TEXT,
+                has_audio INTEGER,
+                file_size INTEGER,
+                file_mtime REAL,
+                probed_date DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            ''')
+            
+            # Video catalog table (filesystem snapshot of the library)
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS video_catalog (
+                library_dir TEXT NOT NULL,
+                rel_path TEXT NOT NULL,
+                category TEXT NOT NULL,
+                size INTEGER,
+                mtime REAL,
+                ctime REAL,
+                metadata_mtime REAL,
+                metadata TEXT,
+                scanned_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (library_dir, rel_path)
+            )
+            ''')
+            
+            # Mezzanine copies of library videos
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mezzanine (
+                source_path TEXT PRIMARY KEY,
+                mezzanine_path TEXT NOT NULL,
+                source_size INTEGER,
+                source_mtime REAL,
+                profile TEXT NOT NULL,
+                created_date DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            ''')
+            
+            # Render job queue shared by worker processes
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                priority INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 3,
+                available_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_expires REAL,
+                result TEXT,
+                error TEXT,
+                created_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_date DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            ''')
+            self.cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, priority, available_at)"
+            )
+            
+            # Per-job timing summaries from utils.tracing
+            self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS job_traces (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                trace_id TEXT NOT NULL,
+                total_seconds REAL,
+                span_summary TEXT,
+                trace_path TEXT,
+                created_date DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            ''')
+            
             self.connection.commit()
             logger.info("Database initialized successfully")
             return True
@@ -483,4 +566,509 @@ class DatabaseConnector:
             logger.error(f"Error searching videos: {e}")
             return []
         finally:
-            self.disconnect() 
\ No newline at end of file
+            self.disconnect()
+    
+    def get_catalog_entries(self, library_dir):
+        """
+        Get all catalog entries for a video library.
+        
+        Args:
+            library_dir (str): Absolute path of the library root
+        
+        Returns:
+            list: List of catalog records
+        """
+        if not self.connect():
+            return []
+        
+        try:
+            self.cursor.execute(
+                "SELECT * FROM video_catalog WHERE library_dir = ?",
+                (library_dir,)
+            )
+            entries = self.cursor.fetchall()
+            
+            # Convert to list of dictionaries
+            columns = [col[0] for col in self.cursor.description]
+            result = []
+            for entry in entries:
+                entry_dict = dict(zip(columns, entry))
+                
+                # Parse JSON strings
+                if entry_dict.get('metadata'):
+                    try:
+                        entry_dict['metadata'] = json.loads(entry_dict['metadata'])
+                    except:
+                        entry_dict['metadata'] = None
+                
+                result.append(entry_dict)
+            
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error retrieving catalog entries: {e}")
+            return []
+        finally:
+            self.disconnect()
+    
+    def save_catalog_entries(self, library_dir, entries, removed_paths=None):
+        """
+        Insert or update catalog entries and drop removed ones.
+        
+        Args:
+            library_dir (str): Absolute path of the library root
+            entries (list): Catalog records to upsert
+            removed_paths (list, optional): Relative paths no longer on disk
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if not self.connect():
+            return False
+        
+        try:
+            for entry in entries:
+                metadata = entry.get('metadata')
+                if metadata is not None:
+                    metadata = json.dumps(metadata)
+                
+                self.cursor.execute(
+                    """INSERT OR REPLACE INTO video_catalog 
+                       (library_dir, rel_path, category, size, mtime, ctime, metadata_mtime, metadata, scanned_date) 
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)""",
+                    (library_dir, entry['rel_path'], entry['category'], entry['size'], entry['mtime'],
+                     entry['ctime'], entry.get('metadata_mtime'), metadata)
+                )
+            
+            for rel_path in removed_paths or []:
+                self.cursor.execute(
+                    "DELETE FROM video_catalog WHERE library_dir = ? AND rel_path = ?",
+                    (library_dir, rel_path)
+                )
+            
+            self.connection.commit()
+            logger.info(f"Updated {len(entries)} and removed {len(removed_paths or [])} catalog entries")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error saving catalog entries: {e}")
+            return False
+        finally:
+            self.disconnect()
+    
+    def get_video_probes(self, paths):
+        """
+        Get probed stream parameters for library videos.
+        
+        Args:
+            paths (list): Video file paths
+        
+        Returns:
+            dict: Mapping of each given path to its probe record
+        """
+        if not paths or not self.connect():
+            return {}
+        
+        try:
+            result = {}
+            # Records are keyed by absolute path
+            abs_paths = {}
+            for path in paths:
+                abs_paths.setdefault(os.path.abspath(path), []).append(path)
+            keys = list(abs_paths)
+            # Stay below SQLite's bound parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                self.cursor.execute(
+                    f"SELECT * FROM video_probes WHERE path IN ({placeholders})",
+                    chunk
+                )
+                columns = [col[0] for col in self.cursor.description]
+                for video in self.cursor.fetchall():
+                    video_dict = dict(zip(columns, video))
+                    if video_dict['has_audio'] is not None:
+                        video_dict['has_audio'] = bool(video_dict['has_audio'])
+                    for path in abs_paths[video_dict['path']]:
+                        result[path] = video_dict
+            
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error retrieving video probes: {e}")
+            return {}
+        finally:
+            self.disconnect()
+    
+    def save_video_probes(self, probes):
+        """
+        Store probed stream parameters for library videos.
+        
+        Probes live in their own table, so probing a file never adds it to
+        video_library.
+        
+        Args:
+            probes (list): List of probe dictionaries with 'path'
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if not probes or not self.connect():
+            return False
+        
+        try:
+            for probe in probes:
+                has_audio = probe.get('has_audio')
+                self.cursor.execute(
+                    """INSERT OR REPLACE INTO video_probes 
+                       (path, duration, width, height, codec, fps, pix_fmt, time_base, extradata, has_audio, file_size, file_mtime) 
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (os.path.abspath(probe['path']), probe.get('duration'), probe.get('width'),
+                     probe.get('height'), probe.get('codec'), probe.get('fps'), probe.get('pix_fmt'),
+                     probe.get('time_base'), probe.get('extradata'), None if has_audio is None else int(has_audio),
+                     probe.get('size'), probe.get('mtime'))
+                )
+            
+            self.connection.commit()
+            logger.info(f"Saved probe results for {len(probes)} videos")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error saving video probes: {e}")
+            return False
+        finally:
+            self.disconnect()
+    
+    def get_mezzanines(self, source_paths):
+        """
+        Get mezzanine records for source videos.
+        
+        Args:
+            source_paths (list): Source video paths
+        
+        Returns:
+            dict: Mapping of source path to mezzanine record
+        """
+        if not source_paths or not self.connect():
+            return {}
+        
+        try:
+            result = {}
+            source_paths = list(source_paths)
+            for start in range(0, len(source_paths), 500):
+                chunk = source_paths[start:start + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                self.cursor.execute(
+                    f"SELECT * FROM mezzanine WHERE source_path IN ({placeholders})",
+                    chunk
+                )
+                columns = [col[0] for col in self.cursor.description]
+                for record in self.cursor.fetchall():
+                    record_dict = dict(zip(columns, record))
+                    result[record_dict['source_path']] = record_dict
+            
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error retrieving mezzanine records: {e}")
+            return {}
+        finally:
+            self.disconnect()
+    
+    def save_mezzanine(self, source_path, mezzanine_path, source_size, source_mtime, profile):
+        """
+        Record a mezzanine copy of a source video.
+        
+        Args:
+            source_path (str): Source video path
+            mezzanine_path (str): Mezzanine video path
+            source_size (int): Source file size when transcoded
+            source_mtime (float): Source modification time when transcoded
+            profile (str): Mezzanine profile identifier
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if not self.connect():
+            return False
+        
+        try:
+            self.cursor.execute(
+                """INSERT OR REPLACE INTO mezzanine 
+                   (source_path, mezzanine_path, source_size, source_mtime, profile, created_date) 
+                   VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)""",
+                (source_path, mezzanine_path, source_size, source_mtime, profile)
+            )
+            self.connection.commit()
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error saving mezzanine record: {e}")
+            return False
+        finally:
+            self.disconnect()
+    
+    def enqueue_job(self, payload, priority=0, max_attempts=3, delay=0):
+        """
+        Add a job to the render queue.
+        
+        Args:
+            payload (dict): Job description
+            priority (int): Higher priorities are claimed first
+            max_attempts (int): Attempts before the job is marked failed
+            delay (float): Seconds before the job becomes claimable
+        
+        Returns:
+            int: ID of the queued job, or None on error
+        """
+        if not self.connect():
+            return None
+        
+        try:
+            self.cursor.execute(
+                """INSERT INTO jobs (payload, priority, max_attempts, available_at) 
+                   VALUES (?, ?, ?, ?)""",
+                (json.dumps(payload), priority, max_attempts, time.time() + delay)
+            )
+            self.connection.commit()
+            return self.cursor.lastrowid
+            
+        except Exception as e:
+            logger.error(f"Error enqueuing job: {e}")
+            return None
+        finally:
+            self.disconnect()
+    
+    def claim_job(self, worker_id, lease_seconds=60):
+        """
+        Atomically claim the next runnable job.
+        
+        Queued jobs whose backoff has elapsed and running jobs whose lease
+        expired are both eligible. Expired jobs that used up their
+        attempts are marked failed instead.
+        
+        Args:
+            worker_id (str): Identifier of the claiming worker
+            lease_seconds (float): Lease length granted to the worker
+        
+        Returns:
+            dict: Claimed job with decoded payload, or None if none is runnable
+        """
+        if not self.connect():
+            return None
+        
+        try:
+            now = time.time()
+            # Take the write lock up front so two workers cannot pick the same row
+            self.cursor.execute("BEGIN IMMEDIATE")
+            self.cursor.execute(
+                """UPDATE jobs SET status = 'failed', lease_owner = NULL, 
+                   error = COALESCE(error, 'lease expired'), updated_date = CURRENT_TIMESTAMP 
+                   WHERE status = 'running' AND lease_expires < ? AND attempts >= max_attempts""",
+                (now,)
+            )
+            self.cursor.execute(
+                """SELECT * FROM jobs 
+                   WHERE (status = 'queued' AND available_at <= ?) 
+                      OR (status = 'running' AND lease_expires < ?) 
+                   ORDER BY priority DESC, available_at, id LIMIT 1""",
+                (now, now)
+            )
+            row = self.cursor.fetchone()
+            if not row:
+                self.connection.commit()
+                return None
+            
+            job = dict(zip([col[0] for col in self.cursor.description], row))
+            if job['status'] == 'running':
+                logger.warning(f"Reclaiming job {job['id']} from {job['lease_owner']} after lease expiry")
+            
+            self.cursor.execute(
+                """UPDATE jobs SET status = 'running', lease_owner = ?, lease_expires = ?, 
+                   attempts = attempts + 1, updated_date = CURRENT_TIMESTAMP WHERE id = ?""",
+                (worker_id, now + lease_seconds, job['id'])
+            )
+            self.connection.commit()
+            
+            job.update({
+                'status': 'running',
+                'lease_owner': worker_id,
+                'lease_expires': now + lease_seconds,
+                'attempts': job['attempts'] + 1,
+                'payload': json.loads(job['payload'])
+            })
+            return job
+            
+        except Exception as e:
+            logger.error(f"Error claiming job: {e}")
+            self.connection.rollback()
+            return None
+        finally:
+            self.disconnect()
+    
+    def heartbeat_job(self, job_id, worker_id, lease_seconds=60):
+        """
+        Extend the lease on a running job.
+        
+        Args:
+            job_id (int): Job ID
+            worker_id (str): Worker holding the lease
+            lease_seconds (float): New lease length from now
+        
+        Returns:
+            bool: True if the worker still holds the lease, False if it lost
+                it, None if the database could not be reached
+        """
+        if not self.connect():
+            return None
+        
+        try:
+            self.cursor.execute(
+                """UPDATE jobs SET lease_expires = ? 
+                   WHERE id = ? AND lease_owner = ? AND status = 'running'""",
+                (time.time() + lease_seconds, job_id, worker_id)
+            )
+            self.connection.commit()
+            return self.cursor.rowcount == 1
+            
+        except Exception as e:
+            logger.error(f"Error extending lease on job {job_id}: {e}")
+            return None
+        finally:
+            self.disconnect()
+    
+    def complete_job(self, job_id, worker_id, result=None):
+        """
+        Mark a running job as done.
+        
+        Args:
+            job_id (int): Job ID
+            worker_id (str): Worker holding the lease
+            result (dict, optional): Job result
+        
+        Returns:
+            bool: True if the job was completed by this worker
+        """
+        if not self.connect():
+            return False
+        
+        try:
+            self.cursor.execute(
+                """UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_owner = NULL, 
+                   lease_expires = NULL, updated_date = CURRENT_TIMESTAMP 
+                   WHERE id = ? AND lease_owner = ? AND status = 'running'""",
+                (json.dumps(result), job_id, worker_id)
+            )
+            self.connection.commit()
+            return self.cursor.rowcount == 1
+            
+        except Exception as e:
+            logger.error(f"Error completing job {job_id}: {e}")
+            return False
+        finally:
+            self.disconnect()
+    
+    def fail_job(self, job_id, worker_id, error, retry_delay=0):
+        """
+        Record a failed attempt, requeueing the job while attempts remain.
+        
+        Args:
+            job_id (int): Job ID
+            worker_id (str): Worker holding the lease
+            error (str): Error description
+            retry_delay (float): Seconds before the job may be retried
+        
+        Returns:
+            str: New job status ('queued' or 'failed'), or None if the
+                worker no longer held the lease
+        """
+        if not self.connect():
+            return None
+        
+        try:
+            self.cursor.execute(
+                """UPDATE jobs SET 
+                       status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END, 
+                       available_at = ?, error = ?, lease_owner = NULL, lease_expires = NULL, 
+                       updated_date = CURRENT_TIMESTAMP 
+                   WHERE id = ? AND lease_owner = ? AND status = 'running'""",
+                (time.time() + retry_delay, error, job_id, worker_id)
+            )
+            self.connection.commit()
+            if self.cursor.rowcount != 1:
+                return None
+            
+            self.cursor.execute("SELECT status FROM jobs WHERE id = ?", (job_id,))
+            return self.cursor.fetchone()[0]
+            
+        except Exception as e:
+            logger.error(f"Error failing job {job_id}: {e}")
+            return None
+        finally:
+            self.disconnect()
+    
+    def get_job_counts(self):
+        """
+        Count jobs by status.
+        
+        Returns:
+            dict: Mapping of status to number of jobs
+        """
+        if not self.connect():
+            return {}
+        
+        try:
+            self.cursor.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+            return dict(self.cursor.fetchall())
+            
+        except Exception as e:
+            logger.error(f"Error counting jobs: {e}")
+            return {}
+        finally:
+            self.disconnect()
+    
+    def save_trace_summary(self, trace_id, total_seconds, span_summary, trace_path=None):
+        """
+        Save the timing summary of a traced job.
+        
+        Args:
+            trace_id (str): Identifier of the traced job
+            total_seconds (float): Wall-clock duration of the job
+            span_summary (dict): Per-span totals from Trace.summary()
+            trace_path (str, optional): Path to the Chrome trace JSON
+        
+        Returns:
+            int: ID of inserted record, or None on error
+        """
+        if not self.connect():
+            return None
+        
+        try:
+            self.cursor.execute(
+                """INSERT INTO job_traces (trace_id, total_seconds, span_summary, trace_path) 
+                   VALUES (?, ?, ?, ?)""",
+                (trace_id, total_seconds, json.dumps(span_summary), trace_path)
+            )
+            self.connection.commit()
+            return self.cursor.lastrowid
+            
+        except Exception as e:
+            logger.error(f"Error saving trace summary: {e}")
+            return None
+        finally:
+            self.disconnect()
+
+_schema_ready = False
+
+def get_database():
+    """
+    Get a database connector, creating or migrating the schema on first use.
+    
+    Returns:
+        DatabaseConnector: Connector for the default database
+    """
+    global _schema_ready
+    db = DatabaseConnector()
+    if not _schema_ready:
+        _schema_ready = db.initialize_database()
+    return db
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Connects FFmpeg processes through named pipes.
+
+Producers write raw frames in NUT to FIFOs that one consumer reads as
+inputs, so frames flow from stage to stage as they are produced instead
+of being encoded to an intermediate file and decoded again.
+"""
+
+import os
+import signal
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from utils.tracing import in_context
+from utils.ffmpeg_runner import run_ffmpeg
+
+logger = logging.getLogger(__name__)
+
+# Output arguments of every producer; raw frames need no encode or decode
+STREAM_FORMAT_ARGS = ['-an', '-c:v', 'rawvideo', '-pix_fmt', 'yuv420p', '-f', 'nut']
+
+def fifo_supported():
+    """Whether named pipes are available on this platform."""
+    return hasattr(os, 'mkfifo')
+
+def _broken_pipe(error):
+    """Whether a producer only failed because its consumer stopped reading."""
+    if not isinstance(error, subprocess.CalledProcessError):
+        return False
+    if error.returncode == -signal.SIGPIPE:
+        return True
+    return b'Broken pipe' in (error.stderr or b'')
+
+class FifoGroup:
+    """
+    Producers streaming into named pipes read by one consumer.
+
+    Producers are registered with add() and only started by start(), which
+    the consumer passes to run_ffmpeg() as on_start: they must not run
+    (or count against their timeout) while the consumer waits for a slot.
+    """
+
+    def __init__(self):
+        """Initialize an empty group; use it as a context manager."""
+        self.fifo_dir = None
+        self._producers = []
+        self._closing = threading.Event()
+
+    def __enter__(self):
+        self.fifo_dir = tempfile.mkdtemp(prefix='ffmpeg_fifo_')
+        return self
+
+    def add(self, step, ffmpeg_cmd):
+        """
+        Register a producer writing into a new FIFO.
+
+        Args:
+            step (str): Step name for metrics and tracing
+            ffmpeg_cmd (list): FFmpeg command up to its output options; the
+                stream format and FIFO path are appended
+
+        Returns:
+            list: Input arguments for the consumer command
+        """
+        fifo_path = os.path.join(self.fifo_dir, f"stream_{len(self._producers)}.nut")
+        os.mkfifo(fifo_path)
+        errors = []
+
+        def produce():
+            try:
+                run_ffmpeg(step, list(ffmpeg_cmd) + STREAM_FORMAT_ARGS + [fifo_path], kind='stream')
+            except Exception as e:
+                errors.append(e)
+                self._release_reader(fifo_path)
+
+        thread = threading.Thread(target=in_context(produce), daemon=True)
+        self._producers.append((fifo_path, thread, errors))
+        return ['-f', 'nut', '-i', fifo_path]
+
+    def start(self, process=None):
+        """
+        Start the registered producers once their consumer is running.
+
+        Args:
+            process (subprocess.Popen, optional): The consumer, as passed by
+                run_ffmpeg(); unused
+        """
+        for _, thread, _ in self._producers:
+            if thread.ident is None:
+                thread.start()
+
+    def _release_reader(self, fifo_path):
+        """Let a consumer waiting on a failed producer's FIFO see end of stream."""
+        while not self._closing.is_set():
+            try:
+                os.close(os.open(fifo_path, os.O_WRONLY | os.O_NONBLOCK))
+                return
+            except OSError:
+                # No reader yet
+                self._closing.wait(0.1)
+
+    def __exit__(self, exc_type, exc, tb):
+        self._closing.set()
+        for fifo_path, thread, _ in self._producers:
+            if thread.ident is None:
+                continue
+            # A producer may only open its FIFO after a release, so repeat it
+            # until the producer runs into a broken pipe and exits
+            while thread.is_alive():
+                try:
+                    os.close(os.open(fifo_path, os.O_RDONLY | os.O_NONBLOCK))
+                except OSError:
+                    pass
+                thread.join(0.1)
+        shutil.rmtree(self.fifo_dir, ignore_errors=True)
+
+        # A consumer that stops early (e.g. at -t) breaks the pipe of producers
+        # with frames left; any other producer failure truncated its stream
+        failures = [e for _, _, errors in self._producers for e in errors if not _broken_pipe(e)]
+        if failures and exc_type is None:
+            raise RuntimeError(f"{len(failures)} of {len(self._producers)} stream producers failed: {failures[0]}")
+        return False
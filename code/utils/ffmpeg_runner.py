@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Runs FFmpeg with machine-readable progress and records per-encode metrics.
+"""
+
+import os
+import time
+import logging
+import threading
+import subprocess
+from collections import deque
+from utils.tracing import span
+from utils.process_supervisor import get_supervisor
+
+logger = logging.getLogger(__name__)
+
+# Number of recent invocations kept for get_metrics()
+METRICS_HISTORY = 1000
+
+_metrics = deque(maxlen=METRICS_HISTORY)
+_metrics_lock = threading.Lock()
+
+def _parse_number(value, suffix=''):
+    """Parse a progress value such as '1.23x' or '611.7kbits/s'."""
+    if value is None:
+        return None
+    value = value.strip()
+    if suffix and value.endswith(suffix):
+        value = value[:-len(suffix)]
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def _parse_progress(block):
+    """
+    Convert one -progress block into typed values.
+
+    Args:
+        block (dict): Raw key/value pairs of one progress report
+
+    Returns:
+        dict: frames, fps, speed, bitrate_kbps, total_size and out_time
+    """
+    out_time_us = _parse_number(block.get('out_time_us'))
+    frames = _parse_number(block.get('frame'))
+    total_size = _parse_number(block.get('total_size'))
+    return {
+        'frames': int(frames) if frames is not None else None,
+        'fps': _parse_number(block.get('fps')),
+        'speed': _parse_number(block.get('speed'), 'x'),
+        'bitrate_kbps': _parse_number(block.get('bitrate'), 'kbits/s'),
+        'total_size': int(total_size) if total_size is not None else None,
+        'out_time': out_time_us / 1e6 if out_time_us is not None and out_time_us >= 0 else None
+    }
+
+def _wait_with_usage(process):
+    """
+    Wait for a child process and get its CPU time.
+
+    Returns:
+        float: User plus system CPU seconds, or None where unsupported
+    """
+    if not hasattr(os, 'wait4'):
+        process.wait()
+        return None
+
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return usage.ru_utime + usage.ru_stime
+
+def run_ffmpeg(step, ffmpeg_cmd, on_progress=None, duration=None, kind='encode', on_start=None):
+    """
+    Run an FFmpeg command under the process supervisor, parsing its
+    -progress output.
+
+    Args:
+        step (str): Name of the step, used for metrics and tracing
+        ffmpeg_cmd (list): FFmpeg command line starting with the binary
+        on_progress (callable, optional): Called with the parsed progress
+            dict after every progress report
+        duration (float, optional): Expected output duration in seconds,
+            used to add a 'fraction' to progress reports
+        kind (str): Supervisor process kind, 'encode' or 'stream'
+        on_start (callable, optional): Called with the process once it has
+            its slot and is running, e.g. to start the producers feeding it
+
+    Returns:
+        dict: Metrics of the run (step, wall_time, cpu_time, frames, fps,
+            speed, bitrate_kbps, total_size, out_time)
+
+    Raises:
+        subprocess.CalledProcessError: If FFmpeg exits with an error; the
+            captured stderr is attached
+        subprocess.TimeoutExpired: If the supervisor killed FFmpeg on timeout
+        ProcessCancelled: If the job running FFmpeg was cancelled
+    """
+    supervisor = get_supervisor()
+    cmd = [ffmpeg_cmd[0], '-hide_banner', '-nostats', '-progress', 'pipe:1'] + list(ffmpeg_cmd[1:])
+    threads = supervisor.threads_per_encode()
+    if threads and '-threads' not in cmd:
+        # Keep the encode within the job's CPU budget
+        cmd[-1:-1] = ['-threads', str(threads)]
+
+    with span(f"ffmpeg.{step}") as attributes:
+        queued = time.perf_counter()
+        with supervisor.process(cmd, kind, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as process:
+            start = time.perf_counter()
+            if on_start:
+                on_start(process)
+
+            # Drain stderr on the side so a chatty encode cannot block on a full pipe
+            stderr_chunks = []
+            stderr_thread = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()),
+                                             daemon=True)
+            stderr_thread.start()
+
+            progress = {}
+            block = {}
+            for raw_line in process.stdout:
+                key, _, value = raw_line.decode('utf-8', 'replace').strip().partition('=')
+                if key != 'progress':
+                    block[key] = value
+                    continue
+
+                progress = _parse_progress(block)
+                block = {}
+                if on_progress:
+                    if duration and progress['out_time'] is not None:
+                        progress['fraction'] = min(1.0, progress['out_time'] / duration)
+                    try:
+                        on_progress(dict(progress, step=step, done=(value == 'end')))
+                    except Exception as e:
+                        logger.warning(f"FFmpeg progress callback failed: {e}")
+
+            cpu_time = _wait_with_usage(process)
+            stderr_thread.join()
+            process.stdout.close()
+            process.stderr.close()
+            wall_time = time.perf_counter() - start
+
+        metrics = {
+            'step': step,
+            'wall_time': round(wall_time, 3),
+            'cpu_time': round(cpu_time, 3) if cpu_time is not None else None,
+            'queue_time': round(start - queued, 3),
+            'returncode': process.returncode
+        }
+        metrics.update({key: value for key, value in progress.items() if key != 'fraction'})
+        attributes.update(metrics)
+
+        with _metrics_lock:
+            _metrics.append(metrics)
+
+        supervisor.check(process, cmd, b'', b''.join(stderr_chunks))
+
+    logger.info(f"FFmpeg {step}: {wall_time:.2f}s wall, "
+                f"{metrics['cpu_time'] if metrics['cpu_time'] is not None else '?'}s CPU, "
+                f"{metrics.get('frames')} frames, {metrics.get('fps')} fps, {metrics.get('speed')}x")
+    return metrics
+
+def get_metrics(step=None):
+    """
+    Get the metrics of recent FFmpeg runs.
+
+    Args:
+        step (str, optional): Only return runs of this step
+
+    Returns:
+        list: Metrics dictionaries, oldest first
+    """
+    with _metrics_lock:
+        runs = list(_metrics)
+    return [run for run in runs if step is None or run['step'] == step]
+
+def summarize_metrics():
+    """
+    Aggregate recent FFmpeg runs by step, slowest first.
+
+    Returns:
+        list: Dictionaries with step, runs, wall_time, cpu_time,
+            cpu_per_wall and mean speed
+    """
+    steps = {}
+    for run in get_metrics():
+        entry = steps.setdefault(run['step'], {'step': run['step'], 'runs': 0, 'wall_time': 0.0,
+                                               'cpu_time': 0.0, 'speeds': []})
+        entry['runs'] += 1
+        entry['wall_time'] += run['wall_time']
+        entry['cpu_time'] += run['cpu_time'] or 0.0
+        if run.get('speed'):
+            entry['speeds'].append(run['speed'])
+
+    summary = []
+    for entry in steps.values():
+        speeds = entry.pop('speeds')
+        entry['wall_time'] = round(entry['wall_time'], 3)
+        entry['cpu_time'] = round(entry['cpu_time'], 3)
+        # Cores kept busy on average; well below the thread count means idle workers
+        entry['cpu_per_wall'] = round(entry['cpu_time'] / entry['wall_time'], 2) if entry['wall_time'] else None
+        entry['speed'] = round(sum(speeds) / len(speeds), 2) if speeds else None
+        summary.append(entry)
+
+    return sorted(summary, key=lambda entry: entry['wall_time'], reverse=True)
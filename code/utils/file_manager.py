@@ -12,6 +12,7 @@ import json
 import tempfile
 import hashlib
 from datetime import datetime
+from utils.video_catalog import get_video_catalog
 
 logger = logging.getLogger(__name__)
 
@@ -278,27 +279,11 @@ class FileManager:
             dict: Dictionary of category: [files] mappings
         """
         library = {}
-        video_dir = self.dirs['video_library']
         
         try:
-            for root, dirs, files in os.walk(video_dir):
-                # Get category from directory structure
-                # The immediate subdirectory under video_library is the category
-                rel_path = os.path.relpath(root, video_dir)
-                if rel_path == '.':
-                    category = 'uncategorized'
-                else:
-                    category = rel_path.split(os.sep)[0]
-                
-                if category not in library:
-                    library[category] = []
-                
-                for file in files:
-                    if file.endswith(('.mp4', '.mov', '.avi', '.mkv')):
-                        file_path = os.path.join(root, file)
-                        file_info = self.get_file_info(file_path)
-                        if file_info:
-                            library[category].append(file_info)
+            catalog = get_video_catalog(self.dirs['video_library'])
+            for entry in catalog.entries():
+                library.setdefault(entry['category'], []).append(catalog.file_info(entry))
             
             logger.info(f"Scanned video library: {sum(len(files) for files in library.values())} videos in {len(library)} categories")
             return library
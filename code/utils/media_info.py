@@ -0,0 +1,441 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Reads media metadata in-process, without spawning ffprobe or decoding.
+
+PyAV is used when it is installed. Otherwise WAV, MP3 and MP4/MOV headers
+are parsed directly. Results are cached per (path, mtime, size), so
+repeated lookups of an unchanged file are a dictionary hit.
+"""
+
+import os
+import zlib
+import struct
+import logging
+import functools
+
+try:
+    import av
+except ImportError:
+    av = None
+
+logger = logging.getLogger(__name__)
+
+# Number of files whose metadata is kept in memory
+CACHE_SIZE = 4096
+
+# MP4 sample entry types and the codec names FFmpeg reports for them
+MP4_CODECS = {
+    'avc1': 'h264', 'avc3': 'h264', 'hvc1': 'hevc', 'hev1': 'hevc', 'av01': 'av1',
+    'vp09': 'vp9', 'mp4v': 'mpeg4', 'mp4a': 'aac', 'Opus': 'opus', '.mp3': 'mp3',
+    'ac-3': 'ac3', 'ec-3': 'eac3', 'alac': 'alac'
+}
+
+# Container boxes walked to reach the sample tables
+MP4_CONTAINERS = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+
+# MPEG audio bitrates (kbit/s) by (version is MPEG-1, layer) and sample rates by version
+MP3_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+}
+MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+def _empty_info():
+    """Get a metadata dictionary with every field unknown."""
+    return {
+        'duration': None, 'width': None, 'height': None, 'codec': None, 'fps': None,
+        'pix_fmt': None, 'time_base': None, 'extradata': None, 'has_audio': False,
+        'audio_codec': None, 'sample_rate': None, 'channels': None
+    }
+
+def extradata_hash(data):
+    """
+    Hash codec extradata (e.g. an avcC record with the SPS and PPS).
+
+    Returns:
+        str: CRC32 in hex, as printed by ffprobe -show_data_hash CRC32,
+            or None without extradata
+    """
+    return f"{zlib.crc32(data):08x}" if data else None
+
+def _read_with_av(path):
+    """
+    Read metadata by opening the container with PyAV (no frames are decoded).
+
+    Args:
+        path (str): Media file path
+
+    Returns:
+        dict: Metadata dictionary
+    """
+    info = _empty_info()
+    with av.open(path) as container:
+        if container.duration:
+            info['duration'] = container.duration / av.time_base
+
+        if container.streams.video:
+            stream = container.streams.video[0]
+            codec = stream.codec_context
+            rate = stream.average_rate or stream.base_rate
+            info.update({
+                'width': codec.width,
+                'height': codec.height,
+                'codec': codec.name,
+                'fps': float(rate) if rate else None,
+                'pix_fmt': codec.pix_fmt,
+                'extradata': extradata_hash(codec.extradata),
+                'time_base': f"{stream.time_base.numerator}/{stream.time_base.denominator}"
+                             if stream.time_base else None
+            })
+            if info['duration'] is None and stream.duration and stream.time_base:
+                info['duration'] = float(stream.duration * stream.time_base)
+
+        if container.streams.audio:
+            stream = container.streams.audio[0]
+            codec = stream.codec_context
+            info.update({
+                'has_audio': True,
+                'audio_codec': codec.name,
+                'sample_rate': codec.sample_rate,
+                'channels': codec.channels if hasattr(codec, 'channels') else codec.layout.nb_channels
+            })
+            if info['duration'] is None and stream.duration and stream.time_base:
+                info['duration'] = float(stream.duration * stream.time_base)
+    return info
+
+def _read_wav(f, file_size):
+    """
+    Read metadata from the RIFF chunks of a WAV file.
+
+    Args:
+        f (file): File opened in binary mode, positioned at the start
+        file_size (int): Size of the file in bytes
+
+    Returns:
+        dict: Metadata dictionary, or None if the header is not understood
+    """
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        return None
+
+    info = _empty_info()
+    byte_rate = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack('<4sI', chunk)
+        if chunk_id == b'fmt ':
+            fmt = f.read(chunk_size + (chunk_size & 1))
+            format_tag, channels, sample_rate, byte_rate = struct.unpack('<HHII', fmt[:12])
+            bits = struct.unpack('<H', fmt[14:16])[0]
+            codec = 'pcm_f' if format_tag == 3 else 'pcm_s' if bits > 8 else 'pcm_u'
+            info.update({
+                'has_audio': True,
+                'audio_codec': f"{codec}{bits}le" if bits > 8 else f"{codec}{bits}",
+                'sample_rate': sample_rate,
+                'channels': channels
+            })
+        elif chunk_id == b'data':
+            if not byte_rate:
+                return None
+            # Streamed WAVs leave the data size at 0 or 0xFFFFFFFF
+            data_size = chunk_size if 0 < chunk_size < 0xFFFFFFFF else file_size - f.tell()
+            info['duration'] = min(data_size, file_size - f.tell()) / byte_rate
+            return info
+        else:
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+def _read_mp3(f, file_size):
+    """
+    Read metadata from the first MPEG audio frame of an MP3 file.
+
+    The duration comes from the Xing/Info or VBRI frame count when present,
+    otherwise it is estimated from the bitrate (exact for CBR files).
+
+    Args:
+        f (file): File opened in binary mode, positioned at the start
+        file_size (int): Size of the file in bytes
+
+    Returns:
+        dict: Metadata dictionary, or None if no frame header is found
+    """
+    head = f.read(10)
+    offset = 0
+    if head[:3] == b'ID3' and len(head) == 10:
+        # Skip the ID3v2 tag; its size is a 28-bit synchsafe integer
+        offset = 10 + ((head[6] & 0x7f) << 21 | (head[7] & 0x7f) << 14 | (head[8] & 0x7f) << 7 | head[9] & 0x7f)
+    f.seek(offset)
+    data = f.read(64 * 1024)
+
+    for i in range(len(data) - 4):
+        if data[i] != 0xff or data[i + 1] & 0xe0 != 0xe0:
+            continue
+        version_bits = (data[i + 1] >> 3) & 3
+        layer = 4 - ((data[i + 1] >> 1) & 3)
+        bitrate_index = data[i + 2] >> 4
+        rate_index = (data[i + 2] >> 2) & 3
+        if version_bits == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+            continue
+
+        mpeg1 = version_bits == 3
+        sample_rate = MP3_SAMPLE_RATES[version_bits][rate_index]
+        bitrate = MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+        channels = 1 if data[i + 3] >> 6 == 3 else 2
+        samples_per_frame = 384 if layer == 1 else 1152 if mpeg1 or layer == 2 else 576
+
+        frames = None
+        side_info = (32 if channels == 2 else 17) if mpeg1 else (17 if channels == 2 else 9)
+        xing = i + 4 + side_info
+        if data[xing:xing + 4] in (b'Xing', b'Info') and struct.unpack('>I', data[xing + 4:xing + 8])[0] & 1:
+            frames = struct.unpack('>I', data[xing + 8:xing + 12])[0]
+        elif data[i + 36:i + 40] == b'VBRI':
+            frames = struct.unpack('>I', data[i + 50:i + 54])[0]
+
+        info = _empty_info()
+        info.update({
+            'has_audio': True,
+            'audio_codec': 'mp3' if layer == 3 else f"mp{layer}",
+            'sample_rate': sample_rate,
+            'channels': channels
+        })
+        if frames:
+            info['duration'] = frames * samples_per_frame / sample_rate
+        else:
+            audio_bytes = file_size - offset - i
+            f.seek(-128, os.SEEK_END)
+            if f.read(3) == b'TAG':
+                audio_bytes -= 128
+            info['duration'] = audio_bytes * 8 / bitrate
+        return info
+
+    return None
+
+def _iter_boxes(f, start, end):
+    """Yield (type, payload offset, payload size) of the MP4 boxes in a range."""
+    position = start
+    while position + 8 <= end:
+        f.seek(position)
+        size, box_type = struct.unpack('>I4s', f.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header:
+            return
+        yield box_type, position + header, size - header
+        position += size
+
+def _parse_pix_fmt(sample_type, config):
+    """
+    Derive the pixel format from an avcC or hvcC decoder configuration.
+
+    Returns:
+        str: FFmpeg pixel format name, or None if it cannot be told
+    """
+    chroma, depth = None, 8
+    if sample_type in ('avc1', 'avc3') and len(config) >= 7:
+        profile = config[1]
+        if profile in (66, 77, 88):
+            chroma = 1
+        else:
+            # High profiles append chroma format and bit depth after the parameter sets
+            position = 5
+            for count_size, count_mask in ((1, 0x1f), (1, 0xff)):
+                if position >= len(config):
+                    return None
+                count = config[position] & count_mask
+                position += count_size
+                for _ in range(count):
+                    position += 2 + struct.unpack('>H', config[position:position + 2])[0]
+            if position + 2 > len(config):
+                return None
+            chroma = config[position] & 3
+            depth = 8 + (config[position + 1] & 7)
+    elif sample_type in ('hvc1', 'hev1') and len(config) >= 19:
+        chroma = config[16] & 3
+        depth = 8 + (config[17] & 7)
+
+    names = {0: 'gray', 1: 'yuv420p', 2: 'yuv422p', 3: 'yuv444p'}
+    if chroma not in names:
+        return None
+    return names[chroma] if depth == 8 else f"{names[chroma]}{depth}le"
+
+def _read_track(f, start, end, track=None):
+    """
+    Read the handler, sample entry and timing of one MP4 track.
+
+    Returns:
+        dict: Track fields (handler, codec, timescale, duration, frame
+            duration, and stream parameters of the first sample entry)
+    """
+    track = {} if track is None else track
+    for box_type, offset, size in _iter_boxes(f, start, end):
+        if box_type in MP4_CONTAINERS:
+            _read_track(f, offset, offset + size, track)
+        elif box_type == b'mdhd':
+            f.seek(offset)
+            payload = f.read(min(size, 32))
+            if payload[0] == 1:
+                track['timescale'], track['duration'] = struct.unpack('>IQ', payload[20:32])
+            else:
+                track['timescale'], track['duration'] = struct.unpack('>II', payload[12:20])
+        elif box_type == b'hdlr':
+            f.seek(offset + 8)
+            track['handler'] = f.read(4)
+        elif box_type == b'stts':
+            f.seek(offset + 4)
+            count = struct.unpack('>I', f.read(4))[0]
+            entries = [struct.unpack('>II', f.read(8)) for _ in range(min(count, 4096))]
+            if entries:
+                # The most common sample delta is the nominal frame duration
+                track['frame_duration'] = max(entries, key=lambda entry: entry[0])[1]
+        elif box_type == b'stsd':
+            f.seek(offset + 8)
+            entry_size, entry_type = struct.unpack('>I4s', f.read(8))
+            entry = f.read(max(0, entry_size - 8))
+            sample_type = entry_type.decode('latin-1')
+            track['codec'] = MP4_CODECS.get(sample_type, sample_type.strip().lower())
+            if len(entry) >= 28 and track.get('handler') != b'soun':
+                track['width'], track['height'] = struct.unpack('>HH', entry[24:28])
+                # Visual sample entries are 78 bytes; configuration boxes follow
+                for config_type in (b'avcC', b'hvcC'):
+                    position = entry.find(config_type, 70)
+                    if position >= 0:
+                        config_size = struct.unpack('>I', entry[position - 4:position])[0]
+                        config = entry[position + 4:position - 4 + config_size]
+                        track['pix_fmt'] = _parse_pix_fmt(sample_type, config)
+                        track['extradata'] = extradata_hash(config)
+                        break
+            if len(entry) >= 28 and track.get('handler') == b'soun':
+                track['channels'] = struct.unpack('>H', entry[16:18])[0]
+                track['sample_rate'] = struct.unpack('>I', entry[24:28])[0] >> 16
+    return track
+
+def _read_mp4(f, file_size):
+    """
+    Read metadata from the moov box of an MP4/MOV file.
+
+    Args:
+        f (file): File opened in binary mode, positioned at the start
+        file_size (int): Size of the file in bytes
+
+    Returns:
+        dict: Metadata dictionary, or None if the file is not an MP4
+    """
+    if f.read(12)[4:8] not in (b'ftyp', b'moov', b'mdat', b'wide', b'free', b'skip'):
+        return None
+
+    info = _empty_info()
+    found = False
+    for box_type, offset, size in _iter_boxes(f, 0, file_size):
+        if box_type != b'moov':
+            continue
+        found = True
+        for child_type, child_offset, child_size in _iter_boxes(f, offset, offset + size):
+            if child_type == b'mvhd':
+                f.seek(child_offset)
+                payload = f.read(min(child_size, 32))
+                if payload[0] == 1:
+                    timescale, duration = struct.unpack('>IQ', payload[20:32])
+                else:
+                    timescale, duration = struct.unpack('>II', payload[12:20])
+                if timescale:
+                    info['duration'] = duration / timescale
+            elif child_type == b'trak':
+                track = _read_track(f, child_offset, child_offset + child_size)
+                timescale = track.get('timescale')
+                if track.get('handler') == b'vide' and info['codec'] is None:
+                    info.update({
+                        'width': track.get('width'),
+                        'height': track.get('height'),
+                        'codec': track.get('codec'),
+                        'pix_fmt': track.get('pix_fmt'),
+                        'extradata': track.get('extradata'),
+                        'time_base': f"1/{timescale}" if timescale else None
+                    })
+                    if timescale and track.get('frame_duration'):
+                        info['fps'] = timescale / track['frame_duration']
+                elif track.get('handler') == b'soun' and not info['has_audio']:
+                    info.update({
+                        'has_audio': True,
+                        'audio_codec': track.get('codec'),
+                        'sample_rate': track.get('sample_rate'),
+                        'channels': track.get('channels')
+                    })
+        break
+
+    return info if found else None
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _read_info(path, mtime, size):
+    """
+    Read metadata of one version of a file; cached by its stat signature.
+
+    Returns:
+        dict: Metadata dictionary, or None if the format is not supported
+    """
+    if av is not None:
+        try:
+            return _read_with_av(path)
+        except Exception as e:
+            logger.debug(f"PyAV could not read {path}: {e}")
+
+    readers = [_read_mp4, _read_wav]
+    if os.path.splitext(path)[1].lower() in ('.mp3', '.mp2', '.mpga'):
+        # Frame sync words are too weak a signature to sniff other files with
+        readers.append(_read_mp3)
+
+    with open(path, 'rb') as f:
+        for reader in readers:
+            f.seek(0)
+            try:
+                info = reader(f, size)
+            except (struct.error, IndexError, OSError) as e:
+                logger.debug(f"{reader.__name__} could not read {path}: {e}")
+                info = None
+            if info is not None:
+                return info
+    return None
+
+def get_media_info(path):
+    """
+    Get container duration, stream parameters and audio format of a file.
+
+    Args:
+        path (str): Media file path
+
+    Returns:
+        dict: duration, width, height, codec, fps, pix_fmt, time_base,
+            extradata (hash of the codec configuration), has_audio,
+            audio_codec, sample_rate and channels (unknown fields are
+            None), or None if the file cannot be read
+    """
+    try:
+        stat = os.stat(path)
+        info = _read_info(os.path.abspath(path), stat.st_mtime, stat.st_size)
+    except OSError as e:
+        logger.error(f"Could not read media info of {path}: {e}")
+        return None
+    return dict(info) if info else None
+
+def get_duration(path):
+    """
+    Get the duration of a media file from its headers.
+
+    Args:
+        path (str): Media file path
+
+    Returns:
+        float: Duration in seconds, or None if unknown
+    """
+    info = get_media_info(path)
+    return info.get('duration') if info else None
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Supervises external media processes (FFmpeg, ffprobe).
+
+Every process takes a slot from a global pool, runs in its own process
+group so it can be killed with its children, is killed when it exceeds
+its timeout or its job is cancelled, and heavy encodes run at a lower
+CPU and I/O priority than probes.
+"""
+
+import os
+import json
+import shutil
+import signal
+import logging
+import threading
+import subprocess
+import contextvars
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+# Seconds between SIGTERM and SIGKILL when stopping a process group
+KILL_GRACE_SECONDS = 5
+
+_current_job = contextvars.ContextVar('current_job', default=None)
+
+class ProcessCancelled(Exception):
+    """Raised when a supervised process is killed because its job was cancelled."""
+
+class ProcessSupervisor:
+    """Global limits, priorities, timeouts and cancellation for media processes."""
+
+    def __init__(self, max_encodes=None, max_probes=8, cpu_budget=None, encode_timeout=None,
+                 probe_timeout=60, encode_nice=10):
+        """
+        Initialize process supervisor.
+
+        Args:
+            max_encodes (int, optional): Concurrent FFmpeg processes
+                (defaults to half the CPU budget)
+            max_probes (int): Concurrent ffprobe processes, kept separate so
+                probes never wait behind long encodes
+            cpu_budget (int, optional): Cores shared by all encodes
+                (defaults to all cores); when set, it also caps the
+                threads of each encode
+            encode_timeout (float, optional): Seconds before an encode is killed
+            probe_timeout (float, optional): Seconds before a probe is killed
+            encode_nice (int): Niceness added to encodes; 0 disables nice/ionice
+        """
+        self.cpu_budget = max(1, cpu_budget or os.cpu_count() or 1)
+        self.thread_cap = cpu_budget
+        self.max_encodes = max(1, max_encodes or self.cpu_budget // 2)
+        self.timeouts = {'encode': encode_timeout, 'stream': encode_timeout, 'probe': probe_timeout}
+        self.encode_nice = encode_nice
+        self._slots = {
+            'encode': threading.BoundedSemaphore(self.max_encodes),
+            'probe': threading.BoundedSemaphore(max(1, max_probes))
+        }
+        self._lock = threading.Lock()
+        self._running = {}
+        self._cancelled = set()
+        self._priority_prefix = self._build_priority_prefix()
+
+    def _build_priority_prefix(self):
+        """Get the nice/ionice command prefix for encodes."""
+        if not self.encode_nice or os.name != 'posix':
+            return []
+        prefix = []
+        if shutil.which('ionice'):
+            # Best-effort class, lowest priority: still progresses under load
+            prefix.extend(['ionice', '-c', '2', '-n', '7'])
+        if shutil.which('nice'):
+            prefix.extend(['nice', '-n', str(self.encode_nice)])
+        return prefix
+
+    def threads_per_encode(self):
+        """
+        Get the FFmpeg thread cap for one encode.
+
+        Encodes are only capped by an explicit budget: the current job's
+        (see job_scope()) or the supervisor's configured cpu_budget.
+        Otherwise FFmpeg sizes its own thread pools, so a lone encode
+        still uses every core.
+
+        Returns:
+            int: Thread count, or None to leave it to FFmpeg
+        """
+        job = _current_job.get()
+        caps = [cap for cap in (self.thread_cap, job and job.get('cpu_budget')) if cap]
+        return max(1, min(caps)) if caps else None
+
+    @contextmanager
+    def process(self, cmd, kind='encode', timeout=None, **popen_kwargs):
+        """
+        Start a supervised process once a slot is free.
+
+        Args:
+            cmd (list): Command line
+            kind (str): 'encode' (low priority), 'probe', or 'stream' for a
+                low-priority producer feeding another process through a pipe;
+                streams take no slot, since they only run as fast as their
+                already admitted consumer reads
+            timeout (float, optional): Overrides the default timeout for kind
+            **popen_kwargs: Passed to subprocess.Popen
+
+        Yields:
+            subprocess.Popen: The running process; 'killed_reason' is set to
+                'timeout' or 'cancelled' if the supervisor killed it
+
+        Raises:
+            ProcessCancelled: If the current job was cancelled
+        """
+        job = _current_job.get()
+        job_id = job['id'] if job else None
+        timeout = timeout if timeout is not None else self.timeouts.get(kind)
+
+        with self._slots.get(kind) or nullcontext():
+            if job_id is not None and job_id in self._cancelled:
+                raise ProcessCancelled(f"Job {job_id} was cancelled")
+
+            if kind in ('encode', 'stream'):
+                cmd = self._priority_prefix + list(cmd)
+            proc = subprocess.Popen(cmd, start_new_session=(os.name == 'posix'), **popen_kwargs)
+            proc.killed_reason = None
+
+            with self._lock:
+                self._running[proc.pid] = (proc, job_id)
+
+            timer = None
+            if timeout:
+                timer = threading.Timer(timeout, self._stop, (proc, 'timeout'))
+                timer.daemon = True
+                timer.start()
+
+            try:
+                yield proc
+            finally:
+                if timer:
+                    timer.cancel()
+                if proc.returncode is None and proc.poll() is None:
+                    self._stop(proc, proc.killed_reason or 'abandoned')
+                    proc.wait()
+                with self._lock:
+                    self._running.pop(proc.pid, None)
+
+    def run(self, cmd, kind='probe', timeout=None):
+        """
+        Run a supervised process to completion and capture its output.
+
+        Args:
+            cmd (list): Command line
+            kind (str): 'encode' or 'probe'
+            timeout (float, optional): Overrides the default timeout for kind
+
+        Returns:
+            bytes: Captured stdout
+
+        Raises:
+            subprocess.CalledProcessError: If the process fails
+            subprocess.TimeoutExpired: If the process was killed on timeout
+            ProcessCancelled: If the job was cancelled
+        """
+        with self.process(cmd, kind, timeout, stdout=subprocess.PIPE, stderr=subprocess.PIPE) as proc:
+            stdout, stderr = proc.communicate()
+            self.check(proc, cmd, stdout, stderr)
+            return stdout
+
+    def check(self, proc, cmd, stdout=b'', stderr=b''):
+        """
+        Raise the appropriate error for a finished process.
+
+        Raises:
+            subprocess.TimeoutExpired: If the supervisor killed it on timeout
+            ProcessCancelled: If the supervisor killed it on cancellation
+            subprocess.CalledProcessError: If it exited with an error
+        """
+        if proc.killed_reason == 'timeout':
+            raise subprocess.TimeoutExpired(cmd, None, stdout, stderr)
+        if proc.killed_reason == 'cancelled':
+            raise ProcessCancelled(f"{os.path.basename(cmd[0])} was cancelled")
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr)
+
+    def _stop(self, proc, reason):
+        """Terminate a process group, escalating to SIGKILL after a grace period."""
+        if proc.returncode is not None:
+            return
+        proc.killed_reason = reason
+        logger.warning(f"Stopping process {proc.pid} ({reason}): {' '.join(map(str, proc.args[:6]))} ...")
+
+        if os.name != 'posix':
+            proc.kill()
+            return
+
+        try:
+            os.killpg(proc.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+
+        def escalate():
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+        # Never wait here: the owning thread is the one that reaps the process
+        timer = threading.Timer(KILL_GRACE_SECONDS, escalate)
+        timer.daemon = True
+        timer.start()
+
+    def cancel_job(self, job_id):
+        """
+        Kill every running process of a job and refuse new ones.
+
+        Args:
+            job_id (str): Job ID given to job_scope()
+
+        Returns:
+            int: Number of processes stopped
+        """
+        with self._lock:
+            self._cancelled.add(job_id)
+            targets = [proc for proc, owner in self._running.values() if owner == job_id]
+        for proc in targets:
+            self._stop(proc, 'cancelled')
+        logger.info(f"Cancelled job {job_id}, stopped {len(targets)} processes")
+        return len(targets)
+
+    def release_job(self, job_id):
+        """Forget a job's cancellation once it has finished."""
+        with self._lock:
+            self._cancelled.discard(job_id)
+
+    def running_count(self):
+        """Number of supervised processes currently running."""
+        with self._lock:
+            return len(self._running)
+
+@contextmanager
+def job_scope(job_id, cpu_budget=None):
+    """
+    Attribute the processes started in this context to a job.
+
+    Args:
+        job_id (str): Job ID, used by cancel_job()
+        cpu_budget (int, optional): Maximum FFmpeg threads per process for
+            this job
+    """
+    token = _current_job.set({'id': job_id, 'cpu_budget': cpu_budget})
+    try:
+        yield
+    finally:
+        _current_job.reset(token)
+        get_supervisor().release_job(job_id)
+
+_supervisor = None
+_supervisor_lock = threading.Lock()
+
+def get_supervisor():
+    """
+    Get the process-wide supervisor, configured from the 'processing'
+    section of config/app_settings.json.
+
+    Returns:
+        ProcessSupervisor: Shared supervisor
+    """
+    global _supervisor
+    with _supervisor_lock:
+        if _supervisor is None:
+            settings = {}
+            config_path = os.path.join('config', 'app_settings.json')
+            try:
+                if os.path.exists(config_path):
+                    with open(config_path, 'r', encoding='utf-8') as f:
+                        settings = json.load(f).get('processing', {})
+            except Exception as e:
+                logger.warning(f"Could not load process supervisor settings: {e}")
+
+            _supervisor = ProcessSupervisor(
+                max_encodes=settings.get('ffmpeg_slots'),
+                max_probes=settings.get('probe_slots', 8),
+                cpu_budget=settings.get('cpu_budget'),
+                encode_timeout=settings.get('timeout_seconds'),
+                probe_timeout=settings.get('probe_timeout_seconds', 60),
+                encode_nice=settings.get('encode_nice', 10)
+            )
+        return _supervisor
@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Lightweight timing spans with Chrome trace export.
+
+Spans are recorded into the trace active in the current context. Outside
+a trace they cost one context variable lookup, so library code can be
+instrumented unconditionally.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from utils.db_connector import DatabaseConnector
+
+logger = logging.getLogger(__name__)
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+class Trace:
+    """Collects the finished spans of one job."""
+
+    def __init__(self, trace_id):
+        """
+        Initialize trace.
+
+        Args:
+            trace_id (str): Identifier of the traced job
+        """
+        self.trace_id = trace_id
+        self.spans = []
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _new_span_id(self):
+        """Allocate a span ID."""
+        with self._lock:
+            self._next_id += 1
+            return self._next_id
+
+    def _add(self, span):
+        """Record a finished span."""
+        with self._lock:
+            self.spans.append(span)
+
+    @property
+    def duration(self):
+        """Wall-clock seconds covered by the trace so far."""
+        return (self.end_time or time.perf_counter()) - self.start_time
+
+    def summary(self):
+        """
+        Aggregate span durations by name.
+
+        Returns:
+            dict: Mapping of span name to {'count', 'total', 'max'} seconds
+        """
+        result = {}
+        with self._lock:
+            spans = list(self.spans)
+        for record in spans:
+            entry = result.setdefault(record['name'], {'count': 0, 'total': 0.0, 'max': 0.0})
+            entry['count'] += 1
+            entry['total'] += record['duration']
+            entry['max'] = max(entry['max'], record['duration'])
+        for entry in result.values():
+            entry['total'] = round(entry['total'], 4)
+            entry['max'] = round(entry['max'], 4)
+        return result
+
+    def to_chrome_trace(self):
+        """
+        Convert the spans to the Chrome trace event format.
+
+        Returns:
+            dict: Trace document loadable in chrome://tracing or Perfetto
+        """
+        pid = os.getpid()
+        events = [{
+            'name': 'process_name', 'ph': 'M', 'pid': pid,
+            'args': {'name': f"job {self.trace_id}"}
+        }]
+        with self._lock:
+            spans = list(self.spans)
+        for record in spans:
+            args = dict(record['attributes'])
+            args.update({'span_id': record['id'], 'parent_id': record['parent_id']})
+            if record['error']:
+                args['error'] = record['error']
+            events.append({
+                'name': record['name'],
+                'cat': record['name'].split('.', 1)[0],
+                'ph': 'X',
+                'ts': round((record['start'] - self.start_time) * 1e6, 1),
+                'dur': round(record['duration'] * 1e6, 1),
+                'pid': pid,
+                'tid': record['thread'],
+                'args': args
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, path):
+        """
+        Write the trace as Chrome trace JSON.
+
+        Args:
+            path (str): Output file path
+
+        Returns:
+            str: Path to the written file, or None on error
+        """
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_chrome_trace(), f)
+            return path
+        except Exception as e:
+            logger.warning(f"Could not write trace {path}: {e}")
+            return None
+
+@contextmanager
+def trace(trace_id):
+    """
+    Collect spans for a job in the current context.
+
+    Args:
+        trace_id (str): Identifier of the traced job
+
+    Yields:
+        Trace: The active trace
+    """
+    current = Trace(trace_id)
+    trace_token = _current_trace.set(current)
+    span_token = _current_span.set(None)
+    try:
+        yield current
+    finally:
+        current.end_time = time.perf_counter()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+def current_trace():
+    """Get the trace active in the current context, or None."""
+    return _current_trace.get()
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a block as a span of the active trace.
+
+    Args:
+        name (str): Span name, dotted by category (e.g. 'ffmpeg.concat')
+        **attributes: Values recorded with the span
+
+    Yields:
+        dict: Span attributes, which may be extended inside the block
+    """
+    active = _current_trace.get()
+    if active is None:
+        yield attributes
+        return
+
+    parent = _current_span.get()
+    span_id = active._new_span_id()
+    token = _current_span.set(span_id)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield attributes
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        end = time.perf_counter()
+        _current_span.reset(token)
+        active._add({
+            'id': span_id,
+            'parent_id': parent,
+            'name': name,
+            'start': start,
+            'duration': end - start,
+            'thread': threading.get_ident(),
+            'attributes': attributes,
+            'error': error
+        })
+
+def traced(name=None):
+    """
+    Decorator running a function inside a span.
+
+    Args:
+        name (str, optional): Span name (defaults to the function name)
+
+    Returns:
+        callable: Decorator
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def in_context(func):
+    """
+    Bind a callable to the current context so spans it records in a worker
+    thread join the caller's trace.
+
+    Args:
+        func (callable): Function to bind
+
+    Returns:
+        callable: Function running in a copy of the current context
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # A context can only be entered by one thread at a time
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
+
+def save_trace(active, chrome_path=None):
+    """
+    Export a finished trace and store its per-span summary in the database.
+
+    Args:
+        active (Trace): Finished trace
+        chrome_path (str, optional): Where to write the Chrome trace JSON
+
+    Returns:
+        dict: Span summary from Trace.summary()
+    """
+    summary = active.summary()
+    if chrome_path:
+        chrome_path = active.export_chrome_trace(chrome_path)
+    DatabaseConnector().save_trace_summary(active.trace_id, active.duration, summary, chrome_path)
+
+    slowest = sorted(summary.items(), key=lambda item: item[1]['total'], reverse=True)[:5]
+    logger.info(f"Trace {active.trace_id}: {active.duration:.2f}s total, slowest spans: " +
+                ", ".join(f"{name}={entry['total']:.2f}s" for name, entry in slowest))
+    return summary
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Persistent catalog of the video library backed by the SQLite database.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from utils.db_connector import DatabaseConnector
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv')
+
+class VideoCatalog:
+    """Tracks library files and their metadata sidecars across runs."""
+
+    def __init__(self, library_dir=None, db=None, refresh_interval=2.0):
+        """
+        Initialize video catalog.
+
+        Args:
+            library_dir (str, optional): Video library root directory
+            db (DatabaseConnector, optional): Database connector
+            refresh_interval (float): Minimum seconds between filesystem rescans
+        """
+        self.library_dir = library_dir or os.path.join('data', 'video_library')
+        self.library_key = os.path.abspath(self.library_dir)
+        self.db = db or DatabaseConnector()
+        self.refresh_interval = refresh_interval
+        self.version = 0
+        self._entries = None
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+
+        self.db.initialize_database()
+
+    def _scan_files(self):
+        """
+        Stat every video file in the library.
+
+        Returns:
+            dict: Mapping of relative path to os.stat_result
+        """
+        found = {}
+        pending = [self.library_dir]
+
+        while pending:
+            directory = pending.pop()
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.name.lower().endswith(VIDEO_EXTENSIONS):
+                            rel_path = os.path.relpath(entry.path, self.library_dir)
+                            found[rel_path] = entry.stat()
+            except OSError as e:
+                logger.warning(f"Could not scan {directory}: {e}")
+
+        return found
+
+    def _find_sidecar(self, rel_path):
+        """
+        Locate the JSON metadata sidecar for a video.
+
+        Args:
+            rel_path (str): Video path relative to the library root
+
+        Returns:
+            tuple: (sidecar mtime, sidecar path) or (None, None)
+        """
+        sidecar = os.path.join(self.library_dir, os.path.splitext(rel_path)[0] + '.json')
+        try:
+            sidecar_mtime = os.path.getmtime(sidecar)
+        except OSError:
+            return None, None
+
+        return sidecar_mtime, sidecar
+
+    def refresh(self, force=False):
+        """
+        Bring the catalog in sync with the filesystem.
+
+        Only videos and sidecars whose size or mtime changed are re-read.
+
+        Args:
+            force (bool): Rescan even within refresh_interval
+
+        Returns:
+            bool: True if any entry changed
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._entries is not None and now - self._last_refresh < self.refresh_interval:
+                return False
+
+            if self._entries is None:
+                self._entries = {
+                    entry['rel_path']: entry for entry in self.db.get_catalog_entries(self.library_key)
+                }
+
+            found = self._scan_files()
+            updated = []
+            removed = [rel_path for rel_path in self._entries if rel_path not in found]
+
+            for rel_path, stat in found.items():
+                entry = self._entries.get(rel_path)
+                sidecar_mtime, sidecar = self._find_sidecar(rel_path)
+
+                if (entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime
+                        and entry.get('metadata_mtime') == sidecar_mtime):
+                    continue
+
+                metadata = None
+                if sidecar:
+                    try:
+                        with open(sidecar, 'r', encoding='utf-8') as f:
+                            metadata = json.load(f)
+                    except Exception as e:
+                        logger.error(f"Error loading video metadata {sidecar}: {e}")
+
+                parts = rel_path.split(os.sep)
+                updated.append({
+                    'rel_path': rel_path,
+                    'category': parts[0] if len(parts) > 1 else 'uncategorized',
+                    'size': stat.st_size,
+                    'mtime': stat.st_mtime,
+                    'ctime': stat.st_ctime,
+                    'metadata_mtime': sidecar_mtime,
+                    'metadata': metadata
+                })
+
+            for rel_path in removed:
+                del self._entries[rel_path]
+            for entry in updated:
+                self._entries[entry['rel_path']] = entry
+
+            if updated or removed:
+                self.db.save_catalog_entries(self.library_key, updated, removed)
+                self.version += 1
+                logger.info(f"Video catalog: {len(updated)} updated, {len(removed)} removed, "
+                            f"{len(self._entries)} total")
+
+            self._last_refresh = now
+            return bool(updated or removed)
+
+    def entries(self):
+        """
+        Get catalog entries with paths resolved against the library root.
+
+        Returns:
+            list: List of entry dictionaries sorted by path
+        """
+        self.refresh()
+        with self._lock:
+            result = []
+            for rel_path in sorted(self._entries):
+                entry = dict(self._entries[rel_path])
+                entry['path'] = os.path.join(self.library_dir, rel_path)
+                result.append(entry)
+            return result
+
+    def video_paths(self, extensions=VIDEO_EXTENSIONS):
+        """
+        Get the paths of all cataloged videos.
+
+        Args:
+            extensions (tuple): File extensions to include
+
+        Returns:
+            list: List of video file paths
+        """
+        return [e['path'] for e in self.entries() if e['path'].lower().endswith(extensions)]
+
+    def metadata_entries(self):
+        """
+        Get sidecar metadata for MP4 videos that have one.
+
+        Returns:
+            list: List of metadata dictionaries with 'video_path' set
+        """
+        result = []
+        for entry in self.entries():
+            if entry.get('metadata') and entry['path'].endswith('.mp4'):
+                video_data = dict(entry['metadata'])
+                video_data['video_path'] = entry['path']
+                result.append(video_data)
+        return result
+
+    def file_info(self, entry):
+        """
+        Convert a catalog entry into FileManager.get_file_info() format.
+
+        Args:
+            entry (dict): Catalog entry
+
+        Returns:
+            dict: File information
+        """
+        path = entry['path']
+        extension = os.path.splitext(path)[1].lower()
+        return {
+            'path': path,
+            'filename': os.path.basename(path),
+            'directory': os.path.dirname(path),
+            'size': entry['size'],
+            'created': datetime.fromtimestamp(entry['ctime']),
+            'modified': datetime.fromtimestamp(entry['mtime']),
+            'extension': extension,
+            'is_video': extension in ['.mp4', '.mov', '.avi', '.mkv'],
+            'is_audio': extension in ['.mp3', '.wav', '.ogg', '.flac'],
+            'is_image': extension in ['.jpg', '.jpeg', '.png', '.gif']
+        }
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+def get_video_catalog(library_dir=None):
+    """
+    Get the shared catalog for a library directory.
+
+    Args:
+        library_dir (str, optional): Video library root directory
+
+    Returns:
+        VideoCatalog: Shared catalog instance
+    """
+    library_dir = library_dir or os.path.join('data', 'video_library')
+    key = os.path.abspath(library_dir)
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = VideoCatalog(library_dir)
+        return _catalogs[key]
@@ -1,34 +1,49 @@
+import os
+import time
+import queue
+import threading
 import cv2
 import numpy as np
 import argparse
 
-def create_custom_field(h, w, centers, strength=5):
-    y, x = np.mgrid[0:h, 0:w]
-    fx = np.zeros((h, w), dtype=np.float32)
-    fy = np.zeros((h, w), dtype=np.float32)
-
-    for c in centers:
-        dx = x - c['x']
-        dy = y - c['y']
-        distance = np.sqrt(dx**2 + dy**2) + 1e-5
-
-        if c['type'] == 'curl':
-            fx += -strength * dy / distance
-            fy += strength * dx / distance
-        elif c['type'] == 'div':
-            fx += strength * dx / distance
-            fy += strength * dy / distance
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv')
 
+def create_custom_field(h, w, centers, strength=5):
+    if not centers:
+        return np.zeros((h, w), dtype=np.float32), np.zeros((h, w), dtype=np.float32)
+
+    # 所有圆心一次广播计算，形状为 (n, h, w)
+    cx = np.array([c['x'] for c in centers], dtype=np.float32)[:, None, None]
+    cy = np.array([c['y'] for c in centers], dtype=np.float32)[:, None, None]
+    curl = np.array([c['type'] == 'curl' for c in centers], dtype=np.float32)[:, None, None]
+    div = np.array([c['type'] == 'div' for c in centers], dtype=np.float32)[:, None, None]
+
+    x = np.arange(w, dtype=np.float32)[None, None, :]
+    y = np.arange(h, dtype=np.float32)[None, :, None]
+    dx = x - cx
+    dy = y - cy
+    inv_distance = strength / (np.sqrt(dx**2 + dy**2) + 1e-5)
+
+    fx = ((div * dx - curl * dy) * inv_distance).sum(axis=0, dtype=np.float32)
+    fy = ((div * dy + curl * dx) * inv_distance).sum(axis=0, dtype=np.float32)
     return fx, fy
 
-def apply_distortion(frame, fx, fy):
-    h, w = frame.shape[:2]
-    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
-    map_x = (x + fx).astype(np.float32)
-    map_y = (y + fy).astype(np.float32)
+class RemapEngine:
+    """预先计算位移映射，每帧只需一次 cv2.remap。"""
+
+    def __init__(self, h, w, centers, strength=5, fixed_point=True):
+        fx, fy = create_custom_field(h, w, centers, strength)
+        map_x = np.arange(w, dtype=np.float32)[None, :] + fx
+        map_y = np.arange(h, dtype=np.float32)[:, None] + fy
 
-    distorted = cv2.remap(frame, map_x, map_y, interpolation=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT)
-    return distorted
+        if fixed_point:
+            # 定点映射表比浮点映射表的 remap 更快
+            self.map1, self.map2 = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+        else:
+            self.map1, self.map2 = map_x, map_y
+
+    def apply(self, frame):
+        return cv2.remap(frame, self.map1, self.map2, interpolation=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REFLECT)
 
 def parse_circle_arg(circle_args):
     centers = []
@@ -42,20 +57,143 @@ def parse_circle_arg(circle_args):
             raise argparse.ArgumentTypeError(f"Invalid circle format '{arg}': {e}")
     return centers
 
+def process_video_headless(input_path, output_path, centers, alpha, workers=None, queue_size=64, fixed_point=True):
+    """读取 → 线程池扭曲 → 按序写出，返回写出的帧数。"""
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        print(f"无法打开输入视频：{input_path}")
+        return None
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    expected = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    engine = RemapEngine(h, w, centers, alpha, fixed_point=fixed_point)
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    out = cv2.VideoWriter(output_path, fourcc, fps, (w, h))
+
+    workers = workers or os.cpu_count() or 1
+    frames_in = queue.Queue(maxsize=queue_size)
+    frames_out = queue.Queue(maxsize=queue_size)
+    # 限制已读出但尚未写出的帧数：读线程取得名额，写出后归还
+    in_flight = max(1, queue_size)
+    slots = threading.Semaphore(in_flight)
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        index = 0
+        while True:
+            slots.acquire()
+            if stop.is_set():
+                break
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames_in.put((index, frame))
+            index += 1
+        for _ in range(workers):
+            frames_in.put(None)
+
+    def worker():
+        try:
+            while True:
+                item = frames_in.get()
+                if item is None:
+                    break
+                if stop.is_set():
+                    continue
+                index, frame = item
+                try:
+                    frames_out.put((index, engine.apply(frame)))
+                except Exception as e:
+                    # 缺了这一帧写线程无法继续，通知读线程停止
+                    errors.append(e)
+                    stop.set()
+                    slots.release(in_flight)
+        finally:
+            frames_out.put(None)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=reader, daemon=True)]
+    threads += [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for t in threads:
+        t.start()
+
+    # 工作线程乱序完成，按帧号重新排序后写出
+    pending = {}
+    next_index = 0
+    finished = 0
+    while finished < workers:
+        item = frames_out.get()
+        if item is None:
+            finished += 1
+            continue
+        pending[item[0]] = item[1]
+        while next_index in pending:
+            out.write(pending.pop(next_index))
+            next_index += 1
+            slots.release()
+
+    for t in threads:
+        t.join()
+    cap.release()
+    out.release()
+
+    if errors:
+        print(f"处理 {input_path} 失败：{errors[0]}")
+        return None
+
+    elapsed = time.perf_counter() - start
+    print(f"{input_path} -> {output_path}: {next_index} 帧, {elapsed:.2f}s, "
+          f"{next_index / elapsed if elapsed else 0:.1f} fps ({workers} 线程)")
+    if expected > 0 and expected != next_index:
+        print(f"警告：源视频报告 {expected} 帧，实际写出 {next_index} 帧")
+    return next_index
+
+def run_batch(args):
+    if os.path.isdir(args.input):
+        output_dir = os.path.splitext(args.output)[0]
+        os.makedirs(output_dir, exist_ok=True)
+        jobs = [
+            (os.path.join(args.input, name), os.path.join(output_dir, os.path.splitext(name)[0] + '.mp4'))
+            for name in sorted(os.listdir(args.input))
+            if name.lower().endswith(VIDEO_EXTENSIONS)
+        ]
+    else:
+        jobs = [(args.input, args.output)]
+
+    start = time.perf_counter()
+    total = 0
+    for input_path, output_path in jobs:
+        total += process_video_headless(input_path, output_path, args.circles, args.alpha,
+                                        args.workers, args.queue_size, not args.float_maps) or 0
+
+    elapsed = time.perf_counter() - start
+    print(f"完成 {len(jobs)} 个视频, 共 {total} 帧, {elapsed:.2f}s, "
+          f"{total / elapsed if elapsed else 0:.1f} fps")
+
 def main(args):
+    if args.headless or os.path.isdir(args.input):
+        run_batch(args)
+        return
+
     cap = cv2.VideoCapture(args.input)
     ret, frame = cap.read()
     if not ret:
         print("无法打开输入视频。")
         return
     h, w = frame.shape[:2]
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
 
     fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(args.output, fourcc, 30, (w, h))
+    out = cv2.VideoWriter(args.output, fourcc, fps, (w, h))
+
+    engine = RemapEngine(h, w, args.circles, args.alpha, fixed_point=not args.float_maps)
 
     while ret:
-        fx, fy = create_custom_field(h, w, args.circles, args.alpha)
-        distorted = apply_distortion(frame, fx, fy)
+        distorted = engine.apply(frame)
 
         cv2.imshow('Distorted', distorted)
         out.write(distorted)
@@ -71,11 +209,15 @@ def main(args):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Apply curl/divergence distortion to video.")
-    parser.add_argument('--input', required=True, help="输入视频路径")
-    parser.add_argument('--output', default="output.mp4", help="输出视频路径")
+    parser.add_argument('--input', required=True, help="输入视频路径，或包含视频的目录（批处理）")
+    parser.add_argument('--output', default="output.mp4", help="输出视频路径；批处理时为输出目录")
     parser.add_argument('--alpha', type=float, default=20, help="扭曲强度")
     parser.add_argument('--circle', dest='circles', type=str, action='append',
                         required=True, help="定义圆圈效果和位置，格式为 effect_type:x:y，例如 curl:300:300 或 div:500:400，可以指定多次")
+    parser.add_argument('--float-maps', action='store_true', help="使用浮点映射表（更精确，但比定点映射表慢）")
+    parser.add_argument('--headless', action='store_true', help="无窗口批处理模式，适合服务器")
+    parser.add_argument('--workers', type=int, default=None, help="批处理工作线程数（默认 CPU 核数）")
+    parser.add_argument('--queue-size', type=int, default=64, help="批处理帧队列长度")
 
     args = parser.parse_args()
     args.circles = parse_circle_arg(args.circles)